@@ -0,0 +1,109 @@
+"""
+Benchmark for sending MESH acknowledgements concurrently in mesh-acknowledge.
+
+Acknowledgements are sent through MockMeshClient instances backed by an
+in-memory stand-in for S3 that adds a fixed latency to every call, and the
+acknowledged events are published to a stand-in event publisher with the same
+latency. The time taken to work through one SQS batch is compared between
+acknowledging the records one after another, on a pool of workers, and on a
+pool of workers acknowledging the downloaded messages in one bulk message.
+
+Usage (from the repository root):
+    PYTHONPATH=lambdas/mesh-acknowledge:utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/mesh-acknowledge/benchmarks/benchmark_concurrent_acknowledgements.py --workers 5
+"""
+import argparse
+import json
+import time
+from unittest.mock import Mock
+from uuid import uuid4
+
+from py_mock_mesh import InMemoryS3, MockMeshClient
+from mesh_acknowledge.acknowledger import MeshAcknowledger
+from mesh_acknowledge.message_processor import MessageProcessor
+from mesh_acknowledge.__tests__.fixtures import create_downloaded_event_dict, create_invalid_event_dict
+
+MAILBOX = 'MAILBOX'
+
+
+class SlowEventPublisher:  # pylint: disable=too-few-public-methods
+    """
+    Stand-in for EventPublisher that takes a fixed time to publish each batch of events
+    """
+
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+
+    def send_events(self, events, *_args, **_kwargs):
+        """
+        Publishes events, none of which fail
+        """
+        time.sleep(self.latency_seconds)
+        return []
+
+
+def build_message(record_count, invalid_every):
+    """
+    Builds an SQS message, every invalid_every-th record carrying an invalid event
+    """
+    records = []
+    for index in range(record_count):
+        detail = create_invalid_event_dict(str(uuid4())) if index % invalid_every == 0 \
+            else create_downloaded_event_dict(str(uuid4()))
+        records.append({
+            'messageId': f'sqs-{index}',
+            'eventSource': 'aws:sqs',
+            'body': json.dumps({'detail': detail})
+        })
+    return {'Records': records}
+
+
+def run(label, max_workers, args, bulk_acknowledge=False):
+    """
+    Times one SQS batch and prints the result
+    """
+    latency_seconds = args.latency_ms / 1000
+    s3_client = InMemoryS3(latency_seconds)
+    logger = Mock()
+
+    def build_mesh_client():
+        return MockMeshClient(s3_client, 's3://bucket/mock-mesh', MAILBOX, logger)
+
+    message_processor = MessageProcessor(
+        acknowledger=MeshAcknowledger(build_mesh_client(), logger),
+        event_publisher=SlowEventPublisher(latency_seconds),
+        sender_lookup=Mock(get_mailbox_id=Mock(return_value=MAILBOX)),
+        dlq=Mock(buffered=False),
+        logger=logger,
+        max_workers=max_workers,
+        build_mesh_client=build_mesh_client,
+        bulk_acknowledge=bulk_acknowledge
+    )
+    message = build_message(args.messages, args.invalid_every)
+
+    started = time.perf_counter()
+    failures = message_processor.process_message(message)
+    elapsed = time.perf_counter() - started
+
+    print(f'{label:<12} {args.messages} records in {elapsed:.2f}s '
+          f'({args.messages / elapsed:.1f} records/s, {len(failures)} failed, '
+          f'{len(s3_client.objects)} sent)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--messages', type=int, default=10, help='records in the SQS batch')
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='latency of each S3 call and event publish')
+    parser.add_argument('--invalid-every', type=int, default=5,
+                        help='one record in this many carries an invalid event')
+    args = parser.parse_args()
+
+    run('serial', 1, args)
+    run('concurrent', args.workers, args)
+    run('bulk', args.workers, args, bulk_acknowledge=True)
+
+
+if __name__ == '__main__':
+    main()
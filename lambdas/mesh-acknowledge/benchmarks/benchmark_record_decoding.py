@@ -0,0 +1,110 @@
+"""
+Benchmark for decoding SQS records in mesh-acknowledge.
+
+Batches of SQS records carrying MESHInboxMessageDownloaded and
+MESHInboxMessageInvalid events in their EventBridge envelopes are decoded the way
+the lambda used to, parsing each body once to read the event type and again to
+validate the event, and with the shared RecordDecoder, which parses and validates
+each body in one pass.
+
+Usage (from the repository root):
+    PYTHONPATH=lambdas/mesh-acknowledge:utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/mesh-acknowledge/benchmarks/benchmark_record_decoding.py
+"""
+import argparse
+import json
+import time
+from unittest.mock import Mock
+from uuid import uuid4
+
+from digital_letters_events import MESHInboxMessageDownloaded, MESHInboxMessageInvalid
+from mesh_acknowledge.events import DOWNLOADED_EVENT_TYPE, INVALID_EVENT_TYPE, parse_event
+from mesh_acknowledge.__tests__.fixtures import create_downloaded_event_dict, create_invalid_event_dict
+
+
+def build_record(detail):
+    """
+    Builds an SQS record as delivered from an EventBridge rule
+    """
+    return {
+        'messageId': str(uuid4()),
+        'receiptHandle': 'AQEB' + 'x' * 300,
+        'eventSource': 'aws:sqs',
+        'eventSourceARN': 'arn:aws:sqs:eu-west-2:000000000000:mesh-acknowledge-queue',
+        'attributes': {'ApproximateReceiveCount': '1', 'SentTimestamp': '1767866400000'},
+        'body': json.dumps({
+            'version': '0',
+            'id': str(uuid4()),
+            'detail-type': detail['type'],
+            'source': 'custom.event',
+            'account': '000000000000',
+            'time': '2026-01-08T10:00:00Z',
+            'region': 'eu-west-2',
+            'resources': [],
+            'detail': detail
+        })
+    }
+
+
+def build_batch(size, invalid_every):
+    """
+    Builds a batch of records, every invalid_every-th carrying an invalid event
+    """
+    return [
+        build_record(create_invalid_event_dict(str(uuid4())) if index % invalid_every == 0
+                     else create_downloaded_event_dict(str(uuid4())))
+        for index in range(size)
+    ]
+
+
+def decode_twice(record):
+    """
+    Decodes a record as mesh-acknowledge did before RecordDecoder
+    """
+    event_type = json.loads(record.get('body', '{}')).get('detail', {}).get('type', '')
+    detail = json.loads(record['body']).get('detail', {})
+
+    if event_type == INVALID_EVENT_TYPE:
+        return MESHInboxMessageInvalid(**detail)
+    if event_type == DOWNLOADED_EVENT_TYPE:
+        return MESHInboxMessageDownloaded(**detail)
+    raise ValueError(f"Unknown event type: '{event_type}'")
+
+
+def run(label, decode, batches):
+    """
+    Times decoding every record in the batches and prints the result
+    """
+    record_count = sum(len(batch) for batch in batches)
+
+    started = time.perf_counter()
+    for batch in batches:
+        for record in batch:
+            decode(record)
+    elapsed = time.perf_counter() - started
+
+    print(f'{label:<14} {record_count} records in {elapsed:.3f}s '
+          f'({elapsed / record_count * 1e6:.1f}us per record)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--batches', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=10, help='records in each SQS batch')
+    parser.add_argument('--invalid-every', type=int, default=5,
+                        help='one record in this many carries an invalid event')
+    args = parser.parse_args()
+
+    batches = [build_batch(args.batch_size, args.invalid_every) for _ in range(args.batches)]
+    logger = Mock()
+
+    # Warm up both paths so neither pays for building validators
+    run('warm-up', decode_twice, batches[:10])
+    run('warm-up', lambda record: parse_event(record, logger), batches[:10])
+
+    run('parse twice', decode_twice, batches)
+    run('RecordDecoder', lambda record: parse_event(record, logger), batches)
+
+
+if __name__ == '__main__':
+    main()
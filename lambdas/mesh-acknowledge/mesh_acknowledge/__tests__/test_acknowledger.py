@@ -7,6 +7,7 @@ import pytest
 from mesh_acknowledge.acknowledger import (
     MeshAcknowledger,
     NOTIFY_ACK_WORKFLOW_ID,
+    NOTIFY_BULK_ACK_WORKFLOW_ID,
     ACK_SUBJECT,
     NACK_SUBJECT,
 )
@@ -91,6 +92,44 @@ class TestMeshAcknowledger:
             )
 
 
+class TestMeshAcknowledgerBulk:
+    """Test suite for MeshAcknowledger.acknowledge_messages"""
+
+    def test_acknowledge_messages_sends_one_message(
+        self, acknowledger, mock_mesh_client
+    ):
+        """Test that several messages are acknowledged in one MESH message"""
+        acknowledgements = [
+            {"message_id": "MSG1", "message_reference": "REF1", "sender_id": "SENDER001"},
+            {"message_id": "MSG2", "message_reference": "REF2", "sender_id": "SENDER001"},
+        ]
+
+        result = acknowledger.acknowledge_messages("MAILBOX001", acknowledgements)
+
+        assert result == SENT_MESH_MESSAGE_ID
+        mock_mesh_client.send_message.assert_called_once_with(
+            "MAILBOX001",
+            json.dumps([
+                {"meshMessageId": "MSG1", "requestId": "SENDER001_REF1"},
+                {"meshMessageId": "MSG2", "requestId": "SENDER001_REF2"},
+            ]).encode(),
+            workflow_id=NOTIFY_BULK_ACK_WORKFLOW_ID,
+            subject=ACK_SUBJECT
+        )
+
+    def test_acknowledge_messages_raises_error_if_mesh_send_fails(
+        self, acknowledger, mock_mesh_client
+    ):
+        """Test that the MeshAcknowledger raises an error if MESH send_message fails"""
+        mock_mesh_client.send_message.side_effect = Exception("MESH send failed")
+
+        with pytest.raises(Exception, match="MESH send failed"):
+            acknowledger.acknowledge_messages(
+                "MAILBOX001",
+                [{"message_id": "MSG1", "message_reference": "REF1", "sender_id": "SENDER001"}]
+            )
+
+
 class TestMeshAcknowledgerNack:
     """Test suite for MeshAcknowledger.negative_acknowledge_message"""
 
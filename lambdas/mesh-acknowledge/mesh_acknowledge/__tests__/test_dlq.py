@@ -7,7 +7,7 @@ from unittest.mock import Mock
 import pytest
 from botocore.exceptions import ClientError
 
-from mesh_acknowledge.dlq import Dlq
+from mesh_acknowledge.dlq import MAX_BATCH_BYTES, Dlq
 
 
 @pytest.fixture(name='mock_sqs_client')
@@ -87,3 +87,84 @@ class TestSendToQueue:
 
         with pytest.raises(ClientError):
             dlq.send_to_queue(record, reason)
+
+
+@pytest.fixture(name='buffered_dlq')
+def create_buffered_dlq(mock_sqs_client, mock_logger, dlq_url):
+    """Create a buffered Dlq instance for testing"""
+    return Dlq(
+        sqs_client=mock_sqs_client,
+        dlq_url=dlq_url,
+        logger=mock_logger,
+        buffered=True
+    )
+
+
+class TestBufferedDlq:
+    """Tests for sending records to the DLQ in batches"""
+
+    def test_holds_records_until_flushed(self, buffered_dlq, mock_sqs_client, dlq_url):
+        """Test that records are only sent when the DLQ is flushed"""
+        mock_sqs_client.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        buffered_dlq.send_to_queue({"messageId": "msg-1"}, "Publish failed")
+
+        mock_sqs_client.send_message_batch.assert_not_called()
+
+        assert buffered_dlq.flush() == []
+        mock_sqs_client.send_message.assert_not_called()
+        mock_sqs_client.send_message_batch.assert_called_once_with(
+            QueueUrl=dlq_url,
+            Entries=[{
+                'Id': '0',
+                'MessageBody': json.dumps({"messageId": "msg-1"}),
+                'MessageAttributes': {
+                    'DlqReason': {'DataType': 'String', 'StringValue': "Publish failed"}
+                }
+            }]
+        )
+        assert buffered_dlq.flush() == []
+        assert mock_sqs_client.send_message_batch.call_count == 1
+
+    def test_sends_at_most_ten_records_per_call(self, buffered_dlq, mock_sqs_client):
+        """Test that records are split into batches of ten entries"""
+        mock_sqs_client.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        for index in range(25):
+            buffered_dlq.send_to_queue({"messageId": f"msg-{index}"}, "Publish failed")
+
+        buffered_dlq.flush()
+
+        batch_sizes = [len(call[1]['Entries']) for call in mock_sqs_client.send_message_batch.call_args_list]
+        assert batch_sizes == [10, 10, 5]
+
+    def test_keeps_batches_within_payload_limit(self, buffered_dlq, mock_sqs_client):
+        """Test that a batch is started early rather than exceed the payload limit"""
+        mock_sqs_client.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        body = "x" * (MAX_BATCH_BYTES // 3)
+        for index in range(4):
+            buffered_dlq.send_to_queue({"messageId": f"msg-{index}", "body": body}, "Publish failed")
+
+        buffered_dlq.flush()
+
+        batch_sizes = [len(call[1]['Entries']) for call in mock_sqs_client.send_message_batch.call_args_list]
+        assert batch_sizes == [2, 2]
+
+    def test_returns_records_that_failed(self, buffered_dlq, mock_sqs_client, mock_logger):
+        """Test that records rejected by SQS are returned and logged"""
+        mock_sqs_client.send_message_batch.return_value = {
+            'Successful': [{'Id': '0'}],
+            'Failed': [{'Id': '1', 'Code': 'InternalError', 'Message': 'Failed', 'SenderFault': False}]
+        }
+        buffered_dlq.send_to_queue({"messageId": "msg-0"}, "Publish failed")
+        buffered_dlq.send_to_queue({"messageId": "msg-1"}, "Publish failed")
+
+        assert buffered_dlq.flush() == [{"messageId": "msg-1"}]
+        mock_logger.error.assert_called_once()
+
+    def test_returns_whole_batch_on_client_error(self, buffered_dlq, mock_sqs_client):
+        """Test that every record in a batch is returned when the call itself fails"""
+        mock_sqs_client.send_message_batch.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}}, 'SendMessageBatch')
+        buffered_dlq.send_to_queue({"messageId": "msg-0"}, "Publish failed")
+        buffered_dlq.send_to_queue({"messageId": "msg-1"}, "Publish failed")
+
+        assert buffered_dlq.flush() == [{"messageId": "msg-0"}, {"messageId": "msg-1"}]
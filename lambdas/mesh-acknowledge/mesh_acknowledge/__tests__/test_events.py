@@ -11,6 +11,7 @@ import pytest
 from digital_letters_events import MESHInboxMessageAcknowledged, MESHInboxMessageDownloaded, MESHInboxMessageInvalid
 from mesh_acknowledge.events import (
     parse_downloaded_event,
+    parse_event,
     parse_invalid_event,
     publish_acknowledged_event,
     publish_negative_acknowledged_event,
@@ -334,6 +335,43 @@ class TestParseInvalidEvent:
             parse_invalid_event(sqs_record, mock_logger)
 
 
+class TestParseEvent:
+    """Test suite for parse_event function"""
+
+    def test_parse_downloaded_event(
+            self, valid_sqs_record: Dict[str, str | int],
+            downloaded_event: MESHInboxMessageDownloaded,
+            mock_logger):
+        """Test a downloaded event is parsed into its model"""
+        assert parse_event(valid_sqs_record, mock_logger) == downloaded_event
+
+    def test_parse_invalid_event(
+            self, valid_invalid_sqs_record: Dict[str, str | int],
+            invalid_event: MESHInboxMessageInvalid,
+            mock_logger):
+        """Test an invalid event is parsed into its model"""
+        assert parse_event(valid_invalid_sqs_record, mock_logger) == invalid_event
+
+    def test_parse_unknown_event_type(self, event_id: str, mock_logger):
+        """Test events of another type are rejected"""
+        sqs_record = {'body': json.dumps({'detail': {
+            **create_downloaded_event_dict(event_id),
+            'type': 'uk.nhs.notify.digital.letters.mesh.inbox.message.received.v1'
+        }})}
+
+        with pytest.raises(
+                ValueError,
+                match="Unknown event type: 'uk.nhs.notify.digital.letters.mesh.inbox.message.received.v1'"):
+            parse_event(sqs_record, mock_logger)
+
+        mock_logger.error.assert_called_once()
+
+    def test_parse_event_json_decode_error(self, mock_logger):
+        """Test handling JSON decode errors"""
+        with pytest.raises(ValueError, match="Error parsing SQS record"):
+            parse_event({'body': 'not valid json'}, mock_logger)
+
+
 class TestPublishNackAcknowledgedEvent:
     """Test suite for publish_negative_acknowledged_event function"""
 
@@ -1,10 +1,10 @@
 """
 Tests for Lambda handler in mesh_acknowledge.handler
 """
-from unittest.mock import Mock, MagicMock, patch, call
+from unittest.mock import ANY, Mock, MagicMock, patch, call
 
 import pytest
-from dl_utils import log
+from dl_utils import SqsBatchRunner, log
 from mesh_acknowledge.handler import handler
 
 
@@ -23,6 +23,11 @@ def setup_mocks(config_cls,
     config.event_publisher_dlq_url = "https://sqs.eu-west-2.amazonaws.com/123456789012/event-dlq"
     config.dlq_url = "https://sqs.eu-west-2.amazonaws.com/123456789012/dlq"
     config.mesh_client = Mock()
+    config.batch_minimum_remaining_millis = 5000
+    config.acknowledge_max_workers = 1
+    config.dlq_buffered = False
+    config.metric_namespace = "dl-mesh-acknowledge"
+    config.environment = "test"
 
     config_cm = MagicMock()
     config_cm.__enter__.return_value = config
@@ -158,6 +163,7 @@ class TestHandler:
             sqs_client=boto_client,
             dlq_url=config.dlq_url,
             logger=log,
+            buffered=config.dlq_buffered,
         )
         message_processor_cls.assert_called_once_with(
             acknowledger=acknowledger,
@@ -165,7 +171,13 @@ class TestHandler:
             sender_lookup=sender_lookup,
             dlq=dlq,
             logger=log,
+            batch_runner=ANY,
+            max_workers=1,
+            build_mesh_client=config.build_mesh_client,
+            acknowledgement_store=config.acknowledgement_store,
+            bulk_acknowledge=config.acknowledge_bulk,
         )
+        assert isinstance(message_processor_cls.call_args[1]['batch_runner'], SqsBatchRunner)
         assert boto3_client_cls.call_count == 2
         boto3_client_cls.assert_has_calls([
             call("ssm"),
@@ -1,10 +1,13 @@
 """
 Tests for MessageProcessor class in mesh_acknowledge.message_processor
 """
+import threading
 from unittest.mock import Mock, patch
 from uuid import uuid4
 import pytest
 from digital_letters_events import MESHInboxMessageDownloaded, MESHInboxMessageInvalid
+from dl_utils import InMemoryTtlStore, SqsBatchRunner
+from mesh_acknowledge.dlq import Dlq
 from mesh_acknowledge.message_processor import MessageProcessor
 
 from .fixtures import create_downloaded_event_dict, create_invalid_event_dict
@@ -48,6 +51,7 @@ def create_mock_dlq():
     """Create a mock Dlq for testing"""
     dlq = Mock()
     dlq.send_to_queue = Mock()
+    dlq.buffered = False
     return dlq
 
 @pytest.fixture(name='message_processor')
@@ -91,7 +95,7 @@ class TestMessageProcessorProcessMessage:
     """Test suite for MessageProcessor.process_message"""
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_success(
         self,
         mock_parse,
@@ -136,7 +140,7 @@ class TestMessageProcessorProcessMessage:
         )
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_multiple_records(
         self,
         mock_parse,
@@ -169,7 +173,7 @@ class TestMessageProcessorProcessMessage:
         assert mock_publish.call_count == 3
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_partial_failures(
         self,
         mock_parse,
@@ -208,7 +212,7 @@ class TestMessageProcessorProcessMessage:
         assert mock_publish.call_count == 2
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_all_failures(
         self,
         mock_parse,
@@ -273,7 +277,7 @@ class TestMessageProcessorProcessMessage:
         mock_publish.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_parse_error_returns_failure(
         self,
         mock_parse,
@@ -294,7 +298,7 @@ class TestMessageProcessorProcessMessage:
         mock_publish.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_empty_sender_lookup_response_returns_failure(
         self,
         mock_parse,
@@ -318,7 +322,7 @@ class TestMessageProcessorProcessMessage:
         mock_publish.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_sender_lookup_error_returns_failure(
         self,
         mock_parse,
@@ -343,7 +347,7 @@ class TestMessageProcessorProcessMessage:
         mock_publish.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_acknowledge_error_returns_failure(
         self,
         mock_parse,
@@ -368,7 +372,7 @@ class TestMessageProcessorProcessMessage:
         mock_publish.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_publish_error_sends_to_dlq(
         self,
         mock_parse,
@@ -397,7 +401,7 @@ class TestMessageProcessorProcessMessage:
         )
 
     @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_dlq_error_returns_failure(
         self,
         mock_parse,
@@ -423,7 +427,7 @@ class TestMessageProcessorProcessMessage:
         assert len(result) == 1
         assert result[0] == {"itemIdentifier": "sqs-msg-123"}
 
-    @patch('mesh_acknowledge.message_processor.parse_downloaded_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_message_logs_summary(
         self,
         mock_parse,
@@ -462,6 +466,264 @@ class TestMessageProcessorProcessMessage:
         assert final_log_call[1]['failed'] == 1
 
 
+class TestMessageProcessorTimeBudget:
+    """Test suite for MessageProcessor running out of time"""
+
+    def test_process_message_releases_records_not_started_in_time(
+        self,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        valid_sqs_message
+    ):
+        """Test that records are returned for retry, unprocessed, once time runs short"""
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            mock_dlq,
+            mock_logger,
+            batch_runner=SqsBatchRunner(
+                logger=mock_logger,
+                outcomes=('acknowledged',),
+                get_remaining_time_in_millis=lambda: 4000,
+                minimum_remaining_millis=5000
+            )
+        )
+
+        result = message_processor.process_message(valid_sqs_message)
+
+        assert result == [{"itemIdentifier": "sqs-msg-123"}]
+        mock_acknowledger.acknowledge_message.assert_not_called()
+        final_log_call = mock_logger.info.call_args_list[-1]
+        assert final_log_call[1]['unstarted'] == 1
+        assert final_log_call[1]['failed'] == 0
+
+
+def build_sqs_message(record_count):
+    """Create an SQS message with record_count downloaded event records"""
+    return {
+        'Records': [
+            {'messageId': f'msg-{index}', 'eventSource': 'aws:sqs',
+                'body': '{"detail": {"type": "uk.nhs.notify.digital.letters.mesh.inbox.message.downloaded.v1"}}'}
+            for index in range(record_count)
+        ]
+    }
+
+
+class TestMessageProcessorConcurrency:
+    """Test suite for MessageProcessor acknowledging records concurrently"""
+
+    @patch('mesh_acknowledge.message_processor.MeshAcknowledger')
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_uses_a_mesh_client_per_worker(
+        self,
+        mock_parse,
+        mock_publish,
+        acknowledger_cls,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        downloaded_event
+    ):
+        """Test that records are acknowledged at the same time, each worker with its own client"""
+        mock_parse.return_value = downloaded_event
+        # Every acknowledgement waits for the others, so this only passes if they run together
+        barrier = threading.Barrier(3, timeout=5)
+
+        def acknowledge(**_):
+            barrier.wait()
+            return "ACK123"
+
+        mock_acknowledger.acknowledge_message.side_effect = acknowledge
+        acknowledger_cls.side_effect = lambda mesh_client, logger: Mock(
+            acknowledge_message=Mock(side_effect=acknowledge))
+        mesh_clients = [Mock(), Mock()]
+        build_mesh_client = Mock(side_effect=mesh_clients)
+
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            mock_dlq,
+            mock_logger,
+            max_workers=3,
+            build_mesh_client=build_mesh_client
+        )
+
+        result = message_processor.process_message(build_sqs_message(3))
+
+        assert result == []
+        assert mock_acknowledger.acknowledge_message.call_count == 1
+        assert build_mesh_client.call_count == 2
+        acknowledger_cls.assert_any_call(mesh_clients[0], mock_logger)
+        acknowledger_cls.assert_any_call(mesh_clients[1], mock_logger)
+        assert mock_publish.call_count == 3
+        for mesh_client in mesh_clients:
+            mesh_client.close.assert_called_once()
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_worker_client_failure_fails_only_its_record(
+        self,
+        mock_parse,
+        _mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        downloaded_event
+    ):
+        """Test that a worker which cannot connect to MESH fails its own record only"""
+        mock_parse.return_value = downloaded_event
+        client_failed = threading.Event()
+
+        def acknowledge(**_):
+            client_failed.wait(timeout=5)
+            return "ACK123"
+
+        def build_mesh_client():
+            client_failed.set()
+            raise ConnectionError("MESH unavailable")
+
+        mock_acknowledger.acknowledge_message.side_effect = acknowledge
+
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            mock_dlq,
+            mock_logger,
+            max_workers=2,
+            build_mesh_client=build_mesh_client
+        )
+
+        result = message_processor.process_message(build_sqs_message(2))
+
+        assert len(result) == 1
+        assert mock_acknowledger.acknowledge_message.call_count == 1
+        mock_dlq.send_to_queue.assert_not_called()
+
+    @patch('mesh_acknowledge.message_processor.MeshAcknowledger')
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_publish_error_sends_to_dlq(
+        self,
+        mock_parse,
+        mock_publish,
+        _acknowledger_cls,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        downloaded_event
+    ):
+        """Test that records already acknowledged still go to the DLQ when publishing fails"""
+        mock_parse.return_value = downloaded_event
+        mock_publish.side_effect = Exception("Publish failed")
+        message = build_sqs_message(4)
+
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            mock_dlq,
+            mock_logger,
+            max_workers=2,
+            build_mesh_client=Mock
+        )
+
+        result = message_processor.process_message(message)
+
+        assert result == []
+        assert mock_dlq.send_to_queue.call_count == 4
+        sent_records = [call[1]['record'] for call in mock_dlq.send_to_queue.call_args_list]
+        assert sorted(record['messageId'] for record in sent_records) == \
+            [record['messageId'] for record in message['Records']]
+
+
+class TestMessageProcessorBufferedDlq:
+    """Test suite for MessageProcessor with a buffered DLQ"""
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_sends_dlq_records_in_one_batch(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_logger,
+        downloaded_event
+    ):
+        """Test that records are sent to the DLQ together once the batch is processed"""
+        mock_parse.return_value = downloaded_event
+        mock_publish.side_effect = Exception("Publish failed")
+        sqs_client = Mock()
+        sqs_client.send_message_batch.return_value = {
+            'Successful': [{'Id': '0'}, {'Id': '1'}, {'Id': '2'}], 'Failed': []}
+        dlq = Dlq(sqs_client=sqs_client, dlq_url="dlq-url", logger=mock_logger, buffered=True)
+
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            dlq,
+            mock_logger
+        )
+
+        result = message_processor.process_message(build_sqs_message(3))
+
+        assert result == []
+        sqs_client.send_message.assert_not_called()
+        sqs_client.send_message_batch.assert_called_once()
+        assert len(sqs_client.send_message_batch.call_args[1]['Entries']) == 3
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_fails_records_not_sent_to_dlq(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_logger,
+        downloaded_event
+    ):
+        """Test that records the DLQ rejects are returned as batch item failures"""
+        mock_parse.return_value = downloaded_event
+        mock_publish.side_effect = Exception("Publish failed")
+        sqs_client = Mock()
+        sqs_client.send_message_batch.return_value = {
+            'Successful': [{'Id': '0'}, {'Id': '2'}],
+            'Failed': [{'Id': '1', 'Code': 'InternalError', 'Message': 'Failed', 'SenderFault': False}]}
+        dlq = Dlq(sqs_client=sqs_client, dlq_url="dlq-url", logger=mock_logger, buffered=True)
+
+        message_processor = MessageProcessor(
+            mock_acknowledger,
+            mock_event_publisher,
+            mock_sender_lookup,
+            dlq,
+            mock_logger
+        )
+
+        result = message_processor.process_message(build_sqs_message(3))
+
+        assert result == [{"itemIdentifier": "msg-1"}]
+        final_log_call = mock_logger.info.call_args_list[-1]
+        assert final_log_call[1]['acknowledged'] == 2
+        assert final_log_call[1]['failed'] == 1
+
+
 @pytest.fixture(name='invalid_event')
 def invalid_event_fixture():
     """Create a MESHInboxMessageInvalid event"""
@@ -492,7 +754,7 @@ class TestMessageProcessorInvalidEvent:
     """Test suite for MessageProcessor handling of MESHInboxMessageInvalid events"""
 
     @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_invalid_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_invalid_event_success(
         self,
         mock_parse_invalid,
@@ -538,7 +800,7 @@ class TestMessageProcessorInvalidEvent:
         )
 
     @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_invalid_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_invalid_event_unknown_sender_returns_failure(
         self,
         mock_parse_invalid,
@@ -562,7 +824,7 @@ class TestMessageProcessorInvalidEvent:
         mock_publish_nack.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_invalid_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_invalid_event_nack_error_returns_failure(
         self,
         mock_parse_invalid,
@@ -586,7 +848,7 @@ class TestMessageProcessorInvalidEvent:
         mock_publish_nack.assert_not_called()
 
     @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_invalid_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_invalid_event_publish_error_sends_to_dlq(
         self,
         mock_parse_invalid,
@@ -615,7 +877,7 @@ class TestMessageProcessorInvalidEvent:
         )
 
     @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
-    @patch('mesh_acknowledge.message_processor.parse_invalid_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
     def test_process_invalid_event_dlq_error_returns_failure(
         self,
         mock_parse_invalid,
@@ -638,3 +900,257 @@ class TestMessageProcessorInvalidEvent:
 
         assert len(result) == 1
         assert result[0] == {"itemIdentifier": "sqs-msg-invalid-123"}
+
+
+class TestMessageProcessorAcknowledgementStore:
+    """Test suite for MessageProcessor remembering the acknowledgements it has sent"""
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_remembers_acknowledgement(
+        self,
+        mock_parse,
+        _mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        valid_sqs_message,
+        downloaded_event
+    ):
+        """Test that the acknowledgement sent is stored against the MESH message ID"""
+        mock_parse.return_value = downloaded_event
+        store = InMemoryTtlStore(60)
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            acknowledgement_store=store
+        )
+
+        assert message_processor.process_message(valid_sqs_message) == []
+        assert store.get(downloaded_event.data.meshMessageId) == "ACK123"
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_redelivery_reuses_acknowledgement(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        valid_sqs_message,
+        downloaded_event
+    ):
+        """Test that a redelivered record only publishes the event again"""
+        mock_parse.return_value = downloaded_event
+        store = InMemoryTtlStore(60)
+        store.put(downloaded_event.data.meshMessageId, "ACK-EARLIER")
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            acknowledgement_store=store
+        )
+
+        assert message_processor.process_message(valid_sqs_message) == []
+        mock_acknowledger.acknowledge_message.assert_not_called()
+        assert mock_publish.call_args[1]['sent_mesh_message_id'] == "ACK-EARLIER"
+
+    @patch('mesh_acknowledge.message_processor.publish_negative_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_redelivery_reuses_negative_acknowledgement(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        invalid_sqs_message,
+        invalid_event
+    ):
+        """Test that a redelivered invalid record does not send a second NACK"""
+        mock_parse.return_value = invalid_event
+        store = InMemoryTtlStore(60)
+        store.put(invalid_event.data.meshMessageId, "NACK-EARLIER")
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            acknowledgement_store=store
+        )
+
+        assert message_processor.process_message(invalid_sqs_message) == []
+        mock_acknowledger.negative_acknowledge_message.assert_not_called()
+        assert mock_publish.call_args[1]['sent_mesh_message_id'] == "NACK-EARLIER"
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_store_failure_still_acknowledges(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger,
+        valid_sqs_message,
+        downloaded_event
+    ):
+        """Test that a store which cannot be read or written does not fail the record"""
+        mock_parse.return_value = downloaded_event
+        store = Mock()
+        store.get.side_effect = Exception("S3 unavailable")
+        store.put.side_effect = Exception("S3 unavailable")
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            acknowledgement_store=store
+        )
+
+        assert message_processor.process_message(valid_sqs_message) == []
+        mock_acknowledger.acknowledge_message.assert_called_once()
+        assert mock_publish.call_args[1]['sent_mesh_message_id'] == "ACK123"
+        assert mock_logger.warn.call_count == 2
+
+
+def build_downloaded_events(*mesh_message_ids):
+    """Create a MESHInboxMessageDownloaded event for each MESH message ID"""
+    events = []
+    for mesh_message_id in mesh_message_ids:
+        event_dict = create_downloaded_event_dict(str(uuid4()))
+        event_dict['data'] = {**event_dict['data'], 'meshMessageId': mesh_message_id}
+        events.append(MESHInboxMessageDownloaded(**event_dict))
+    return events
+
+
+class TestMessageProcessorBulkAcknowledge:
+    """Test suite for MessageProcessor acknowledging each mailbox's messages together"""
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_sends_one_acknowledgement_per_mailbox(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger
+    ):
+        """Test that acknowledgements are coalesced by mailbox and share a sent message ID"""
+        mock_parse.side_effect = build_downloaded_events("MSG1", "MSG2", "MSG3")
+        mock_sender_lookup.get_mailbox_id.side_effect = ["MAILBOX_A", "MAILBOX_B", "MAILBOX_A"]
+        mock_acknowledger.acknowledge_messages.side_effect = ["BULK_A", "BULK_B"]
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            bulk_acknowledge=True
+        )
+
+        result = message_processor.process_message(build_sqs_message(3))
+
+        assert result == []
+        mock_acknowledger.acknowledge_message.assert_not_called()
+        bulk_calls = mock_acknowledger.acknowledge_messages.call_args_list
+        assert [call[1]['mailbox_id'] for call in bulk_calls] == ["MAILBOX_A", "MAILBOX_B"]
+        assert [entry['message_id'] for entry in bulk_calls[0][1]['acknowledgements']] == \
+            ["MSG1", "MSG3"]
+        sent_ids = {
+            call[1]['incoming_event'].data.meshMessageId: call[1]['sent_mesh_message_id']
+            for call in mock_publish.call_args_list
+        }
+        assert sent_ids == {"MSG1": "BULK_A", "MSG2": "BULK_B", "MSG3": "BULK_A"}
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_bulk_send_failure_fails_mailbox_records(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger
+    ):
+        """Test that the records of a mailbox whose acknowledgement fails are retried"""
+        mock_parse.side_effect = build_downloaded_events("MSG1", "MSG2", "MSG3")
+        mock_sender_lookup.get_mailbox_id.side_effect = ["MAILBOX_A", "MAILBOX_B", "MAILBOX_A"]
+        mock_acknowledger.acknowledge_messages.side_effect = [Exception("MESH send failed"), "BULK_B"]
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            bulk_acknowledge=True
+        )
+
+        result = message_processor.process_message(build_sqs_message(3))
+
+        assert result == [{"itemIdentifier": "msg-0"}, {"itemIdentifier": "msg-2"}]
+        assert mock_publish.call_count == 1
+        final_log_call = mock_logger.info.call_args_list[-1]
+        assert final_log_call[1]['acknowledged'] == 1
+        assert final_log_call[1]['failed'] == 2
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_bulk_publish_error_sends_to_dlq(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger
+    ):
+        """Test that records acknowledged in bulk still go to the DLQ when publishing fails"""
+        mock_parse.side_effect = build_downloaded_events("MSG1", "MSG2")
+        mock_acknowledger.acknowledge_messages.return_value = "BULK_A"
+        mock_publish.side_effect = Exception("Publish failed")
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            bulk_acknowledge=True
+        )
+
+        result = message_processor.process_message(build_sqs_message(2))
+
+        assert result == []
+        assert mock_dlq.send_to_queue.call_count == 2
+
+    @patch('mesh_acknowledge.message_processor.publish_acknowledged_event')
+    @patch('mesh_acknowledge.message_processor.parse_event')
+    def test_process_message_bulk_reuses_stored_acknowledgements(
+        self,
+        mock_parse,
+        mock_publish,
+        mock_acknowledger,
+        mock_event_publisher,
+        mock_sender_lookup,
+        mock_dlq,
+        mock_logger
+    ):
+        """Test that messages already acknowledged are not included in the bulk acknowledgement"""
+        mock_parse.side_effect = build_downloaded_events("MSG1", "MSG2")
+        mock_acknowledger.acknowledge_messages.return_value = "BULK_A"
+        store = InMemoryTtlStore(60)
+        store.put("MSG1", "ACK-EARLIER")
+
+        message_processor = MessageProcessor(
+            mock_acknowledger, mock_event_publisher, mock_sender_lookup, mock_dlq, mock_logger,
+            acknowledgement_store=store,
+            bulk_acknowledge=True
+        )
+
+        assert message_processor.process_message(build_sqs_message(2)) == []
+        acknowledgements = mock_acknowledger.acknowledge_messages.call_args[1]['acknowledgements']
+        assert [entry['message_id'] for entry in acknowledgements] == ["MSG2"]
+        assert store.get("MSG2") == "BULK_A"
+        assert sorted(call[1]['sent_mesh_message_id'] for call in mock_publish.call_args_list) == \
+            ["ACK-EARLIER", "BULK_A"]
@@ -1,10 +1,12 @@
 """Module for acknowledging MESH messages."""
 
 import json
+from typing import Dict, List
 from mesh_client import MeshClient
 from dl_utils import get_failure_code_description
 
 NOTIFY_ACK_WORKFLOW_ID = "NHS_NOTIFY_FHIR_ACK"
+NOTIFY_BULK_ACK_WORKFLOW_ID = "NHS_NOTIFY_FHIR_BULK_ACK"
 ACK_SUBJECT = "202"
 NACK_SUBJECT = "400"
 
@@ -76,6 +78,62 @@ class MeshAcknowledger:
 
             raise
 
+    def acknowledge_messages(self,
+                             mailbox_id: str,
+                             acknowledgements: List[Dict[str, str]]
+                             ) -> str:
+        """
+        Acknowledge several MESH messages from the same mailbox in one MESH message.
+
+        Args:
+            mailbox_id (str): The ID of the mailbox to send the acknowledgment to.
+            acknowledgements (List[Dict[str, str]]): The message_id, message_reference
+                and sender_id of each message to acknowledge.
+
+        Returns:
+            str: The ID of the acknowledgment message sent.
+
+        Raises:
+            Exception: If the acknowledgment fails.
+        """
+
+        message_body = json.dumps([
+            {
+                "meshMessageId": acknowledgement["message_id"],
+                "requestId": (
+                    f"{acknowledgement['sender_id']}_{acknowledgement['message_reference']}"
+                )
+            }
+            for acknowledgement in acknowledgements
+        ]).encode()
+        message_ids = [acknowledgement["message_id"] for acknowledgement in acknowledgements]
+
+        try:
+            ack_message_id = self.__mesh_client.send_message(
+                mailbox_id,
+                message_body,
+                workflow_id=NOTIFY_BULK_ACK_WORKFLOW_ID,
+                subject=ACK_SUBJECT
+            )
+            self.__log.info(
+                "Acknowledged MESH messages",
+                mesh_mailbox_id=mailbox_id,
+                mesh_message_ids=message_ids,
+                ack_message_id=ack_message_id
+            )
+
+            return ack_message_id
+
+        except Exception as e:
+            self.__log.error(
+                "Failed to acknowledge MESH messages",
+                mesh_mailbox_id=mailbox_id,
+                mesh_message_ids=message_ids,
+                error=str(e)
+            )
+
+            raise
+
     def negative_acknowledge_message(self,
                                     mailbox_id: str,
                                     message_id: str,
@@ -1,7 +1,7 @@
 """
 Module for configuring MESH Acknowledger application
 """
-from dl_utils import BaseMeshConfig
+from dl_utils import DEFAULT_MINIMUM_REMAINING_MILLIS, BaseMeshConfig, build_ttl_store
 
 _REQUIRED_ENV_VAR_MAP = {
     "ssm_mesh_prefix": "SSM_MESH_PREFIX",
@@ -12,6 +12,25 @@ _REQUIRED_ENV_VAR_MAP = {
     "dlq_url": "DLQ_URL",
 }
 
+_OPTIONAL_ENV_VAR_MAP = {
+    **BaseMeshConfig._OPTIONAL_ENV_VAR_MAP,  # pylint: disable=protected-access
+    "metric_namespace": "ACKNOWLEDGE_METRIC_NAMESPACE",
+    "batch_minimum_remaining_millis": "BATCH_MINIMUM_REMAINING_MILLIS",
+    "acknowledge_max_workers": "ACKNOWLEDGE_MAX_WORKERS",
+    "dlq_buffered": "DLQ_BUFFERED",
+    "acknowledgement_ttl_seconds": "ACKNOWLEDGEMENT_TTL_SECONDS",
+    "acknowledgement_store_uri": "ACKNOWLEDGEMENT_STORE_URI",
+    "acknowledge_bulk": "ACKNOWLEDGE_BULK",
+}
+
+DEFAULT_METRIC_NAMESPACE = "dl-mesh-acknowledge"
+
+# Acknowledgements sent are remembered for a day unless ACKNOWLEDGEMENT_TTL_SECONDS is set
+DEFAULT_ACKNOWLEDGEMENT_TTL_SECONDS = 24 * 60 * 60
+
+# Stores are kept at module level so that they stay warm between invocations
+_ACKNOWLEDGEMENT_STORES = {}
+
 
 class Config(BaseMeshConfig):
     """
@@ -21,3 +40,53 @@ class Config(BaseMeshConfig):
     """
 
     _REQUIRED_ENV_VAR_MAP = _REQUIRED_ENV_VAR_MAP
+    _OPTIONAL_ENV_VAR_MAP = _OPTIONAL_ENV_VAR_MAP
+    _BOOLEAN_ENV_VARS = {*BaseMeshConfig._BOOLEAN_ENV_VARS, "dlq_buffered", "acknowledge_bulk"}
+
+    def __init__(self, ssm=None, s3_client=None):
+        self.metric_namespace = DEFAULT_METRIC_NAMESPACE
+        # Time left in reserve when deciding whether to start another SQS record
+        self.batch_minimum_remaining_millis = DEFAULT_MINIMUM_REMAINING_MILLIS
+        # SQS records are acknowledged one at a time unless ACKNOWLEDGE_MAX_WORKERS is set
+        self.acknowledge_max_workers = 1
+        # Records are sent to the DLQ as they fail unless DLQ_BUFFERED is set
+        self.dlq_buffered = False
+        # Acknowledgements are remembered unless ACKNOWLEDGEMENT_TTL_SECONDS is 0, and
+        # only kept in S3 as well when ACKNOWLEDGEMENT_STORE_URI is set
+        self.acknowledgement_ttl_seconds = DEFAULT_ACKNOWLEDGEMENT_TTL_SECONDS
+        self.acknowledgement_store_uri = None
+        # Each message gets its own acknowledgement unless ACKNOWLEDGE_BULK is set, when
+        # the messages from each mailbox in a batch are acknowledged together
+        self.acknowledge_bulk = False
+
+        super().__init__(ssm=ssm, s3_client=s3_client)
+
+        self.acknowledgement_store = None
+
+    def __enter__(self):
+        super().__enter__()
+
+        # Build store of acknowledgements already sent, used to avoid sending them again
+        self.acknowledgement_store = self.build_acknowledgement_store()
+
+        return self
+
+    def build_acknowledgement_store(self):
+        """
+        Returns a store of the acknowledgement sent for each MESH message, or None when
+        ACKNOWLEDGEMENT_TTL_SECONDS is 0 or less. Entries are kept in memory and, when
+        ACKNOWLEDGEMENT_STORE_URI is set, in S3 so they survive cold starts.
+        """
+        ttl_seconds = int(self.acknowledgement_ttl_seconds)
+        if ttl_seconds <= 0:
+            return None
+
+        store_key = (ttl_seconds, self.acknowledgement_store_uri)
+        if store_key not in _ACKNOWLEDGEMENT_STORES:
+            _ACKNOWLEDGEMENT_STORES[store_key] = build_ttl_store(
+                store_key[0],
+                s3_client=self.s3_client,
+                s3_uri=self.acknowledgement_store_uri
+            )
+
+        return _ACKNOWLEDGEMENT_STORES[store_key]
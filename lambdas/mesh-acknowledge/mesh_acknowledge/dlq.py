@@ -1,36 +1,53 @@
 """Dead Letter Queue (DLQ) handler for sending failed records to SQS DLQ."""
-from typing import Any
+import threading
+from typing import Any, Dict, List
 import json
 
 from botocore.exceptions import ClientError
 
+# Limits on a single SQS send_message_batch call
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+DLQ_REASON_ATTRIBUTE = 'DlqReason'
+
+
 class Dlq:
     """
-    Dead Letter Queue (DLQ) handler for sending failed records to SQS DLQ."""
+    Dead Letter Queue (DLQ) handler for sending failed records to SQS DLQ.
+
+    In buffered mode records are collected by send_to_queue and sent by flush,
+    normally at the end of an SQS batch, in as few send_message_batch calls as
+    the SQS entry count and payload size limits allow.
+    """
     def __init__(
         self,
         sqs_client: Any,
         dlq_url: str,
         logger,
+        buffered: bool = False,
     ):
         self.sqs_client = sqs_client
         self.dlq_url = dlq_url
         self.logger = logger
+        self.buffered = buffered
+        self.__buffer = []
+        self.__lock = threading.Lock()
 
     def send_to_queue(self, record: Any, reason: str) -> None:
         """
-        Send a record to the DLQ.
+        Send a record to the DLQ, or hold it for the next flush in buffered mode.
         """
+        if self.buffered:
+            with self.__lock:
+                self.__buffer.append((record, reason))
+            return
+
         try:
             response = self.sqs_client.send_message(
                 QueueUrl=self.dlq_url,
                 MessageBody=json.dumps(record),
-                MessageAttributes={
-                    'DlqReason': {
-                        'DataType': 'String',
-                        'StringValue': reason
-                    }
-                }
+                MessageAttributes=_reason_attributes(reason)
             )
             self.logger.info(
                 "Sent message to DLQ",
@@ -44,3 +61,104 @@ class Dlq:
                 dlq_url=self.dlq_url,
             )
             raise
+
+    def flush(self) -> List[Any]:
+        """
+        Send the buffered records to the DLQ, returning the records that could
+        not be sent.
+        """
+        with self.__lock:
+            buffered, self.__buffer = self.__buffer, []
+
+        entries = [_build_entry(index, record, reason)
+                   for index, (record, reason) in enumerate(buffered)]
+
+        failed_records = []
+        for batch in _batches(entries):
+            failed_ids = self.__send_batch(batch)
+            failed_records.extend(buffered[int(entry_id)][0] for entry_id in failed_ids)
+
+        return failed_records
+
+    def __send_batch(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Send one batch of entries to the DLQ, returning the IDs of those that failed.
+        """
+        try:
+            response = self.sqs_client.send_message_batch(
+                QueueUrl=self.dlq_url,
+                Entries=entries
+            )
+        except ClientError as error:
+            self.logger.error(
+                "Failed to send records to DLQ",
+                error=str(error),
+                dlq_url=self.dlq_url,
+                batch_size=len(entries),
+            )
+            return [entry['Id'] for entry in entries]
+
+        for failed_entry in response.get('Failed', []):
+            self.logger.error(
+                "Failed to send record to DLQ",
+                error_code=failed_entry.get('Code'),
+                error=failed_entry.get('Message'),
+                dlq_url=self.dlq_url,
+            )
+
+        self.logger.info(
+            "Sent messages to DLQ",
+            sent=len(response.get('Successful', [])),
+            failed=len(response.get('Failed', [])),
+            dlq_url=self.dlq_url,
+        )
+
+        return [failed_entry.get('Id') for failed_entry in response.get('Failed', [])]
+
+
+def _reason_attributes(reason: str) -> Dict[str, Any]:
+    return {
+        DLQ_REASON_ATTRIBUTE: {
+            'DataType': 'String',
+            'StringValue': reason
+        }
+    }
+
+
+def _build_entry(index: int, record: Any, reason: str) -> Dict[str, Any]:
+    return {
+        'Id': str(index),
+        'MessageBody': json.dumps(record),
+        'MessageAttributes': _reason_attributes(reason)
+    }
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    """
+    The size SQS counts towards the batch payload limit: the body plus the name,
+    type and value of each message attribute.
+    """
+    size = len(entry['MessageBody'].encode('utf-8'))
+    for name, attribute in entry['MessageAttributes'].items():
+        size += len(name.encode('utf-8')) + len(attribute['DataType'].encode('utf-8')) + \
+            len(attribute['StringValue'].encode('utf-8'))
+    return size
+
+
+def _batches(entries: List[Dict[str, Any]]):
+    """
+    Group entries into batches within the entry count and payload size limits. An
+    entry too large to share a batch is sent on its own.
+    """
+    batch, batch_bytes = [], 0
+    for entry in entries:
+        size = _entry_size(entry)
+        if batch and (len(batch) == MAX_BATCH_ENTRIES or batch_bytes + size > MAX_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+
+        batch.append(entry)
+        batch_bytes += size
+
+    if batch:
+        yield batch
@@ -1,64 +1,69 @@
 """Event parsing and publishing for MESH acknowledge lambda."""
 
-import json
 from datetime import datetime, timezone
 from uuid import uuid4
 from digital_letters_events import MESHInboxMessageAcknowledged, MESHInboxMessageDownloaded, MESHInboxMessageInvalid
-from dl_utils import EventPublisher
+from dl_utils import EventPublisher, RecordDecoder
+from dl_utils.record_decoder import INVALID_JSON, MISSING_BODY, UNKNOWN_EVENT_TYPE
+
+
+DOWNLOADED_EVENT_TYPE = 'uk.nhs.notify.digital.letters.mesh.inbox.message.downloaded.v1'
+INVALID_EVENT_TYPE = 'uk.nhs.notify.digital.letters.mesh.inbox.message.invalid.v1'
+
+_EVENT_DECODER = RecordDecoder({
+    DOWNLOADED_EVENT_TYPE: MESHInboxMessageDownloaded,
+    INVALID_EVENT_TYPE: MESHInboxMessageInvalid,
+})
+_DOWNLOADED_EVENT_DECODER = RecordDecoder({DOWNLOADED_EVENT_TYPE: MESHInboxMessageDownloaded})
+_INVALID_EVENT_DECODER = RecordDecoder({INVALID_EVENT_TYPE: MESHInboxMessageInvalid})
+
+
+def parse_event(sqs_record, logger) -> MESHInboxMessageDownloaded | MESHInboxMessageInvalid:
+    """
+    Parses and validates a MESHInboxMessageDownloaded or MESHInboxMessageInvalid
+    event from an SQS record, parsing the record body once.
+    """
+    return _decode(_EVENT_DECODER, sqs_record, logger, 'CloudEvent')
 
 
 def parse_downloaded_event(sqs_record, logger) -> MESHInboxMessageDownloaded:
     """
     Parses and validates a MESHInboxMessageDownloaded event from an SQS record.
     """
-    try:
-        message_body = json.loads(sqs_record['body'])
-        event_detail = message_body.get('detail', {})
-
-        try:
-            return MESHInboxMessageDownloaded(**event_detail)
-
-        except Exception as e:
-            logger.error(
-                "MESHInboxMessageDownloaded validation failed",
-                validation_errors=str(e),
-                event_detail=event_detail
-            )
-            raise ValueError(
-                "Error processing MESHInboxMessageDownloaded event") from e
-    except json.JSONDecodeError as e:
-        logger.error(
-            "Error parsing SQS record body as JSON",
-            body=sqs_record.get('body', ''),
-            error=str(e)
-        )
-        raise ValueError("Error parsing SQS record") from e
+    return _decode(_DOWNLOADED_EVENT_DECODER, sqs_record, logger, 'MESHInboxMessageDownloaded')
 
 
 def parse_invalid_event(sqs_record, logger) -> MESHInboxMessageInvalid:
     """
     Parses and validates a MESHInboxMessageInvalid event from an SQS record.
     """
-    try:
-        message_body = json.loads(sqs_record['body'])
-        event_detail = message_body.get('detail', {})
-        try:
-            return MESHInboxMessageInvalid(**event_detail)
-        except Exception as e:
-            logger.error(
-                "MESHInboxMessageInvalid validation failed",
-                validation_errors=str(e),
-                event_detail=event_detail
-            )
-            raise ValueError(
-                "Error processing MESHInboxMessageInvalid event") from e
-    except json.JSONDecodeError as e:
+    return _decode(_INVALID_EVENT_DECODER, sqs_record, logger, 'MESHInboxMessageInvalid')
+
+
+def _decode(decoder: RecordDecoder, sqs_record, logger, event_name):
+    decoded = decoder.decode(sqs_record)
+    if decoded.error is None:
+        return decoded.event
+
+    error = decoded.error
+    if error.reason in (MISSING_BODY, INVALID_JSON):
         logger.error(
             "Error parsing SQS record body as JSON",
             body=sqs_record.get('body', ''),
-            error=str(e)
+            error=str(error)
         )
-        raise ValueError("Error parsing SQS record") from e
+        raise ValueError("Error parsing SQS record") from error
+
+    if error.reason == UNKNOWN_EVENT_TYPE:
+        logger.error(f"{event_name} has an unknown event type", event_type=error.event_type)
+        raise ValueError(str(error)) from error
+
+    logger.error(
+        f"{event_name} validation failed",
+        event_type=error.event_type,
+        validation_errors=str(error.exception or error)
+    )
+    raise ValueError(f"Error processing {event_name} event") from error
 
 
 def publish_acknowledged_event(
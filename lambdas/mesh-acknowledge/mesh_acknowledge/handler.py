@@ -3,14 +3,14 @@
 from typing import Dict, Any
 
 from boto3 import client
-from dl_utils import log, EventPublisher, SenderLookup
+from dl_utils import log, EventPublisher, SenderLookup, SqsBatchRunner
 from .acknowledger import MeshAcknowledger
 from .config import Config
 from .dlq import Dlq
 from .message_processor import MessageProcessor
 
 
-def handler(message: Dict[str, Any], _context: Any):
+def handler(message: Dict[str, Any], context: Any):
     """
     Lambda handler for Mesh Acknowledge application.
 
@@ -35,14 +35,28 @@ def handler(message: Dict[str, Any], _context: Any):
             dlq = Dlq(
                 sqs_client=client('sqs'),
                 dlq_url=config.dlq_url,
-                logger=log
+                logger=log,
+                buffered=config.dlq_buffered
+            )
+            batch_runner = SqsBatchRunner(
+                logger=log,
+                outcomes=('acknowledged',),
+                get_remaining_time_in_millis=getattr(context, 'get_remaining_time_in_millis', None),
+                minimum_remaining_millis=int(config.batch_minimum_remaining_millis),
+                metric_namespace=config.metric_namespace,
+                dimensions={"Environment": config.environment}
             )
             message_processor = MessageProcessor(
                 acknowledger=acknowledger,
                 event_publisher=event_publisher,
                 sender_lookup=sender_lookup,
                 dlq=dlq,
-                logger=log
+                logger=log,
+                batch_runner=batch_runner,
+                max_workers=int(config.acknowledge_max_workers or 1),
+                build_mesh_client=config.build_mesh_client,
+                acknowledgement_store=config.acknowledgement_store,
+                bulk_acknowledge=config.acknowledge_bulk
             )
 
             batch_item_failures = message_processor.process_message(message)
@@ -2,22 +2,28 @@
 Processes SQS messages containing MESHInboxMessageDownloaded and MESHInboxMessageInvalid
 events and sends MESH acknowledgements or negative acknowledgements for each.
 """
-from typing import Dict, Any, List
-import json
-from dl_utils import EventPublisher, SenderLookup
+import threading
+from functools import partial
+from typing import Callable, Dict, Any, List, Tuple
+from digital_letters_events import MESHInboxMessageDownloaded, MESHInboxMessageInvalid
+from dl_utils import (
+    EventPublisher,
+    SenderLookup,
+    SqsBatchResult,
+    SqsBatchRunner,
+    map_concurrently,
+)
 from .acknowledger import MeshAcknowledger
 from .dlq import Dlq
 from .events import (
-    parse_downloaded_event,
-    parse_invalid_event,
+    DOWNLOADED_EVENT_TYPE,
+    INVALID_EVENT_TYPE,
+    parse_event,
     publish_acknowledged_event,
     publish_negative_acknowledged_event,
 )
 
-_DOWNLOADED_EVENT_TYPE = 'uk.nhs.notify.digital.letters.mesh.inbox.message.downloaded.v1'
-_INVALID_EVENT_TYPE = 'uk.nhs.notify.digital.letters.mesh.inbox.message.invalid.v1'
-
-class MessageProcessor:
+class MessageProcessor:  # pylint: disable=too-many-instance-attributes
     """Processes SQS messages and sends MESH acknowledgments."""
 
     def __init__(
@@ -25,12 +31,24 @@ class MessageProcessor:
             event_publisher: EventPublisher,
             sender_lookup: SenderLookup,
             dlq: Dlq,
-            logger):
+            logger,
+            **kwargs):
         self.__acknowledger = acknowledger
         self.__event_publisher = event_publisher
         self.__sender_lookup = sender_lookup
         self.__dlq = dlq
         self.__log = logger
+        self.__batch_runner = kwargs.get('batch_runner') or SqsBatchRunner(
+            logger=logger, outcomes=('acknowledged',))
+        # Records are acknowledged on this many worker threads, each with its own
+        # MESH client from build_mesh_client, when both are set
+        self.__max_workers = int(kwargs.get('max_workers', 1))
+        self.__build_mesh_client = kwargs.get('build_mesh_client')
+        self.__worker_acknowledgers = None
+        self.__acknowledgement_store = kwargs.get('acknowledgement_store')
+        self.__bulk_acknowledge = kwargs.get('bulk_acknowledge', False)
+        self.__pending_acknowledgements = {}
+        self.__pending_lock = threading.Lock()
 
     def process_message(self, message: Dict[str, Any]) -> List[Dict[str, str]]:
         """
@@ -45,61 +63,224 @@ class MessageProcessor:
         self.__log.info("Received SQS message",
                         record_count=len(message.get('Records', [])))
 
-        batch_item_failures = []
-        processed = {
-            'retrieved': 0,
-            'acknowledged': 0,
-            'failed': 0
-        }
+        records = message.get('Records', [])
+        if self.__max_workers > 1 and len(records) > 1 and self.__build_mesh_client is not None:
+            result = self.__run_concurrently(records)
+        else:
+            result = self.__batch_runner.run(
+                records, self.process_record, on_complete=self.__complete_batch)
 
-        for record in message.get('Records', []):
-            processed['retrieved'] += 1
-            message_id = record.get('messageId')
+        self.__log.info("Processed SQS message",
+                        retrieved=result.counts['retrieved'],
+                        acknowledged=result.counts['acknowledged'],
+                        failed=result.counts['failed'],
+                        unstarted=result.counts['unstarted'])
+
+        return result.batch_item_failures
 
+    def __run_concurrently(self, records: List[Dict[str, Any]]) -> SqsBatchResult:
+        """
+        Runs the batch on a pool of workers, each acknowledging with its own MESH client
+        """
+        with WorkerAcknowledgers(
+                self.__acknowledger, self.__build_mesh_client, self.__log) as acknowledgers:
+            self.__worker_acknowledgers = acknowledgers
             try:
-                event_type = self.__get_event_type(record)
+                return self.__batch_runner.run(
+                    records, self.process_record,
+                    map_records=map_concurrently(self.__max_workers),
+                    on_complete=self.__complete_batch)
+            finally:
+                self.__worker_acknowledgers = None
+
+    def process_record(self, record: Dict[str, Any]) -> str:
+        """
+        Sends the acknowledgement or negative acknowledgement for a single SQS record.
+
+        Args:
+            record (Dict[str, Any]): The SQS record.
+            Returns:
+                The outcome of the record.
+        """
+        validated_event = parse_event(record, self.__log)
+
+        if validated_event.type == INVALID_EVENT_TYPE:
+            acknowledgement_message_id = self.__process_invalid_record(
+                record, validated_event)
+        elif validated_event.type == DOWNLOADED_EVENT_TYPE:
+            acknowledgement_message_id = self.__process_downloaded_record(
+                record, validated_event)
+        else:
+            raise ValueError(f"Unknown event type: '{validated_event.type}'")
+
+        if acknowledgement_message_id is None:
+            self.__log.info("Deferred acknowledgement to bulk acknowledgement",
+                            message_id=record.get('messageId'))
+        else:
+            self.__log.info("Acknowledged message ID",
+                            message_id=record.get('messageId'),
+                            acknowledgement_message_id=acknowledgement_message_id)
 
-                if event_type == _INVALID_EVENT_TYPE:
-                    acknowledgement_message_id = self.__process_invalid_record(record)
-                elif event_type == _DOWNLOADED_EVENT_TYPE:
-                    acknowledgement_message_id = self.__process_downloaded_record(record)
-                else:
-                    raise ValueError(f"Unknown event type: '{event_type}'")
+        return 'acknowledged'
+
+    def __complete_batch(self, result: SqsBatchResult) -> None:
+        """
+        Finishes the work deferred to the end of a batch: bulk acknowledgements are
+        sent first, as publishing their events may add records to the DLQ.
+        """
+        self.__send_bulk_acknowledgements(result)
+        self.__flush_dlq(result)
+
+    def __send_bulk_acknowledgements(self, result: SqsBatchResult) -> None:
+        """
+        Sends one acknowledgement to each mailbox for the records deferred during the
+        batch, then publishes an acknowledged event for each record carrying the ID
+        of the shared acknowledgement. Every record for a mailbox fails if its
+        acknowledgement cannot be sent.
+        """
+        with self.__pending_lock:
+            pending, self.__pending_acknowledgements = self.__pending_acknowledgements, {}
+
+        for mesh_mailbox_id, deferred in pending.items():
+            try:
+                acknowledgement_message_id = self.__acknowledger.acknowledge_messages(
+                    mailbox_id=mesh_mailbox_id,
+                    acknowledgements=[
+                        {
+                            "message_id": validated_event.data.meshMessageId,
+                            "message_reference": validated_event.data.messageReference,
+                            "sender_id": validated_event.data.senderId,
+                        }
+                        for _, validated_event in deferred
+                    ]
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                for record, _ in deferred:
+                    self.__fail_deferred(result, record, exc)
+                continue
+
+            publish = partial(
+                self.__publish_deferred, mesh_mailbox_id, acknowledgement_message_id)
+
+            # Events are published on the worker pool, as each is a separate EventBridge call
+            errors = map_concurrently(self.__max_workers)(publish, deferred) \
+                if self.__max_workers > 1 else [publish(entry) for entry in deferred]
+
+            for (record, _), error in zip(deferred, errors):
+                if error is not None:
+                    self.__fail_deferred(result, record, error)
+                    continue
 
                 self.__log.info("Acknowledged message ID",
-                                message_id=message_id,
+                                message_id=record.get('messageId'),
                                 acknowledgement_message_id=acknowledgement_message_id)
-                processed['acknowledged'] += 1
 
-            except Exception as e:
-                processed['failed'] += 1
-                self.__log.error(
-                    "Failed to process SQS message",
-                    message_id=message_id,
-                    error=str(e))
-                batch_item_failures.append({"itemIdentifier": message_id})
+    def __publish_deferred(
+            self, mesh_mailbox_id: str, acknowledgement_message_id: str,
+            deferred: Tuple[Dict[str, Any], MESHInboxMessageDownloaded]) -> Exception | None:
+        """
+        Records and publishes the bulk acknowledgement of a deferred record, returning
+        the error that stopped it being published, if any.
+        """
+        record, validated_event = deferred
+        self.__remember_acknowledgement(
+            validated_event.data.meshMessageId, acknowledgement_message_id)
 
-        self.__log.info("Processed SQS message",
-                        retrieved=processed['retrieved'],
-                        acknowledged=processed['acknowledged'],
-                        failed=processed['failed'])
+        try:
+            self.__publish_acknowledged_event(
+                record, validated_event, mesh_mailbox_id, acknowledgement_message_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            return exc
+
+        return None
+
+    def __fail_deferred(
+            self, result: SqsBatchResult, record: Dict[str, Any], exc: Exception) -> None:
+        message_id = record.get('messageId')
+        self.__log.error("Failed to process SQS message",
+                         message_id=message_id,
+                         error=str(exc))
+        result.fail(message_id, 'acknowledged')
+
+    def __flush_dlq(self, result: SqsBatchResult) -> None:
+        """
+        Sends records held by a buffered DLQ, failing any that could not be sent
+        so that they are retried rather than lost.
+        """
+        if not self.__dlq.buffered:
+            return
+
+        for record in self.__dlq.flush():
+            message_id = record.get('messageId')
+            self.__log.error("Failed to process SQS message",
+                             message_id=message_id,
+                             error="Failed to send record to DLQ")
+            result.fail(message_id, 'acknowledged')
+
+    def __current_acknowledger(self) -> MeshAcknowledger:
+        """
+        Returns the acknowledger for the current thread while a batch is being
+        processed concurrently, and the primary acknowledger otherwise.
+        """
+        if self.__worker_acknowledgers is not None:
+            return self.__worker_acknowledgers.get()
+
+        return self.__acknowledger
+
+    def __send_once(self, incoming_message_id: str, send: Callable[[], str]) -> str:
+        """
+        Sends an acknowledgement for a MESH message unless one has already been sent,
+        returning the ID of the acknowledgement. On redelivery of a record the stored
+        ID is reused, so only the event is published again.
+        """
+        sent_message_id = self.__stored_acknowledgement(incoming_message_id)
+        if sent_message_id is not None:
+            return sent_message_id
 
-        return batch_item_failures
+        sent_message_id = send()
+        self.__remember_acknowledgement(incoming_message_id, sent_message_id)
+
+        return sent_message_id
+
+    def __stored_acknowledgement(self, incoming_message_id: str) -> str | None:
+        """
+        Returns the ID of the acknowledgement already sent for a MESH message, if any.
+        """
+        if self.__acknowledgement_store is None:
+            return None
 
-    def __get_event_type(self, record: Dict[str, Any]) -> str:
-        """Extract the CloudEvents type field from an SQS record body."""
         try:
-            body = json.loads(record.get('body', '{}'))
-            return body.get('detail', {}).get('type', '')
-        except (json.JSONDecodeError, AttributeError):
-            return ''
+            sent_message_id = self.__acknowledgement_store.get(incoming_message_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warn("Failed to read acknowledgement store", error=str(exc))
+            return None
+
+        if sent_message_id is not None:
+            self.__log.info("Reusing acknowledgement already sent for MESH message",
+                            mesh_message_id=incoming_message_id,
+                            acknowledgement_message_id=sent_message_id)
 
-    def __process_downloaded_record(self, record: Dict[str, Any]) -> str:
+        return sent_message_id
+
+    def __remember_acknowledgement(self, incoming_message_id: str, sent_message_id: str) -> None:
         """
-        Process a MESHInboxMessageDownloaded SQS record.
+        Records the ID of the acknowledgement sent for a MESH message.
         """
-        validated_event = parse_downloaded_event(record, self.__log)
+        if self.__acknowledgement_store is None:
+            return
+
+        try:
+            self.__acknowledgement_store.put(incoming_message_id, sent_message_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warn("Failed to update acknowledgement store", error=str(exc))
 
+    def __process_downloaded_record(
+            self, record: Dict[str, Any],
+            validated_event: MESHInboxMessageDownloaded) -> str | None:
+        """
+        Process a MESHInboxMessageDownloaded SQS record. In bulk acknowledgement mode
+        the acknowledgement is deferred to the end of the batch and None is returned.
+        """
         sender_id = validated_event.data.senderId
         incoming_message_id = validated_event.data.meshMessageId
 
@@ -112,13 +293,37 @@ class MessageProcessor:
                 f"Unknown sender ID '{sender_id}' for message"
             )
 
-        acknowledgement_message_id = self.__acknowledger.acknowledge_message(
-            mailbox_id=mesh_mailbox_id,
-            message_reference=validated_event.data.messageReference,
-            sender_id=sender_id,
-            message_id=incoming_message_id
-        )
+        if self.__bulk_acknowledge:
+            acknowledgement_message_id = self.__stored_acknowledgement(incoming_message_id)
+            if acknowledgement_message_id is None:
+                with self.__pending_lock:
+                    self.__pending_acknowledgements.setdefault(mesh_mailbox_id, []).append(
+                        (record, validated_event))
+                return None
+        else:
+            acknowledgement_message_id = self.__send_once(
+                incoming_message_id,
+                lambda: self.__current_acknowledger().acknowledge_message(
+                    mailbox_id=mesh_mailbox_id,
+                    message_reference=validated_event.data.messageReference,
+                    sender_id=sender_id,
+                    message_id=incoming_message_id
+                )
+            )
+
+        self.__publish_acknowledged_event(
+            record, validated_event, mesh_mailbox_id, acknowledgement_message_id)
+
+        return acknowledgement_message_id
 
+    def __publish_acknowledged_event(
+            self, record: Dict[str, Any],
+            validated_event: MESHInboxMessageDownloaded,
+            mesh_mailbox_id: str,
+            acknowledgement_message_id: str) -> None:
+        """
+        Publish the MESHInboxMessageAcknowledged event for an acknowledged record.
+        """
         try:
             publish_acknowledged_event(
                 logger=self.__log,
@@ -137,14 +342,12 @@ class MessageProcessor:
                 reason="Failed to publish acknowledged event"
             )
 
-        return acknowledgement_message_id
-
-    def __process_invalid_record(self, record: Dict[str, Any]) -> str:
+    def __process_invalid_record(
+            self, record: Dict[str, Any],
+            validated_event: MESHInboxMessageInvalid) -> str:
         """
         Process a MESHInboxMessageInvalid SQS record by sending a negative acknowledgement.
         """
-        validated_event = parse_invalid_event(record, self.__log)
-
         sender_id = validated_event.data.senderId
         incoming_message_id = validated_event.data.meshMessageId
         failure_code = validated_event.data.failureCode
@@ -159,12 +362,15 @@ class MessageProcessor:
                 f"Unknown sender ID '{sender_id}' for message"
             )
 
-        negative_acknowledgement_message_id = self.__acknowledger.negative_acknowledge_message(
-            mailbox_id=mesh_mailbox_id,
-            message_id=incoming_message_id,
-            failure_code=failure_code,
-            sender_id=sender_id,
-            message_reference=message_reference
+        negative_acknowledgement_message_id = self.__send_once(
+            incoming_message_id,
+            lambda: self.__current_acknowledger().negative_acknowledge_message(
+                mailbox_id=mesh_mailbox_id,
+                message_id=incoming_message_id,
+                failure_code=failure_code,
+                sender_id=sender_id,
+                message_reference=message_reference
+            )
         )
 
         try:
@@ -182,3 +388,46 @@ class MessageProcessor:
             )
 
         return negative_acknowledgement_message_id
+
+
+class WorkerAcknowledgers:
+    """
+    Gives each worker thread its own acknowledger. MESH clients hold an HTTP session
+    that is not safe to share between threads, so each worker sends through its own
+    client; the first worker reuses the primary acknowledger. The sender lookup, DLQ
+    and event publisher only read shared state or call thread-safe boto3 clients.
+    """
+
+    def __init__(self, acknowledger: MeshAcknowledger, build_mesh_client: Callable, logger):
+        self.__acknowledger = acknowledger
+        self.__build_mesh_client = build_mesh_client
+        self.__log = logger
+        self.__local = threading.local()
+        self.__extra_mesh_clients = []
+        self.__lock = threading.Lock()
+        self.__primary_claimed = False
+
+    def get(self) -> MeshAcknowledger:
+        """
+        Returns the acknowledger for the current thread, building it if needed
+        """
+        if not hasattr(self.__local, 'acknowledger'):
+            with self.__lock:
+                if not self.__primary_claimed:
+                    self.__primary_claimed = True
+                    self.__local.acknowledger = self.__acknowledger
+                    return self.__local.acknowledger
+
+                mesh_client = self.__build_mesh_client()
+                self.__extra_mesh_clients.append(mesh_client)
+
+            self.__local.acknowledger = MeshAcknowledger(mesh_client, self.__log)
+
+        return self.__local.acknowledger
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for mesh_client in self.__extra_mesh_clients:
+            mesh_client.close()
@@ -0,0 +1,143 @@
+"""
+Benchmark for processing a batch of SQS records concurrently in mesh-download.
+
+Messages are held by MockMeshClient instances backed by an in-memory stand-in for
+S3 that adds a fixed latency to every call, and downloaded documents are written
+to the same stand-in. The time taken to work through one SQS batch is compared
+between processing the records one after another and on a pool of workers.
+
+Usage (from the repository root):
+    PYTHONPATH=lambdas/mesh-download:utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/mesh-download/benchmarks/benchmark_concurrent_records.py --workers 5
+"""
+import argparse
+import json
+import time
+from unittest.mock import Mock, patch
+
+from py_mock_mesh import InMemoryS3, MockMeshClient
+from mesh_download.handler import handler
+
+MAILBOX = 'MAILBOX'
+SENDER = 'SENDER'
+DOCUMENT = json.dumps({
+    'resourceType': 'DocumentReference',
+    'status': 'current',
+    'content': [{'attachment': {'contentType': 'application/pdf', 'data': 'JVBERi0='}}]
+}).encode('utf-8')
+
+
+def build_inbox(message_count, latency_seconds):
+    """
+    Builds an S3 stand-in holding message_count messages in the mock MESH inbox
+    """
+    s3_client = InMemoryS3(latency_seconds)
+    for message_index in range(message_count):
+        s3_client.put_object(
+            Bucket='bucket',
+            Key=f'mock-mesh/{MAILBOX}/in/{MAILBOX}_{message_index:06d}',
+            Body=DOCUMENT,
+            Metadata={'sender': SENDER, 'local_id': f'ref-{message_index}'}
+        )
+    return s3_client
+
+
+def build_config(s3_client, max_workers):
+    """
+    Builds a stand-in for the handler's configuration, creating a new MockMeshClient
+    for every MESH client requested
+    """
+    def build_mesh_client():
+        return MockMeshClient(s3_client, 's3://bucket/mock-mesh', MAILBOX, Mock())
+
+    config = Mock()
+    config.s3_client = s3_client
+    config.transactional_data_bucket = 'documents'
+    config.streaming_part_size_bytes = None
+    config.download_max_workers = max_workers
+    config.download_existence_check = False
+    config.stored_document_cache = None
+    config.document_codec = None
+    config.document_key_layout = None
+    config.prevalidator = None
+    config.missing_messages = None
+    config.batch_minimum_remaining_millis = 0
+    config.download_metric_namespace = None
+    config.environment = 'benchmark'
+    config.build_mesh_client = build_mesh_client
+    config.mesh_client = build_mesh_client()
+    return config
+
+
+def build_event(message_count):
+    """
+    Builds an SQS event with a record for each message in the inbox
+    """
+    records = []
+    for message_index in range(message_count):
+        detail = {
+            'id': f'00000000-0000-0000-0000-{message_index:012d}',
+            'specversion': '1.0',
+            'source': '/nhs/england/notify/development/primary/digitalletters/mesh',
+            'subject': 'customer/00000000-0000-0000-0000-000000000000/'
+                       'recipient/00000000-0000-0000-0000-000000000000',
+            'type': 'uk.nhs.notify.digital.letters.mesh.inbox.message.received.v1',
+            'plane': 'data',
+            'dataschemaversion': '1.0.0',
+            'datacontenttype': 'application/json',
+            'time': '2023-01-01T12:00:00Z',
+            'recordedtime': '2023-01-01T12:00:00Z',
+            'severitynumber': 2,
+            'severitytext': 'INFO',
+            'traceparent': '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01',
+            'dataschema': 'https://notify.nhs.uk/cloudevents/schemas/digital-letters/'
+                          '2025-10-draft/data/digital-letters-mesh-inbox-message-received-data.schema.json',
+            'data': {
+                'meshMessageId': f'{MAILBOX}_{message_index:06d}',
+                'senderId': SENDER,
+                'messageReference': f'ref-{message_index}'
+            }
+        }
+        records.append({
+            'messageId': f'sqs-{message_index}',
+            'eventSource': 'aws:sqs',
+            'body': json.dumps({'detail': detail})
+        })
+    return {'Records': records}
+
+
+def run(label, max_workers, args):
+    """
+    Times one SQS batch and prints the result
+    """
+    s3_client = build_inbox(args.messages, args.latency_ms / 1000)
+    config = build_config(s3_client, max_workers)
+
+    with patch('mesh_download.handler.Config') as config_class:
+        config_class.return_value.__enter__.return_value = config
+
+        started = time.perf_counter()
+        result = handler(build_event(args.messages), None)
+        elapsed = time.perf_counter() - started
+
+    failures = len(result['batchItemFailures'])
+    print(f'{label:<12} {args.messages} records in {elapsed:.2f}s '
+          f'({args.messages / elapsed:.1f} records/s, {failures} failed)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--messages', type=int, default=10, help='records in the SQS batch')
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='latency of each S3 call')
+    args = parser.parse_args()
+
+    with patch('mesh_download.handler.EventPublisher') as event_publisher_class:
+        event_publisher_class.return_value.send_events.return_value = []
+
+        run('serial', 1, args)
+        run('concurrent', args.workers, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark for compressing stored documents in mesh-download.
+
+Representative FHIR documents are compressed with each available codec, both
+in one call and streamed in the chunk size used when downloading from MESH. The
+bytes saved and the CPU time spent compressing and decompressing are reported
+for each.
+
+Usage (from the repository root):
+    PYTHONPATH=utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/mesh-download/benchmarks/benchmark_document_codec.py
+"""
+import argparse
+import base64
+import json
+import random
+import time
+import uuid
+
+from dl_utils import UnsupportedCodecError, get_codec
+
+CODECS = ['gzip', 'zstd']
+STREAMING_READ_SIZE = 1024 * 1024
+
+
+def document_reference(attachment_bytes, rng):
+    """
+    Builds a DocumentReference with a base64 encoded attachment of the given size.
+    PDF content is mostly compressed streams, so random bytes stand in for it.
+    """
+    return {
+        'resourceType': 'DocumentReference',
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'status': 'current',
+        'docStatus': 'final',
+        'type': {'coding': [{
+            'system': 'http://snomed.info/sct', 'code': '308540004', 'display': 'Appointment'
+        }]},
+        'subject': {'identifier': {
+            'system': 'https://fhir.nhs.uk/Id/nhs-number', 'value': f'{rng.randrange(10 ** 10):010d}'
+        }},
+        'author': [{
+            'identifier': {'system': 'https://fhir.nhs.uk/Id/ods-organization-code', 'value': 'RX809'},
+            'display': 'Example NHS Trust'
+        }],
+        'custodian': {
+            'identifier': {'system': 'https://fhir.nhs.uk/Id/ods-organization-code', 'value': 'C4L8E'},
+            'display': 'NHS ENGLAND: NHS NOTIFY'
+        },
+        'date': '2025-11-19T14:30:00Z',
+        'content': [{'attachment': {
+            'contentType': 'application/pdf',
+            'language': 'en-GB',
+            'title': 'Appointment letter',
+            'data': base64.b64encode(rng.randbytes(attachment_bytes)).decode('ascii')
+        }}]
+    }
+
+
+def bundle(entry_count, rng):
+    """
+    Builds a Bundle of DocumentReferences with small attachments, standing in for
+    structured letters carrying little binary content
+    """
+    return {
+        'resourceType': 'Bundle',
+        'type': 'collection',
+        'entry': [{'resource': document_reference(256, rng)} for _ in range(entry_count)]
+    }
+
+
+def documents():
+    """
+    Returns the representative documents to benchmark, by name
+    """
+    rng = random.Random(0)
+    return {
+        'letter (100 KiB pdf)': json.dumps(document_reference(100 * 1024, rng)).encode('utf-8'),
+        'letter (2 MiB pdf)': json.dumps(document_reference(2 * 1024 * 1024, rng)).encode('utf-8'),
+        'bundle (200 entries)': json.dumps(bundle(200, rng), indent=2).encode('utf-8'),
+    }
+
+
+def stream_compress(codec, content):
+    """
+    Compresses content in the chunk size used when streaming from MESH
+    """
+    compressor = codec.compressor()
+    parts = [
+        compressor.compress(content[start:start + STREAMING_READ_SIZE])
+        for start in range(0, len(content), STREAMING_READ_SIZE)
+    ]
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def cpu_millis(function, repeat):
+    """
+    Returns the mean CPU time of a call in milliseconds, and its last result
+    """
+    started = time.process_time()
+    for _ in range(repeat):
+        result = function()
+    return (time.process_time() - started) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except UnsupportedCodecError as e:
+            print(f'skipping {name}: {e}')
+
+    print(f"{'document':<22} {'codec':<6} {'size':>10} {'stored':>10} {'saved':>6} "
+          f"{'compress':>10} {'streamed':>10} {'decompress':>11}")
+
+    for label, content in documents().items():
+        for codec in codecs:
+            compress_ms, compressed = cpu_millis(lambda: codec.compress(content), args.repeat)
+            stream_ms, streamed = cpu_millis(lambda: stream_compress(codec, content), args.repeat)
+            decompress_ms, decompressed = cpu_millis(lambda: codec.decompress(compressed), args.repeat)
+            assert decompressed == content and codec.decompress(streamed) == content
+
+            saved = 1 - len(compressed) / len(content)
+            print(f'{label:<22} {codec.name:<6} {len(content):>10} {len(compressed):>10} '
+                  f'{saved:>6.1%} {compress_ms:>8.1f}ms {stream_ms:>8.1f}ms {decompress_ms:>9.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,27 @@
 """Tests for DocumentStore"""
+import base64
+import gzip
+import random
+import zlib
 import pytest
 from unittest.mock import Mock
 from botocore.exceptions import ClientError
-from mesh_download.document_store import DocumentStore, IntermediaryBodyStoreError, DocumentAlreadyExistsError
+from dl_utils import get_codec
+from mesh_download.document_store import (
+    DocumentStore,
+    DocumentUpload,
+    HashedKeyLayout,
+    SenderKeyLayout,
+    get_key_layout,
+    IntermediaryBodyStoreError,
+    DocumentAlreadyExistsError,
+    MINIMUM_PART_SIZE,
+)
+
+
+def crc32(content):
+    """Helper to give the base64 encoded CRC32 checksum S3 expects for content"""
+    return base64.b64encode(zlib.crc32(content).to_bytes(4, 'big')).decode('ascii')
 
 
 def make_client_error(code):
@@ -41,6 +60,7 @@ class TestDocumentStore:
             Bucket='test-pii-bucket',
             Key='document-reference/SENDER-001/ref-123_mesh-456',
             Body=b'test content',
+            ChecksumCRC32=crc32(b'test content'),
             IfNoneMatch='*'
         )
 
@@ -102,3 +122,262 @@ class TestDocumentStore:
                 mesh_message_id='mesh-456',
                 content=b'test content'
             )
+
+    def test_document_exists_returns_true_for_stored_document(self):
+        """Checks the document key with head_object"""
+        mock_s3_client = Mock()
+
+        config = Mock()
+        config.s3_client = mock_s3_client
+        config.transactional_data_bucket = 'test-pii-bucket'
+
+        store = DocumentStore(config)
+
+        assert store.document_exists('SENDER-001', 'ref-123', 'mesh-456') is True
+        mock_s3_client.head_object.assert_called_once_with(
+            Bucket='test-pii-bucket',
+            Key='document-reference/SENDER-001/ref-123_mesh-456'
+        )
+
+    @pytest.mark.parametrize('code', ['404', 'NoSuchKey', 'NotFound'])
+    def test_document_exists_returns_false_for_missing_document(self, code):
+        """A not-found error means the document is not stored"""
+        mock_s3_client = Mock()
+        mock_s3_client.head_object.side_effect = make_client_error(code)
+
+        config = Mock()
+        config.s3_client = mock_s3_client
+        config.transactional_data_bucket = 'test-pii-bucket'
+
+        store = DocumentStore(config)
+
+        assert store.document_exists('SENDER-001', 'ref-123', 'mesh-456') is False
+
+    def test_document_exists_raises_store_error_on_other_failures(self):
+        """Other S3 errors are raised as IntermediaryBodyStoreError"""
+        mock_s3_client = Mock()
+        mock_s3_client.head_object.side_effect = make_client_error('AccessDenied')
+
+        config = Mock()
+        config.s3_client = mock_s3_client
+        config.transactional_data_bucket = 'test-pii-bucket'
+
+        store = DocumentStore(config)
+
+        with pytest.raises(IntermediaryBodyStoreError):
+            store.document_exists('SENDER-001', 'ref-123', 'mesh-456')
+
+    def test_store_document_with_codec_compresses_content(self):
+        """A codec compresses the document and marks its encoding on the object"""
+        mock_s3_client = Mock()
+        mock_s3_client.put_object.return_value = {
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+
+        config = Mock()
+        config.s3_client = mock_s3_client
+        config.transactional_data_bucket = 'test-pii-bucket'
+
+        store = DocumentStore(config, codec=get_codec('gzip'))
+        store.store_document('SENDER-001', 'ref-123', 'mesh-456', b'test content')
+
+        call_kwargs = mock_s3_client.put_object.call_args[1]
+        assert gzip.decompress(call_kwargs['Body']) == b'test content'
+        assert call_kwargs['ContentEncoding'] == 'gzip'
+        assert call_kwargs['Metadata'] == {'dl-codec': 'gzip'}
+        assert call_kwargs['ChecksumCRC32'] == crc32(call_kwargs['Body'])
+        assert call_kwargs['IfNoneMatch'] == '*'
+
+
+class TestKeyLayout:
+    """Test suite for document key layouts"""
+
+    def test_default_layout_keys_by_sender(self):
+        """Documents are keyed by sender unless another layout is chosen"""
+        assert isinstance(get_key_layout(None), SenderKeyLayout)
+        assert DocumentStore(Mock()).document_key('SENDER-001', 'ref-123', 'mesh-456') == \
+            'document-reference/SENDER-001/ref-123_mesh-456'
+
+    def test_hashed_layout_adds_shard_ahead_of_sender(self):
+        """The hashed layout puts a short hex shard at the start of the key"""
+        layout = get_key_layout('hashed')
+
+        key = layout.document_key('SENDER-001', 'ref-123', 'mesh-456')
+
+        prefix, shard, rest = key.split('/', 2)
+        assert prefix == 'document-reference'
+        assert len(shard) == 2 and int(shard, 16) >= 0
+        assert rest == 'SENDER-001/ref-123_mesh-456'
+
+    def test_hashed_layout_is_deterministic(self):
+        """A message reference always resolves to the same key"""
+        assert HashedKeyLayout().document_key('SENDER-001', 'ref-123', 'mesh-456') == \
+            HashedKeyLayout().document_key('SENDER-001', 'ref-123', 'mesh-456')
+
+    def test_hashed_layout_spreads_one_sender_across_shards(self):
+        """Different references from one sender land in many shards"""
+        layout = HashedKeyLayout()
+
+        shards = {layout.shard('SENDER-001', f'ref-{i}') for i in range(1000)}
+
+        assert len(shards) > 200
+
+    def test_unknown_layout_raises(self):
+        """An unknown layout is a configuration error"""
+        with pytest.raises(ValueError, match='flat'):
+            get_key_layout('flat')
+
+    def test_store_document_uses_layout(self):
+        """Stored documents, and duplicate detection on them, use the layout's key"""
+        config = make_upload_config()
+        config.s3_client.put_object.side_effect = make_client_error('PreconditionFailed')
+        layout = HashedKeyLayout()
+        store = DocumentStore(config, key_layout=layout)
+        expected_key = layout.document_key('SENDER-001', 'ref-123', 'mesh-456')
+
+        with pytest.raises(DocumentAlreadyExistsError, match=expected_key):
+            store.store_document('SENDER-001', 'ref-123', 'mesh-456', b'test content')
+
+        assert config.s3_client.put_object.call_args[1]['Key'] == expected_key
+        assert config.s3_client.put_object.call_args[1]['IfNoneMatch'] == '*'
+
+
+def make_upload_config():
+    """Helper to build a DocumentStore config with a mock S3 client"""
+    config = Mock()
+    config.s3_client = Mock()
+    config.transactional_data_bucket = 'test-pii-bucket'
+    config.s3_client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    config.s3_client.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+    config.s3_client.complete_multipart_upload.return_value = {
+        'ResponseMetadata': {'HTTPStatusCode': 200}
+    }
+    config.s3_client.put_object.return_value = {
+        'ResponseMetadata': {'HTTPStatusCode': 200}
+    }
+    return config
+
+
+class TestDocumentUpload:
+    """Test suite for streamed document uploads"""
+
+    def test_small_document_is_stored_with_single_put(self):
+        """A document smaller than one part is stored with put_object and IfNoneMatch"""
+        config = make_upload_config()
+        upload = DocumentStore(config).start_document_upload('SENDER-001', 'ref-123', 'mesh-456')
+
+        upload.write(b'small ')
+        upload.write(b'document')
+        result = upload.complete()
+
+        assert result == 'document-reference/SENDER-001/ref-123_mesh-456'
+        config.s3_client.put_object.assert_called_once_with(
+            Bucket='test-pii-bucket',
+            Key='document-reference/SENDER-001/ref-123_mesh-456',
+            Body=b'small document',
+            ChecksumCRC32=crc32(b'small document'),
+            IfNoneMatch='*'
+        )
+        config.s3_client.create_multipart_upload.assert_not_called()
+
+    def test_large_document_is_uploaded_in_parts(self):
+        """Each full part is uploaded as it is written and completion keeps IfNoneMatch"""
+        config = make_upload_config()
+        upload = DocumentUpload(config, 'document-reference/key', MINIMUM_PART_SIZE)
+
+        upload.write(b'a' * (MINIMUM_PART_SIZE - 1))
+        config.s3_client.upload_part.assert_not_called()
+
+        upload.write(b'b' * (MINIMUM_PART_SIZE + 10))
+        assert config.s3_client.upload_part.call_count == 2
+
+        result = upload.complete()
+
+        assert result == 'document-reference/key'
+        assert config.s3_client.upload_part.call_count == 3
+        last_part = config.s3_client.upload_part.call_args_list[-1][1]
+        assert last_part['PartNumber'] == 3
+        assert last_part['Body'] == b'b' * 9
+        part_checksums = [
+            crc32(b'a' * (MINIMUM_PART_SIZE - 1) + b'b'),
+            crc32(b'b' * MINIMUM_PART_SIZE),
+            crc32(b'b' * 9),
+        ]
+        config.s3_client.complete_multipart_upload.assert_called_once_with(
+            Bucket='test-pii-bucket',
+            Key='document-reference/key',
+            UploadId='upload-1',
+            MultipartUpload={'Parts': [
+                {'PartNumber': 1, 'ETag': 'etag-1', 'ChecksumCRC32': part_checksums[0]},
+                {'PartNumber': 2, 'ETag': 'etag-2', 'ChecksumCRC32': part_checksums[1]},
+                {'PartNumber': 3, 'ETag': 'etag-3', 'ChecksumCRC32': part_checksums[2]},
+            ]},
+            ChecksumCRC32=crc32(b'a' * (MINIMUM_PART_SIZE - 1) + b'b' * (MINIMUM_PART_SIZE + 10)),
+            ChecksumType='FULL_OBJECT',
+            IfNoneMatch='*'
+        )
+        assert upload.checksum.to_event_data() == {
+            'algorithm': 'CRC32',
+            'value': crc32(b'a' * (MINIMUM_PART_SIZE - 1) + b'b' * (MINIMUM_PART_SIZE + 10))
+        }
+        config.s3_client.put_object.assert_not_called()
+
+    def test_existing_document_on_completion_raises_already_exists(self):
+        """PreconditionFailed on completion is a duplicate, and the upload is aborted"""
+        config = make_upload_config()
+        config.s3_client.complete_multipart_upload.side_effect = make_client_error('PreconditionFailed')
+        upload = DocumentUpload(config, 'document-reference/key', MINIMUM_PART_SIZE)
+
+        upload.write(b'a' * (MINIMUM_PART_SIZE + 1))
+
+        with pytest.raises(DocumentAlreadyExistsError):
+            upload.complete()
+
+        config.s3_client.abort_multipart_upload.assert_called_once_with(
+            Bucket='test-pii-bucket',
+            Key='document-reference/key',
+            UploadId='upload-1'
+        )
+
+    def test_part_upload_failure_raises_store_error(self):
+        """A failed part upload raises IntermediaryBodyStoreError"""
+        config = make_upload_config()
+        config.s3_client.upload_part.side_effect = make_client_error('InternalError')
+        upload = DocumentUpload(config, 'document-reference/key', MINIMUM_PART_SIZE)
+
+        with pytest.raises(IntermediaryBodyStoreError):
+            upload.write(b'a' * MINIMUM_PART_SIZE)
+
+    def test_abort_discards_multipart_upload(self):
+        """Aborting after parts were uploaded aborts the multipart upload"""
+        config = make_upload_config()
+        upload = DocumentUpload(config, 'document-reference/key', MINIMUM_PART_SIZE)
+
+        upload.write(b'a' * MINIMUM_PART_SIZE)
+        upload.abort()
+
+        config.s3_client.abort_multipart_upload.assert_called_once()
+        config.s3_client.complete_multipart_upload.assert_not_called()
+
+    def test_codec_compresses_streamed_document(self):
+        """A streamed document is compressed as it is written and marked on the multipart upload"""
+        config = make_upload_config()
+        upload = DocumentUpload(config, 'document-reference/key', MINIMUM_PART_SIZE, get_codec('gzip'))
+        # Random bytes do not compress, so the document still needs more than one part
+        document = random.Random(0).randbytes(2 * MINIMUM_PART_SIZE)
+
+        for start in range(0, len(document), 1024 * 1024):
+            upload.write(document[start:start + 1024 * 1024])
+        upload.complete()
+
+        assert upload.size_bytes == len(document)
+        config.s3_client.create_multipart_upload.assert_called_once_with(
+            Bucket='test-pii-bucket',
+            Key='document-reference/key',
+            ChecksumAlgorithm='CRC32',
+            ChecksumType='FULL_OBJECT',
+            ContentEncoding='gzip',
+            Metadata={'dl-codec': 'gzip'}
+        )
+        parts = [call[1]['Body'] for call in config.s3_client.upload_part.call_args_list]
+        assert gzip.decompress(b''.join(parts)) == document
@@ -10,9 +10,14 @@ def setup_mocks():
     Create all mock objects needed for handler testing
     """
     mock_context = Mock()
+    mock_context.get_remaining_time_in_millis.return_value = 300000
 
     mock_config = MagicMock()
     mock_config.mesh_client = Mock()
+    mock_config.download_max_workers = 1
+    mock_config.batch_minimum_remaining_millis = 5000
+    mock_config.download_metric_namespace = 'dl-mesh-download'
+    mock_config.environment = 'test'
 
     mock_processor = Mock()
     mock_processor.process_sqs_message = Mock(return_value='downloaded')
@@ -162,6 +167,55 @@ class TestHandler:
         assert len(result["batchItemFailures"]) == 1
         assert result["batchItemFailures"][0]["itemIdentifier"] == "msg-1"
 
+    @patch('mesh_download.handler.EventPublisher')
+    @patch('mesh_download.handler.DocumentStore')
+    @patch('mesh_download.handler.Config')
+    @patch('mesh_download.handler.MeshDownloadProcessor')
+    def test_handler_does_not_retry_invalid_messages(self, mock_processor_class, mock_config_class, mock_doc_store_class, mock_event_pub_class):
+        """Test handler treats invalid and dead-lettered messages as processed so they are not retried"""
+        from mesh_download.handler import handler
+
+        (mock_context, mock_config, mock_processor) = setup_mocks()
+
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_processor_class.return_value = mock_processor
+
+        mock_doc_store_class.return_value = Mock()
+        mock_event_pub_class.return_value = Mock()
+
+        mock_processor.process_sqs_message.side_effect = ['downloaded', 'invalid', 'dead_lettered']
+
+        result = handler(create_sqs_event(num_records=3), mock_context)
+
+        assert result == {"batchItemFailures": []}
+
+    @patch('mesh_download.handler.EventPublisher')
+    @patch('mesh_download.handler.DocumentStore')
+    @patch('mesh_download.handler.Config')
+    @patch('mesh_download.handler.MeshDownloadProcessor')
+    def test_handler_releases_records_not_started_in_time(self, mock_processor_class, mock_config_class, mock_doc_store_class, mock_event_pub_class):
+        """Test handler returns records it had no time to start as batch item failures"""
+        from mesh_download.handler import handler
+
+        (mock_context, mock_config, mock_processor) = setup_mocks()
+        mock_context.get_remaining_time_in_millis.side_effect = [60000, 4000, 4000]
+
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_processor_class.return_value = mock_processor
+
+        mock_doc_store_class.return_value = Mock()
+        mock_event_pub_class.return_value = Mock()
+
+        result = handler(create_sqs_event(num_records=3), mock_context)
+
+        mock_processor.process_sqs_message.assert_called_once()
+        assert result == {"batchItemFailures": [
+            {"itemIdentifier": "msg-1"},
+            {"itemIdentifier": "msg-2"},
+        ]}
+
     @patch('mesh_download.handler.EventPublisher')
     @patch('mesh_download.handler.DocumentStore')
     @patch('mesh_download.handler.Config')
@@ -279,4 +333,116 @@ class TestHandler:
         assert call_kwargs['download_metric'] == mock_download_metric
         assert call_kwargs['document_store'] == mock_doc_store
         assert call_kwargs['event_publisher'] == mock_event_pub
+        assert 'streaming_part_size' in call_kwargs
+        assert call_kwargs['check_existing_documents'] == mock_config.download_existence_check
+        assert call_kwargs['stored_document_cache'] == mock_config.stored_document_cache
+        assert call_kwargs['prevalidator'] == mock_config.prevalidator
+        assert call_kwargs['missing_messages'] == mock_config.missing_messages
+        assert mock_doc_store_class.call_args[1]['codec'] == mock_config.document_codec
+        assert mock_doc_store_class.call_args[1]['key_layout'] == mock_config.document_key_layout
         assert 'log' in call_kwargs
+
+    @patch('mesh_download.handler.EventPublisher')
+    @patch('mesh_download.handler.DocumentStore')
+    @patch('mesh_download.handler.Config')
+    @patch('mesh_download.handler.MeshDownloadProcessor')
+    def test_handler_processes_records_concurrently(self, mock_processor_class, mock_config_class, mock_doc_store_class, mock_event_pub_class):
+        """Test that concurrent processing keeps outcome counts and batch item failures"""
+        from mesh_download.handler import handler
+
+        (mock_context, mock_config, mock_processor) = setup_mocks()
+        mock_config.download_max_workers = 3
+
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_processor_class.return_value = mock_processor
+
+        def process_sqs_message(record):
+            if record['messageId'] in ('msg-1', 'msg-4'):
+                raise Exception("Processing failed")
+            return 'skipped' if record['messageId'] == 'msg-2' else 'downloaded'
+
+        mock_processor.process_sqs_message.side_effect = process_sqs_message
+
+        event = create_sqs_event(num_records=6)
+
+        result = handler(event, mock_context)
+
+        assert mock_processor.process_sqs_message.call_count == 6
+        assert result == {"batchItemFailures": [
+            {"itemIdentifier": "msg-1"},
+            {"itemIdentifier": "msg-4"}
+        ]}
+
+    @patch('mesh_download.handler.EventPublisher')
+    @patch('mesh_download.handler.DocumentStore')
+    @patch('mesh_download.handler.Config')
+    @patch('mesh_download.handler.MeshDownloadProcessor')
+    def test_handler_builds_mesh_client_per_worker(self, mock_processor_class, mock_config_class, mock_doc_store_class, mock_event_pub_class):
+        """Test that workers beyond the first use their own MESH clients, which are closed"""
+        from threading import Barrier
+        from mesh_download.handler import handler
+
+        (mock_context, mock_config, mock_processor) = setup_mocks()
+        mock_config.download_max_workers = 2
+
+        worker_clients = []
+
+        def build_mesh_client():
+            worker_clients.append(Mock())
+            return worker_clients[-1]
+
+        mock_config.build_mesh_client.side_effect = build_mesh_client
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_processor_class.return_value = mock_processor
+
+        # Hold both records until both workers are running, so each builds a processor
+        barrier = Barrier(2, timeout=5)
+
+        def process_sqs_message(_record):
+            barrier.wait()
+            return 'downloaded'
+
+        mock_processor.process_sqs_message.side_effect = process_sqs_message
+
+        result = handler(create_sqs_event(num_records=2), mock_context)
+
+        assert result == {"batchItemFailures": []}
+        assert len(worker_clients) == 1
+        mesh_clients = [call[1]['mesh_client'] for call in mock_processor_class.call_args_list]
+        assert mesh_clients == [mock_config.mesh_client, worker_clients[0]]
+        worker_clients[0].close.assert_called_once()
+        mock_config.mesh_client.close.assert_not_called()
+
+    @patch('mesh_download.handler.EventPublisher')
+    @patch('mesh_download.handler.DocumentStore')
+    @patch('mesh_download.handler.Config')
+    @patch('mesh_download.handler.MeshDownloadProcessor')
+    def test_handler_fails_record_when_worker_mesh_client_cannot_be_built(self, mock_processor_class, mock_config_class, mock_doc_store_class, mock_event_pub_class):
+        """Test that a worker failing to build its MESH client only fails its own records"""
+        from threading import Barrier, BrokenBarrierError
+        from mesh_download.handler import handler
+
+        (mock_context, mock_config, mock_processor) = setup_mocks()
+        mock_config.download_max_workers = 2
+        mock_config.build_mesh_client.side_effect = Exception("MESH unavailable")
+
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_processor_class.return_value = mock_processor
+
+        barrier = Barrier(2, timeout=0.5)
+
+        def process_sqs_message(_record):
+            try:
+                barrier.wait()
+            except BrokenBarrierError:
+                pass
+            return 'downloaded'
+
+        mock_processor.process_sqs_message.side_effect = process_sqs_message
+
+        result = handler(create_sqs_event(num_records=2), mock_context)
+
+        assert len(result["batchItemFailures"]) == 1
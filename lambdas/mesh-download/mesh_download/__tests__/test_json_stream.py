@@ -0,0 +1,87 @@
+"""Tests for StreamingJsonReader"""
+import base64
+import hashlib
+import json
+
+import pytest
+from mesh_download.json_stream import StreamingJsonReader
+
+
+def read_in_chunks(content, chunk_size, max_string_bytes=64):
+    """Feed content to a reader in chunks of the given size"""
+    reader = StreamingJsonReader(max_string_bytes=max_string_bytes)
+    for i in range(0, len(content), chunk_size):
+        reader.feed(content[i:i + chunk_size])
+    return reader
+
+
+class TestStreamingJsonReader:
+    """Test suite for StreamingJsonReader"""
+
+    @pytest.mark.parametrize('chunk_size', [1, 5, 4096])
+    def test_keeps_short_values_intact_across_chunk_boundaries(self, chunk_size):
+        document = {
+            "resourceType": "DocumentReference",
+            "description": 'quote " backslash \\ unicode é ሴ',
+            "content": [{"attachment": {"title": "Letter", "size": 12}}],
+        }
+        content = json.dumps(document, ensure_ascii=False).encode()
+
+        reader = read_in_chunks(content, chunk_size)
+
+        assert reader.document() == document
+        assert reader.truncated_string_count == 0
+        assert reader.size_bytes == len(content)
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+    def test_truncates_long_base64_values_to_a_decodable_prefix(self, chunk_size):
+        data = base64.b64encode(bytes(range(256)) * 40).decode()
+        content = json.dumps({"resourceType": "DocumentReference", "data": data}).encode()
+
+        reader = read_in_chunks(content, chunk_size, max_string_bytes=101)
+
+        document = reader.document()
+        assert document["resourceType"] == "DocumentReference"
+        assert document["data"] == data[:100]
+        base64.b64decode(document["data"])
+        assert reader.truncated_string_count == 1
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+    def test_describes_truncated_values_by_their_decoded_data(self, chunk_size):
+        attachment = bytes(range(256)) * 40 + b'end'
+        data = base64.b64encode(attachment).decode()
+        content = json.dumps({"short": "aGk=", "data": data}).encode().replace(b'/', b'\\/')
+
+        reader = read_in_chunks(content, chunk_size, max_string_bytes=101)
+
+        [streamed] = reader.truncated_strings
+        assert streamed.is_base64
+        assert streamed.size == len(attachment)
+        assert streamed.hash == base64.b64encode(hashlib.sha1(attachment).digest()).decode()
+        assert streamed.prefix == reader.document()["data"]
+
+    @pytest.mark.parametrize('tail', ['!!', 'QQ==QUJD', 'QUJ', '\\n', '\\u0041AAA'])
+    def test_truncated_values_that_are_not_base64_are_marked(self, tail):
+        data = base64.b64encode(bytes(range(256)) * 40).decode()
+        content = json.dumps({"data": "PLACEHOLDER"}).encode().replace(
+            b'PLACEHOLDER', data.encode() + tail.encode())
+
+        reader = read_in_chunks(content, 5, max_string_bytes=101)
+
+        [streamed] = reader.truncated_strings
+        assert not streamed.is_base64
+
+    @pytest.mark.parametrize('value', ['ab\\u1234cd' * 20, 'é' * 100, 'a\\b' * 60, 'x"y' * 50])
+    def test_truncated_values_never_end_part_way_through_a_character(self, value):
+        for ensure_ascii in (True, False):
+            content = json.dumps({"value": value}, ensure_ascii=ensure_ascii).encode()
+
+            for max_string_bytes in range(len('value'), 40):
+                reader = read_in_chunks(content, 3, max_string_bytes=max_string_bytes)
+                assert value.startswith(reader.document()["value"])
+
+    def test_raises_for_unterminated_document(self):
+        reader = read_in_chunks(b'{"resourceType": "Docu', 4)
+
+        with pytest.raises(ValueError):
+            reader.document()
@@ -0,0 +1,98 @@
+"""Tests for MessagePrevalidator"""
+import io
+from types import SimpleNamespace
+
+import pytest
+from mesh_download.prevalidation import MessagePrevalidator, MessageRejectedError
+
+
+def make_message(content, message_type='DATA', content_type=None):
+    """Build a message whose body is read from an in-memory stream"""
+    stream = io.BytesIO(content)
+    return SimpleNamespace(
+        message_type=message_type,
+        content_type=content_type,
+        read=stream.read,
+        stream=stream
+    )
+
+
+class TestMessagePrevalidator:
+    """Test suite for MessagePrevalidator"""
+
+    def test_accepted_message_is_read_in_full(self):
+        """A message passing every check reads back exactly as sent"""
+        content = b'{"resourceType": "DocumentReference"}'
+        prevalidator = MessagePrevalidator(max_message_bytes=1024, sniff_bytes=8)
+
+        body = prevalidator.open(make_message(content))
+
+        assert body.read() == content
+        assert body.size_bytes == len(content)
+
+    @pytest.mark.parametrize('content', [
+        b'  \r\n{"a": 1}',
+        b'\xef\xbb\xbf{"a": 1}',
+        b'',
+    ])
+    def test_json_object_start_is_accepted(self, content):
+        """Leading whitespace, a byte order mark and empty bodies pass the content check"""
+        MessagePrevalidator().open(make_message(content))
+
+    @pytest.mark.parametrize('content', [b'%PDF-1.4', b'<xml/>', b'[{"a": 1}]'])
+    def test_non_json_object_is_rejected(self, content):
+        """Content that does not start a JSON object is rejected"""
+        with pytest.raises(MessageRejectedError, match='not a JSON object'):
+            MessagePrevalidator().open(make_message(content))
+
+    def test_message_type_is_checked(self):
+        """Message types outside the allowed list are rejected, ignoring case"""
+        prevalidator = MessagePrevalidator(allowed_message_types=['data'])
+
+        prevalidator.check_headers(make_message(b'{}', message_type='DATA'))
+        with pytest.raises(MessageRejectedError, match='REPORT'):
+            prevalidator.check_headers(make_message(b'{}', message_type='REPORT'))
+
+    def test_content_type_is_checked_without_parameters(self):
+        """Content types are compared on their media type"""
+        prevalidator = MessagePrevalidator(allowed_content_types=['application/json', 'application/fhir+json'])
+
+        prevalidator.check_headers(make_message(b'{}', content_type='application/fhir+json; charset=utf-8'))
+        with pytest.raises(MessageRejectedError, match='application/pdf'):
+            prevalidator.check_headers(make_message(b'{}', content_type='application/pdf'))
+
+    def test_missing_headers_are_not_checked(self):
+        """Messages without type headers are left to the content checks"""
+        prevalidator = MessagePrevalidator(
+            allowed_content_types=['application/json'], allowed_message_types=['DATA'])
+
+        prevalidator.check_headers(make_message(b'{}', message_type=None, content_type=None))
+
+    def test_header_rejection_reads_nothing(self):
+        """A message rejected on its headers is not read at all"""
+        message = make_message(b'{}', message_type='REPORT')
+
+        with pytest.raises(MessageRejectedError):
+            MessagePrevalidator(allowed_message_types=['DATA']).open(message)
+
+        assert message.stream.tell() == 0
+
+    def test_oversize_message_is_rejected_without_reading_it_all(self):
+        """Reading stops as soon as the message is known to be too large"""
+        content = b'{"data": "' + b'a' * (10 * 1024 * 1024) + b'"}'
+        message = make_message(content)
+        body = MessagePrevalidator(max_message_bytes=1024, sniff_bytes=16).open(message)
+
+        with pytest.raises(MessageRejectedError, match='larger than the maximum of 1024 bytes'):
+            body.read()
+
+        assert message.stream.tell() < 2 * 1024 * 1024
+
+    def test_oversize_message_is_rejected_when_read_in_chunks(self):
+        """The size limit applies to streamed reads"""
+        body = MessagePrevalidator(max_message_bytes=100, sniff_bytes=16).open(
+            make_message(b'{' + b' ' * 200 + b'}'))
+
+        with pytest.raises(MessageRejectedError):
+            for _ in iter(lambda: body.read(32), b''):
+                pass
@@ -2,12 +2,17 @@
 Tests for mesh-download MeshDownloadProcessor
 Following the pattern from mesh-poll tests
 """
+import base64
+import hashlib
 import json
+import tracemalloc
 from uuid import uuid4
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 from datetime import datetime, timezone
 from pydantic import ValidationError
+from requests import Response
+from requests.exceptions import HTTPError
 from mesh_download.errors import MeshMessageNotFound
 from mesh_download.document_store import DocumentAlreadyExistsError
 
@@ -204,7 +209,8 @@ class TestMeshDownloadProcessor:
             sender_id='TEST-SENDER',
             message_reference='ref-001',
             mesh_message_id='test-message-123',
-            content=create_fhir_content()
+            content=create_fhir_content(),
+            checksum=ANY
         )
 
         mesh_message.acknowledge.assert_called_once()
@@ -240,7 +246,8 @@ class TestMeshDownloadProcessor:
         assert event_data['senderId'] == 'TEST-SENDER'
         assert event_data['messageReference'] == 'ref-001'
         assert event_data['messageUri'] == 's3://test-pii-bucket/document-reference/SENDER-001/ref-001_test-message-123'
-        assert set(event_data.keys()) == {'senderId', 'messageReference', 'messageUri', 'meshMessageId'}
+        assert event_data['checksum']['algorithm'] == 'CRC32'
+        assert set(event_data.keys()) == {'senderId', 'messageReference', 'messageUri', 'meshMessageId', 'checksum'}
 
     @patch('mesh_download.processor.datetime')
     def test_process_sqs_message_invalid_fhir_content(self, mock_datetime):
@@ -340,6 +347,33 @@ class TestMeshDownloadProcessor:
 
         config.mesh_client.retrieve_message.assert_not_called()
 
+    def test_process_sqs_message_unexpected_event_type(self):
+        """Events of a type other than MESHInboxMessageReceived should not trigger downloads"""
+        from dl_utils import RecordDecodeError
+        from mesh_download.processor import MeshDownloadProcessor
+
+        config, log, event_publisher, document_store = setup_mocks()
+
+        processor = MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=document_store,
+            event_publisher=event_publisher
+        )
+
+        cloud_event = {
+            **create_valid_cloud_event(),
+            'type': 'uk.nhs.notify.digital.letters.mesh.inbox.message.downloaded.v1'
+        }
+
+        with pytest.raises(RecordDecodeError, match="Unknown event type"):
+            processor.process_sqs_message(create_sqs_record(cloud_event=cloud_event))
+
+        config.mesh_client.retrieve_message.assert_not_called()
+
     def test_process_sqs_message_missing_mesh_message_id(self):
         """Event missing meshMessageId should not be processed"""
         from mesh_download.processor import MeshDownloadProcessor
@@ -544,3 +578,676 @@ class TestMeshDownloadProcessor:
 
         # Acknowledge should still be called to remove message from MESH inbox
         mesh_message.acknowledge.assert_called_once()
+
+
+    def test_message_uri_carries_hashed_key(self):
+        """The downloaded event's messageUri uses the document store's key layout"""
+        from mesh_download.processor import MeshDownloadProcessor
+        from mesh_download.document_store import DocumentStore, HashedKeyLayout
+
+        config, log, event_publisher, _ = setup_mocks()
+        config.s3_client.put_object.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        event_publisher.send_events.return_value = []
+        layout = HashedKeyLayout()
+
+        processor = MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=DocumentStore(config, key_layout=layout),
+            event_publisher=event_publisher
+        )
+        mesh_message = create_mesh_message()
+        mesh_message.read.return_value = create_fhir_content().encode()
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor.process_sqs_message(create_sqs_record())
+
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        expected_key = layout.document_key('TEST-SENDER', 'ref-001', 'test-message-123')
+        assert published_event['data']['messageUri'] == f's3://test-pii-bucket/{expected_key}'
+
+    def test_downloaded_event_carries_stored_checksum(self):
+        """The checksum sent to S3 with the document is the one in the downloaded event"""
+        from mesh_download.processor import MeshDownloadProcessor
+        from mesh_download.document_store import DocumentStore
+
+        config, log, event_publisher, _ = setup_mocks()
+        config.s3_client.put_object.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        event_publisher.send_events.return_value = []
+
+        processor = MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=DocumentStore(config),
+            event_publisher=event_publisher
+        )
+        mesh_message = create_mesh_message()
+        mesh_message.read.return_value = create_fhir_content().encode()
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor.process_sqs_message(create_sqs_record())
+
+        put_kwargs = config.s3_client.put_object.call_args[1]
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        assert published_event['data']['checksum'] == {
+            'algorithm': 'CRC32',
+            'value': put_kwargs['ChecksumCRC32']
+        }
+
+
+class TestMeshDownloadProcessorExistenceCheck:
+    """Test suite for skipping messages whose document is already stored"""
+
+    def create_processor(self, config, log, event_publisher, document_store, stored_document_cache=None):
+        from mesh_download.processor import MeshDownloadProcessor
+        from mesh_download.document_store import DocumentStore
+
+        document_store.document_key.side_effect = DocumentStore(Mock()).document_key
+
+        return MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=document_store,
+            event_publisher=event_publisher,
+            check_existing_documents=True,
+            stored_document_cache=stored_document_cache
+        )
+
+    def test_stored_document_is_acknowledged_without_download(self):
+        """A message whose document exists is acknowledged without being retrieved"""
+        config, log, event_publisher, document_store = setup_mocks()
+        document_store.document_exists.return_value = True
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+
+        outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'skipped'
+        document_store.document_exists.assert_called_once_with(
+            sender_id='TEST-SENDER',
+            message_reference='ref-001',
+            mesh_message_id='test-message-123'
+        )
+        config.mesh_client.retrieve_message.assert_not_called()
+        config.mesh_client.acknowledge_message.assert_called_once_with('test-message-123')
+        config.duplicate_download_metric.record.assert_called_once_with(1)
+        event_publisher.send_events.assert_not_called()
+
+    def test_missing_document_is_downloaded_and_remembered(self):
+        """A message without a document is downloaded, then recognised from the cache"""
+        from dl_utils import InMemoryTtlStore
+
+        config, log, event_publisher, document_store = setup_mocks()
+        document_store.document_exists.return_value = False
+        document_store.store_document.return_value = 'document-reference/TEST-SENDER/ref-001_test-message-123'
+        event_publisher.send_events.return_value = []
+        config.mesh_client.retrieve_message.return_value = create_mesh_message()
+        cache = InMemoryTtlStore(60)
+
+        processor = self.create_processor(config, log, event_publisher, document_store, cache)
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'downloaded'
+        assert processor.process_sqs_message(create_sqs_record()) == 'skipped'
+
+        document_store.document_exists.assert_called_once()
+        config.mesh_client.retrieve_message.assert_called_once()
+        assert cache.get('document-reference/TEST-SENDER/ref-001_test-message-123')
+
+    def test_failed_check_falls_back_to_download(self):
+        """A failure checking S3 does not stop the message being downloaded"""
+        config, log, event_publisher, document_store = setup_mocks()
+        document_store.document_exists.side_effect = Exception("S3 unavailable")
+        document_store.store_document.return_value = 'document-reference/TEST-SENDER/ref-001_test-message-123'
+        event_publisher.send_events.return_value = []
+        config.mesh_client.retrieve_message.return_value = create_mesh_message()
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'downloaded'
+
+    def test_acknowledge_failure_still_skips(self):
+        """A message already removed from the inbox is still counted as skipped"""
+        config, log, event_publisher, document_store = setup_mocks()
+        document_store.document_exists.return_value = True
+        config.mesh_client.acknowledge_message.side_effect = Exception("Not found")
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'skipped'
+
+
+def create_streaming_mesh_message(content, chunk_size=16):
+    """
+    Create a mock MESH message whose content is read in chunks
+    """
+    message = create_mesh_message()
+    content = content.encode() if isinstance(content, str) else content
+    chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+    message.read.side_effect = chunks + [b'']
+
+    return message
+
+
+def create_fhir_content_with_attachment(data, size=None, hash_=None):
+    """
+    Create FHIR JSON content whose attachment carries the given base64 data and,
+    optionally, the size and hash of the data it should decode to
+    """
+    document = json.loads(create_fhir_content())
+    document['content'][0]['attachment']['data'] = data
+    if size is not None:
+        document['content'][0]['attachment']['size'] = size
+    if hash_ is not None:
+        document['content'][0]['attachment']['hash'] = hash_
+    return json.dumps(document)
+
+
+def sha1_hash(data):
+    """
+    Base64 encoded SHA-1 hash of the data, as carried by a FHIR attachment
+    """
+    return base64.b64encode(hashlib.sha1(data).digest()).decode()
+
+
+def validate_attachment(document):
+    """
+    Stand-in for FHIR validation that checks the attachment data is valid base64,
+    of the stated size when one is given
+    """
+    attachment = document['content'][0]['attachment']
+    decoded = base64.b64decode(attachment['data'], validate=True)
+    if 'size' in attachment and len(decoded) != attachment['size']:
+        raise ValueError("Attachment size does not match its data")
+    if 'hash' in attachment and sha1_hash(decoded) != attachment['hash']:
+        raise ValueError("Attachment hash does not match its data")
+
+
+class TestMeshDownloadProcessorStreaming:
+    """Test suite for streaming MESH messages to S3"""
+
+    def create_processor(self, config, log, event_publisher, document_store):
+        from mesh_download.processor import MeshDownloadProcessor
+
+        return MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=document_store,
+            event_publisher=event_publisher,
+            streaming_part_size=5 * 1024 * 1024
+        )
+
+    def test_streams_message_to_document_upload(self):
+        """Every chunk read from MESH is written to the upload, which is completed once valid"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+        upload.complete.return_value = 'document-reference/TEST-SENDER/ref-001_test-message-123'
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        mesh_message = create_streaming_mesh_message(create_fhir_content())
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'downloaded'
+        document_store.store_document.assert_not_called()
+        document_store.start_document_upload.assert_called_once_with(
+            sender_id='TEST-SENDER',
+            message_reference='ref-001',
+            mesh_message_id='test-message-123',
+            part_size=5 * 1024 * 1024
+        )
+        written = b''.join(c[0][0] for c in upload.write.call_args_list)
+        assert written == create_fhir_content().encode()
+        upload.complete.assert_called_once()
+        upload.abort.assert_not_called()
+        mesh_message.acknowledge.assert_called_once()
+
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        assert published_event['data']['messageUri'] == \
+            's3://test-pii-bucket/document-reference/TEST-SENDER/ref-001_test-message-123'
+
+    def test_invalid_content_aborts_upload(self):
+        """Invalid FHIR content is never stored, and the message is rejected and acknowledged"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        mesh_message = create_streaming_mesh_message(json.dumps({"resourceType": "Patient"}))
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor.process_sqs_message(create_sqs_record())
+
+        upload.abort.assert_called_once()
+        upload.complete.assert_not_called()
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        assert published_event['type'] == 'uk.nhs.notify.digital.letters.mesh.inbox.message.invalid.v1'
+        mesh_message.acknowledge.assert_called_once()
+
+    def test_long_attachment_is_validated_against_its_streamed_data(self):
+        """An attachment too long to keep in full is checked against the data it decodes to"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+        upload.complete.return_value = 'document-reference/TEST-SENDER/ref-001_test-message-123'
+        attachment_data = b'%PDF' * 50000
+        content = create_fhir_content_with_attachment(
+            base64.b64encode(attachment_data).decode(),
+            size=len(attachment_data), hash_=sha1_hash(attachment_data))
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        config.mesh_client.retrieve_message.return_value = create_streaming_mesh_message(content, 4096)
+
+        with patch('mesh_download.processor.validate', side_effect=validate_attachment) as mock_validate:
+            outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'downloaded'
+        mock_validate.assert_called_once()
+        upload.complete.assert_called_once()
+
+    @pytest.mark.parametrize('size_offset, hash_data', [(1, b'%PDF' * 50000), (0, b'%PDF' * 49999)])
+    def test_long_attachment_with_wrong_size_or_hash_is_rejected(self, size_offset, hash_data):
+        """The stated size and hash of a long attachment must match the data it decodes to"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+        attachment_data = b'%PDF' * 50000
+        content = create_fhir_content_with_attachment(
+            base64.b64encode(attachment_data).decode(),
+            size=len(attachment_data) + size_offset, hash_=sha1_hash(hash_data))
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        config.mesh_client.retrieve_message.return_value = create_streaming_mesh_message(content, 4096)
+
+        with patch('mesh_download.processor.validate', side_effect=validate_attachment):
+            outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'invalid'
+        upload.abort.assert_called_once()
+        upload.complete.assert_not_called()
+
+    def test_memory_is_bounded_for_documents_larger_than_the_part_size(self):
+        """Streaming a document several times the part size never holds it in memory"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+        upload.write = lambda chunk: None
+        part_size = 5 * 1024 * 1024
+        attachment_data = b'%PDF' * (part_size * 3 // 4)
+        content = create_fhir_content_with_attachment(
+            base64.b64encode(attachment_data).decode(),
+            size=len(attachment_data), hash_=sha1_hash(attachment_data)).encode()
+        assert len(content) > 3 * part_size
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        config.mesh_client.retrieve_message.return_value = create_streaming_mesh_message(
+            content, 1024 * 1024)
+
+        tracemalloc.start()
+        try:
+            with patch('mesh_download.processor.validate', side_effect=validate_attachment):
+                outcome = processor.process_sqs_message(create_sqs_record())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert outcome == 'downloaded'
+        assert peak < part_size
+
+    def test_long_invalid_attachment_is_rejected(self):
+        """A corrupt tail beyond the length kept by the streaming reader still fails validation"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        upload = document_store.start_document_upload.return_value
+        data = base64.b64encode(b'%PDF' * 50000).decode()
+        content = create_fhir_content_with_attachment(data[:-8] + '!!not-b64')
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        mesh_message = create_streaming_mesh_message(content, 4096)
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        with patch('mesh_download.processor.validate', side_effect=validate_attachment):
+            outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'invalid'
+        upload.abort.assert_called_once()
+        upload.complete.assert_not_called()
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        assert published_event['type'] == 'uk.nhs.notify.digital.letters.mesh.inbox.message.invalid.v1'
+        mesh_message.acknowledge.assert_called_once()
+
+    def test_read_failure_aborts_upload_without_acknowledging(self):
+        """A failure part way through reading from MESH discards the partial upload"""
+        config, log, event_publisher, document_store = setup_mocks()
+        upload = document_store.start_document_upload.return_value
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        mesh_message = create_mesh_message()
+        mesh_message.read.side_effect = [b'{"resourceType": ', ConnectionError("reset")]
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        with pytest.raises(ConnectionError):
+            processor.process_sqs_message(create_sqs_record())
+
+        upload.abort.assert_called_once()
+        mesh_message.acknowledge.assert_not_called()
+
+    def test_duplicate_on_completion_skips_publish(self):
+        """The IfNoneMatch duplicate protection applies to streamed uploads"""
+        config, log, event_publisher, document_store = setup_mocks()
+        upload = document_store.start_document_upload.return_value
+        upload.complete.side_effect = DocumentAlreadyExistsError("exists")
+
+        processor = self.create_processor(config, log, event_publisher, document_store)
+        mesh_message = create_streaming_mesh_message(create_fhir_content())
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'skipped'
+        event_publisher.send_events.assert_not_called()
+        config.duplicate_download_metric.record.assert_called_once_with(1)
+        mesh_message.acknowledge.assert_called_once()
+
+
+class TestMeshDownloadProcessorPrevalidation:
+    """Test suite for rejecting messages before they are downloaded"""
+
+    def create_processor(self, config, log, event_publisher, document_store, prevalidator, **kwargs):
+        from mesh_download.processor import MeshDownloadProcessor
+
+        return MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=document_store,
+            event_publisher=event_publisher,
+            prevalidator=prevalidator,
+            **kwargs
+        )
+
+    def test_rejected_message_publishes_invalid_event_and_acknowledges(self):
+        """A message rejected on its headers is acknowledged with the pre-validation failure code"""
+        from mesh_download.prevalidation import MessagePrevalidator
+
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        mesh_message = create_mesh_message()
+        mesh_message.message_type = 'REPORT'
+        mesh_message.content_type = None
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor = self.create_processor(
+            config, log, event_publisher, document_store,
+            MessagePrevalidator(allowed_message_types=['DATA']))
+
+        outcome = processor.process_sqs_message(create_sqs_record())
+
+        assert outcome == 'invalid'
+        mesh_message.read.assert_not_called()
+        mesh_message.acknowledge.assert_called_once()
+        document_store.store_document.assert_not_called()
+        published_event = event_publisher.send_events.call_args[0][0][0]
+        assert published_event['type'] == 'uk.nhs.notify.digital.letters.mesh.inbox.message.invalid.v1'
+        assert published_event['data']['failureCode'] == 'DL_CLIV_007'
+
+    def test_oversize_message_is_rejected(self):
+        """A message larger than the maximum is rejected without being stored"""
+        from mesh_download.prevalidation import MessagePrevalidator
+
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        mesh_message = create_mesh_message()
+        mesh_message.content_type = None
+        mesh_message.read.side_effect = [b'{"resourceType": ', b'"DocumentReference"}', b'']
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor = self.create_processor(
+            config, log, event_publisher, document_store,
+            MessagePrevalidator(max_message_bytes=20, sniff_bytes=17))
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'invalid'
+        document_store.store_document.assert_not_called()
+        assert event_publisher.send_events.call_args[0][0][0]['data']['failureCode'] == 'DL_CLIV_007'
+
+    def test_oversize_streamed_message_aborts_upload(self):
+        """A streamed message found to be too large aborts its upload"""
+        from mesh_download.prevalidation import MessagePrevalidator
+
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        mesh_message = create_streaming_mesh_message(create_fhir_content())
+        mesh_message.content_type = None
+        config.mesh_client.retrieve_message.return_value = mesh_message
+        upload = document_store.start_document_upload.return_value
+
+        processor = self.create_processor(
+            config, log, event_publisher, document_store,
+            MessagePrevalidator(max_message_bytes=100, sniff_bytes=16),
+            streaming_part_size=5 * 1024 * 1024)
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'invalid'
+        upload.abort.assert_called_once()
+        upload.complete.assert_not_called()
+        mesh_message.acknowledge.assert_called_once()
+
+    def test_accepted_message_is_downloaded(self):
+        """A message passing pre-validation is downloaded and stored as usual"""
+        from mesh_download.prevalidation import MessagePrevalidator
+
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        document_store.store_document.return_value = 'document-reference/TEST-SENDER/ref-001_test-message-123'
+        content = create_fhir_content().encode()
+        mesh_message = create_mesh_message()
+        mesh_message.content_type = 'application/json'
+        mesh_message.read.side_effect = [content[:16], content[16:], b'']
+        config.mesh_client.retrieve_message.return_value = mesh_message
+
+        processor = self.create_processor(
+            config, log, event_publisher, document_store,
+            MessagePrevalidator(
+                max_message_bytes=len(content),
+                allowed_content_types=['application/json'],
+                allowed_message_types=['DATA'],
+                sniff_bytes=16))
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'downloaded'
+        assert document_store.store_document.call_args[1]['content'] == content
+
+
+def create_http_error(status_code):
+    """
+    Create the error MeshClient raises when MESH responds with an error status
+    """
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(f"{status_code} error", response=response)
+
+
+class TestMeshDownloadProcessorMissingMessages:
+    """Test suite for requests whose message is not in the MESH inbox"""
+
+    def create_processor(self, config, log, event_publisher, document_store, missing_messages):
+        from mesh_download.processor import MeshDownloadProcessor
+
+        return MeshDownloadProcessor(
+            config=config,
+            log=log,
+            mesh_client=config.mesh_client,
+            download_metric=config.download_metric,
+            duplicate_download_metric=config.duplicate_download_metric,
+            document_store=document_store,
+            event_publisher=event_publisher,
+            missing_messages=missing_messages
+        )
+
+    def create_tracker(self, sqs_client=None, dlq_url=None, dlq_threshold=None):
+        from dl_utils import InMemoryTtlStore
+        from mesh_download.missing_messages import MissingMessageTracker
+
+        metric = Mock()
+        tracker = MissingMessageTracker(
+            cache=InMemoryTtlStore(300),
+            metric=metric,
+            sqs_client=sqs_client,
+            dlq_url=dlq_url,
+            dlq_threshold=dlq_threshold
+        )
+        return tracker, metric
+
+    def test_repeated_miss_fails_without_calling_mesh(self):
+        """A message recently not found is not retrieved from MESH again"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.return_value = None
+        tracker, metric = self.create_tracker()
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        with pytest.raises(MeshMessageNotFound, match="miss 1"):
+            processor.process_sqs_message(create_sqs_record())
+        with pytest.raises(MeshMessageNotFound, match="miss 2"):
+            processor.process_sqs_message(create_sqs_record())
+
+        config.mesh_client.retrieve_message.assert_called_once_with('test-message-123')
+        assert metric.record.call_count == 2
+        assert tracker.miss_count('test-message-123') == 2
+
+    def test_not_found_error_from_mesh_client_is_tracked_as_a_miss(self):
+        """MeshClient raises on a missing message rather than returning None"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.side_effect = create_http_error(404)
+        tracker, metric = self.create_tracker()
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        with pytest.raises(MeshMessageNotFound, match="miss 1"):
+            processor.process_sqs_message(create_sqs_record())
+        with pytest.raises(MeshMessageNotFound, match="miss 2"):
+            processor.process_sqs_message(create_sqs_record())
+
+        config.mesh_client.retrieve_message.assert_called_once_with('test-message-123')
+        assert metric.record.call_count == 2
+
+    def test_gone_error_from_mesh_client_is_dead_lettered_at_threshold(self):
+        """A message MESH reports as gone counts towards the DLQ threshold"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.side_effect = create_http_error(410)
+        sqs_client = Mock()
+        tracker, _ = self.create_tracker(sqs_client=sqs_client, dlq_url='dlq-url', dlq_threshold=1)
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        assert processor.process_sqs_message(create_sqs_record()) == 'dead_lettered'
+        sqs_client.send_message.assert_called_once()
+
+    def test_other_http_errors_from_mesh_client_are_not_treated_as_misses(self):
+        """Errors other than not found are raised without recording a miss"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.side_effect = create_http_error(500)
+        tracker, metric = self.create_tracker()
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        with pytest.raises(HTTPError):
+            processor.process_sqs_message(create_sqs_record())
+
+        metric.record.assert_not_called()
+        assert tracker.miss_count('test-message-123') == 0
+
+    def test_message_is_retrieved_again_once_miss_expires(self):
+        """An expired miss no longer stops the message being retrieved"""
+        from dl_utils import InMemoryTtlStore
+        from mesh_download.missing_messages import MissingMessageTracker
+
+        now = [1000.0]
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.return_value = None
+        tracker = MissingMessageTracker(cache=InMemoryTtlStore(300, clock=lambda: now[0]))
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        with pytest.raises(MeshMessageNotFound):
+            processor.process_sqs_message(create_sqs_record())
+        now[0] += 301
+        with pytest.raises(MeshMessageNotFound, match="miss 1"):
+            processor.process_sqs_message(create_sqs_record())
+
+        assert config.mesh_client.retrieve_message.call_count == 2
+
+    def test_redelivery_after_ttl_reaches_mesh_despite_later_misses(self):
+        """Misses seen while a message is remembered do not extend how long it is remembered"""
+        from dl_utils import InMemoryTtlStore
+        from mesh_download.missing_messages import MissingMessageTracker
+
+        now = [1000.0]
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.return_value = None
+        tracker = MissingMessageTracker(cache=InMemoryTtlStore(300, clock=lambda: now[0]))
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        for redelivered_after in (0, 200, 101):
+            now[0] += redelivered_after
+            with pytest.raises(MeshMessageNotFound):
+                processor.process_sqs_message(create_sqs_record())
+
+        assert config.mesh_client.retrieve_message.call_count == 2
+
+    def test_record_is_dead_lettered_at_threshold(self):
+        """Once the threshold is reached the record is sent to the DLQ and not retried"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.return_value = None
+        sqs_client = Mock()
+        tracker, _ = self.create_tracker(sqs_client=sqs_client, dlq_url='dlq-url', dlq_threshold=2)
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+        sqs_record = create_sqs_record()
+
+        with pytest.raises(MeshMessageNotFound):
+            processor.process_sqs_message(sqs_record)
+        sqs_client.send_message.assert_not_called()
+
+        assert processor.process_sqs_message(sqs_record) == 'dead_lettered'
+        sqs_client.send_message.assert_called_once_with(
+            QueueUrl='dlq-url',
+            MessageBody=sqs_record['body'],
+            MessageAttributes={
+                'DlqReason': {'DataType': 'String', 'StringValue': 'MESH_MESSAGE_NOT_FOUND'}
+            }
+        )
+        event_publisher.send_events.assert_not_called()
+
+    def test_threshold_without_dlq_keeps_failing(self):
+        """Without a DLQ the record keeps failing so SQS can redrive it"""
+        config, log, event_publisher, document_store = setup_mocks()
+        config.mesh_client.retrieve_message.return_value = None
+        tracker, _ = self.create_tracker(dlq_threshold=1)
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        for _ in range(3):
+            with pytest.raises(MeshMessageNotFound):
+                processor.process_sqs_message(create_sqs_record())
+
+    def test_found_message_is_not_counted(self):
+        """Messages found in MESH are downloaded as usual and leave no miss"""
+        config, log, event_publisher, document_store = setup_mocks()
+        event_publisher.send_events.return_value = []
+        document_store.store_document.return_value = 'document-reference/SENDER_001/ref_001_test_123'
+        config.mesh_client.retrieve_message.return_value = create_mesh_message()
+        tracker, metric = self.create_tracker()
+        processor = self.create_processor(config, log, event_publisher, document_store, tracker)
+
+        with patch('mesh_download.processor.validate'):
+            assert processor.process_sqs_message(create_sqs_record()) == 'downloaded'
+
+        metric.record.assert_not_called()
+        assert tracker.miss_count('test-message-123') == 0
@@ -1,7 +1,13 @@
 """
 Module for configuring MESH Download application
 """
-from dl_utils import BaseMeshConfig, Metric, log
+import boto3
+from dl_utils import (
+    DEFAULT_MINIMUM_REMAINING_MILLIS, BaseMeshConfig, Metric, build_ttl_store, get_codec
+)
+from .document_store import get_key_layout
+from .missing_messages import MissingMessageTracker
+from .prevalidation import MessagePrevalidator
 
 
 _REQUIRED_ENV_VAR_MAP = {
@@ -16,6 +22,38 @@ _REQUIRED_ENV_VAR_MAP = {
     "pii_bucket": "PII_BUCKET"
 }
 
+_OPTIONAL_ENV_VAR_MAP = {
+    **BaseMeshConfig._OPTIONAL_ENV_VAR_MAP,  # pylint: disable=protected-access
+    "batch_minimum_remaining_millis": "BATCH_MINIMUM_REMAINING_MILLIS",
+    "streaming_part_size_bytes": "DOWNLOAD_STREAMING_PART_SIZE_BYTES",
+    "download_max_workers": "DOWNLOAD_MAX_WORKERS",
+    "download_existence_check": "DOWNLOAD_EXISTENCE_CHECK",
+    "stored_document_cache_ttl_seconds": "STORED_DOCUMENT_CACHE_TTL_SECONDS",
+    "document_codec_name": "DOCUMENT_CODEC",
+    "document_key_layout_name": "DOCUMENT_KEY_LAYOUT",
+    "download_prevalidation": "DOWNLOAD_PREVALIDATION",
+    "download_max_message_bytes": "DOWNLOAD_MAX_MESSAGE_BYTES",
+    "download_allowed_content_types": "DOWNLOAD_ALLOWED_CONTENT_TYPES",
+    "download_allowed_message_types": "DOWNLOAD_ALLOWED_MESSAGE_TYPES",
+    "missing_message_cache_ttl_seconds": "MISSING_MESSAGE_CACHE_TTL_SECONDS",
+    "missing_message_metric_name": "MISSING_MESSAGE_METRIC_NAME",
+    "missing_message_dlq_url": "MISSING_MESSAGE_DLQ_URL",
+    "missing_message_dlq_threshold": "MISSING_MESSAGE_DLQ_THRESHOLD",
+}
+
+DEFAULT_ALLOWED_MESSAGE_TYPES = "DATA"
+
+DEFAULT_STORED_DOCUMENT_CACHE_TTL_SECONDS = 3600
+
+DEFAULT_MISSING_MESSAGE_CACHE_TTL_SECONDS = 0
+DEFAULT_MISSING_MESSAGE_METRIC_NAME = "mesh-download-missing-messages"
+
+# Recently stored document keys, kept for the lifetime of a warm container
+_STORED_DOCUMENT_CACHES = {}
+
+# Miss counts of MESH messages recently not found, kept for the lifetime of a warm container
+_MISSING_MESSAGE_CACHES = {}
+
 
 class Config(BaseMeshConfig):
     """
@@ -24,12 +62,48 @@ class Config(BaseMeshConfig):
     """
 
     _REQUIRED_ENV_VAR_MAP = _REQUIRED_ENV_VAR_MAP
+    _OPTIONAL_ENV_VAR_MAP = _OPTIONAL_ENV_VAR_MAP
+    _BOOLEAN_ENV_VARS = {
+        *BaseMeshConfig._BOOLEAN_ENV_VARS,
+        "download_existence_check",
+        "download_prevalidation"
+    }
 
     def __init__(self, ssm=None, s3_client=None):
+        # Time left in reserve when deciding whether to start another SQS record
+        self.batch_minimum_remaining_millis = DEFAULT_MINIMUM_REMAINING_MILLIS
+        # Messages are read into memory in full unless a streaming part size is set
+        self.streaming_part_size_bytes = None
+        # SQS records are processed one at a time unless DOWNLOAD_MAX_WORKERS is set
+        self.download_max_workers = 1
+        # Stored documents are only checked for before download when DOWNLOAD_EXISTENCE_CHECK is set
+        self.download_existence_check = False
+        self.stored_document_cache_ttl_seconds = DEFAULT_STORED_DOCUMENT_CACHE_TTL_SECONDS
+        # Documents are stored uncompressed unless DOCUMENT_CODEC names a codec
+        self.document_codec_name = None
+        # Documents are keyed by sender unless DOCUMENT_KEY_LAYOUT names another layout
+        self.document_key_layout_name = None
+        # Messages are only checked before download when DOWNLOAD_PREVALIDATION is set
+        self.download_prevalidation = False
+        self.download_max_message_bytes = None
+        self.download_allowed_content_types = None
+        self.download_allowed_message_types = DEFAULT_ALLOWED_MESSAGE_TYPES
+        # Missing messages are only remembered when MISSING_MESSAGE_CACHE_TTL_SECONDS is set, and
+        # only sent to the DLQ early when both a DLQ and a threshold are set
+        self.missing_message_cache_ttl_seconds = DEFAULT_MISSING_MESSAGE_CACHE_TTL_SECONDS
+        self.missing_message_metric_name = DEFAULT_MISSING_MESSAGE_METRIC_NAME
+        self.missing_message_dlq_url = None
+        self.missing_message_dlq_threshold = None
+
         super().__init__(ssm=ssm, s3_client=s3_client)
 
         self.download_metric = None
         self.duplicate_download_metric = None
+        self.stored_document_cache = None
+        self.document_codec = None
+        self.document_key_layout = None
+        self.prevalidator = None
+        self.missing_messages = None
 
     def __enter__(self):
         super().__enter__()
@@ -38,6 +112,21 @@ class Config(BaseMeshConfig):
         self.download_metric = self.build_download_metric()
         self.duplicate_download_metric = self.build_duplicate_download_metric()
 
+        # Build cache of documents known to be stored, used to skip duplicate downloads
+        self.stored_document_cache = self.build_stored_document_cache()
+
+        # Build codec used to compress stored documents
+        self.document_codec = get_codec(self.document_codec_name)
+
+        # Build layout of document keys in the bucket
+        self.document_key_layout = get_key_layout(self.document_key_layout_name)
+
+        # Build checks made on messages before they are downloaded
+        self.prevalidator = self.build_prevalidator()
+
+        # Build tracker of messages not found in the MESH inbox
+        self.missing_messages = self.build_missing_messages()
+
         return self
 
     def build_download_metric(self):
@@ -52,7 +141,8 @@ class Config(BaseMeshConfig):
 
     def build_duplicate_download_metric(self):
         """
-        Returns a custom metric to record messages that were attempted to be downloaded more than once
+        Returns a custom metric to record messages that were attempted to be downloaded
+        more than once
         """
         return Metric(
             name=self.duplicate_download_metric_name,
@@ -60,9 +150,77 @@ class Config(BaseMeshConfig):
             dimensions={"Environment": self.environment}
         )
 
+    def build_stored_document_cache(self):
+        """
+        Returns an in-memory cache of document keys known to be stored in S3, or None
+        unless DOWNLOAD_EXISTENCE_CHECK is set. The cache lives as long as the warm
+        container, so redelivered messages are often recognised without calling S3.
+        """
+        if not self.download_existence_check:
+            return None
+
+        ttl_seconds = int(self.stored_document_cache_ttl_seconds)
+        if ttl_seconds not in _STORED_DOCUMENT_CACHES:
+            _STORED_DOCUMENT_CACHES[ttl_seconds] = build_ttl_store(ttl_seconds)
+
+        return _STORED_DOCUMENT_CACHES[ttl_seconds]
+
+    def build_prevalidator(self):
+        """
+        Returns the checks made on messages before they are downloaded, or None when
+        DOWNLOAD_PREVALIDATION is not set. Content and message types are given as
+        comma separated lists.
+        """
+        if not self.download_prevalidation:
+            return None
+
+        return MessagePrevalidator(
+            max_message_bytes=int(self.download_max_message_bytes)
+            if self.download_max_message_bytes else None,
+            allowed_content_types=_split_list(self.download_allowed_content_types),
+            allowed_message_types=_split_list(self.download_allowed_message_types)
+        )
+
+    def build_missing_message_metric(self):
+        """
+        Returns a custom metric to record requests for messages not found in the MESH inbox
+        """
+        return Metric(
+            name=self.missing_message_metric_name,
+            namespace=self.download_metric_namespace,
+            dimensions={"Environment": self.environment}
+        )
+
+    def build_missing_messages(self):
+        """
+        Returns a tracker of messages not found in the MESH inbox, or None unless
+        MISSING_MESSAGE_CACHE_TTL_SECONDS is set. Miss counts live as long as the warm
+        container, so redelivered requests for a missing message fail without
+        calling MESH.
+        """
+        ttl_seconds = int(self.missing_message_cache_ttl_seconds)
+        if ttl_seconds <= 0:
+            return None
+
+        if ttl_seconds not in _MISSING_MESSAGE_CACHES:
+            _MISSING_MESSAGE_CACHES[ttl_seconds] = build_ttl_store(ttl_seconds)
+
+        return MissingMessageTracker(
+            cache=_MISSING_MESSAGE_CACHES[ttl_seconds],
+            metric=self.build_missing_message_metric(),
+            sqs_client=boto3.client('sqs') if self.missing_message_dlq_url else None,
+            dlq_url=self.missing_message_dlq_url,
+            dlq_threshold=int(self.missing_message_dlq_threshold)
+            if self.missing_message_dlq_threshold else None
+        )
+
     @property
     def transactional_data_bucket(self):
         """
         Returns the S3 bucket for storing downloaded messages.
         """
         return self.pii_bucket
+
+
+def _split_list(value):
+    return value.split(',') if value else None
@@ -1,7 +1,20 @@
 """Module for storing document references in S3"""
 
+import base64
+import hashlib
+import zlib
+
 from botocore.exceptions import ClientError
 
+# Error codes S3 returns from head_object when an object does not exist
+_NOT_FOUND_ERROR_CODES = {'404', 'NoSuchKey', 'NotFound'}
+
+# S3 requires every part of a multipart upload other than the last to be at least 5 MiB
+MINIMUM_PART_SIZE = 5 * 1024 * 1024
+
+# Number of hex characters in the shard of a hashed key, giving 256 prefixes
+HASH_SHARD_LENGTH = 2
+
 
 class IntermediaryBodyStoreError(Exception):
     """Error to represent any failure to upload document to intermediate location"""
@@ -11,6 +24,37 @@ class DocumentAlreadyExistsError(Exception):
     """Raised when a document already exists in S3"""
 
 
+class DocumentChecksum:
+    """
+    CRC32 checksum of a stored document, computed over the stored bytes as they are
+    written. CRC32 is a full object checksum type for S3 multipart uploads, so S3
+    verifies the whole document whether it is stored in one call or in parts, and
+    keeps the same checksum with the object either way. It is read back with
+    head_object or get_object and ChecksumMode='ENABLED'.
+    """
+
+    algorithm = 'CRC32'
+
+    def __init__(self):
+        self.__crc = 0
+
+    def update(self, data):
+        """add the next bytes of the document"""
+
+        self.__crc = zlib.crc32(data, self.__crc)
+
+    @property
+    def value(self):
+        """the checksum, base64 encoded as S3 expects it"""
+
+        return _encode_crc32(self.__crc)
+
+    def to_event_data(self):
+        """returns the checksum as carried in events"""
+
+        return {'algorithm': self.algorithm, 'value': self.value}
+
+
 class DocumentStoreConfig:
     """Configuration holder for DocumentStore"""
     def __init__(self, s3_client, transactional_data_bucket):
@@ -18,32 +62,287 @@ class DocumentStoreConfig:
         self.transactional_data_bucket = transactional_data_bucket
 
 
+class SenderKeyLayout:  # pylint: disable=too-few-public-methods
+    """Keys documents by sender, so each sender's documents share one prefix"""
+
+    name = 'sender'
+
+    def document_key(self, sender_id, message_reference, mesh_message_id):
+        """returns the S3 key of a document reference"""
+
+        return f"document-reference/{sender_id}/{message_reference}_{mesh_message_id}"
+
+
+class HashedKeyLayout:  # pylint: disable=too-few-public-methods
+    """
+    Keys documents under a short hash shard ahead of the sender, spreading a busy
+    sender's writes across many prefixes. The shard is derived from the sender and
+    message reference, so a message reference always resolves to the same key.
+    """
+
+    name = 'hashed'
+
+    def __init__(self, shard_length=HASH_SHARD_LENGTH):
+        self.shard_length = shard_length
+
+    def shard(self, sender_id, message_reference):
+        """returns the hash shard of a message reference"""
+
+        digest = hashlib.sha256(f"{sender_id}/{message_reference}".encode('utf-8')).hexdigest()
+        return digest[:self.shard_length]
+
+    def document_key(self, sender_id, message_reference, mesh_message_id):
+        """returns the S3 key of a document reference"""
+
+        shard = self.shard(sender_id, message_reference)
+        return f"document-reference/{shard}/{sender_id}/{message_reference}_{mesh_message_id}"
+
+
+_KEY_LAYOUTS = {
+    SenderKeyLayout.name: SenderKeyLayout,
+    HashedKeyLayout.name: HashedKeyLayout,
+}
+
+
+def get_key_layout(name=None):
+    """
+    Returns the key layout with the given name, keying by sender when none is given.
+    Duplicate deliveries are only detected within one layout, so a change of layout
+    should not be made while messages may still be redelivered.
+    """
+    if not name:
+        return SenderKeyLayout()
+
+    if name.lower() not in _KEY_LAYOUTS:
+        raise ValueError(f"Unknown document key layout {name}")
+
+    return _KEY_LAYOUTS[name.lower()]()
+
+
 class DocumentStore:  # pylint: disable=too-few-public-methods
-    """Class for storing document references in S3"""
+    """
+    Class for storing document references in S3, compressed with the given codec
+    if there is one
+    """
 
-    def __init__(self, config):
+    def __init__(self, config, codec=None, key_layout=None):
         self.config = config
+        self.codec = codec
+        self.key_layout = key_layout or SenderKeyLayout()
+
+    def store_document(self, sender_id, message_reference, mesh_message_id, content,
+                       checksum=None):
+        """
+        store document reference in S3, adding the stored bytes to checksum if one
+        is given
+        """
+
+        s3_key = self.document_key(sender_id, message_reference, mesh_message_id)
+
+        if self.codec:
+            content = self.codec.compress(content)
 
-    def store_document(self, sender_id, message_reference, mesh_message_id, content):
-        """store document reference in S3"""
+        return _put_document(self.config, s3_key, content, self.codec, checksum)
 
-        s3_key = f"document-reference/{sender_id}/{message_reference}_{mesh_message_id}"
+    def document_exists(self, sender_id, message_reference, mesh_message_id):
+        """check whether a document reference is already stored in S3"""
+
+        s3_key = self.document_key(sender_id, message_reference, mesh_message_id)
 
         try:
-            s3_response = self.config.s3_client.put_object(
+            self.config.s3_client.head_object(
                 Bucket=self.config.transactional_data_bucket,
-                Key=s3_key,
-                Body=content,
+                Key=s3_key
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in _NOT_FOUND_ERROR_CODES:
+                return False
+            raise IntermediaryBodyStoreError(e) from e
+
+        return True
+
+    def start_document_upload(self, sender_id, message_reference, mesh_message_id,
+                              part_size=MINIMUM_PART_SIZE):
+        """start a streamed upload of a document reference to S3"""
+
+        return DocumentUpload(
+            self.config,
+            self.document_key(sender_id, message_reference, mesh_message_id),
+            part_size,
+            self.codec
+        )
+
+    def document_key(self, sender_id, message_reference, mesh_message_id):
+        """returns the S3 key of a document reference"""
+
+        return self.key_layout.document_key(sender_id, message_reference, mesh_message_id)
+
+
+class DocumentUpload:
+    """
+    Streams a document reference to S3, holding at most one part in memory.
+    Documents that fit in a single part are stored with one put_object call;
+    larger documents use a multipart upload that is only completed, with the same
+    IfNoneMatch protection against duplicates, once the whole document has been
+    written. Until then nothing is visible at the document key.
+
+    With a codec, the document is compressed as it is written and size_bytes
+    counts the bytes written before compression. The checksum covers the bytes
+    stored, and is sent to S3 for verification as each part is uploaded.
+    """
+
+    def __init__(self, config, s3_key, part_size=MINIMUM_PART_SIZE, codec=None):
+        self.config = config
+        self.s3_key = s3_key
+        self.part_size = max(part_size, MINIMUM_PART_SIZE)
+        self.codec = codec
+        self.size_bytes = 0
+        self.checksum = DocumentChecksum()
+        self.__compressor = codec.compressor() if codec else None
+        self.__buffer = bytearray()
+        self.__upload_id = None
+        self.__parts = []
+
+    def write(self, data):
+        """write the next bytes of the document"""
+
+        self.size_bytes += len(data)
+        if self.__compressor:
+            data = self.__compressor.compress(data)
+        self.__buffer += data
+
+        while len(self.__buffer) >= self.part_size:
+            part = bytes(self.__buffer[:self.part_size])
+            del self.__buffer[:self.part_size]
+            try:
+                self.__upload_part(part)
+            except ClientError as e:
+                raise IntermediaryBodyStoreError(e) from e
+
+    def complete(self):
+        """store the document, returning its S3 key"""
+
+        if self.__compressor:
+            self.__buffer += self.__compressor.flush()
+            self.__compressor = None
+
+        if self.__upload_id is None:
+            return _put_document(
+                self.config, self.s3_key, bytes(self.__buffer), self.codec, self.checksum)
+
+        try:
+            if self.__buffer:
+                self.__upload_part(bytes(self.__buffer))
+                self.__buffer = bytearray()
+
+            s3_response = self.config.s3_client.complete_multipart_upload(
+                Bucket=self.config.transactional_data_bucket,
+                Key=self.s3_key,
+                UploadId=self.__upload_id,
+                MultipartUpload={'Parts': self.__parts},
+                ChecksumCRC32=self.checksum.value,
+                ChecksumType='FULL_OBJECT',
                 IfNoneMatch='*'
             )
         except ClientError as e:
+            self.abort()
             if e.response['Error']['Code'] == 'PreconditionFailed':
                 raise DocumentAlreadyExistsError(
-                    f"Document already exists for key: {s3_key}"
+                    f"Document already exists for key: {self.s3_key}"
                 ) from e
             raise IntermediaryBodyStoreError(e) from e
 
         if s3_response['ResponseMetadata']['HTTPStatusCode'] != 200:
             raise IntermediaryBodyStoreError(s3_response)
 
-        return s3_key
+        self.__upload_id = None
+        return self.s3_key
+
+    def abort(self):
+        """discard anything uploaded so far"""
+
+        self.__buffer = bytearray()
+
+        if self.__upload_id is None:
+            return
+
+        upload_id, self.__upload_id = self.__upload_id, None
+        self.config.s3_client.abort_multipart_upload(
+            Bucket=self.config.transactional_data_bucket,
+            Key=self.s3_key,
+            UploadId=upload_id
+        )
+
+    def __upload_part(self, part):
+        if self.__upload_id is None:
+            self.__upload_id = self.config.s3_client.create_multipart_upload(
+                Bucket=self.config.transactional_data_bucket,
+                Key=self.s3_key,
+                ChecksumAlgorithm=DocumentChecksum.algorithm,
+                ChecksumType='FULL_OBJECT',
+                **_encoding_attributes(self.codec)
+            )['UploadId']
+
+        part_number = len(self.__parts) + 1
+        part_checksum = _encode_crc32(zlib.crc32(part))
+        s3_response = self.config.s3_client.upload_part(
+            Bucket=self.config.transactional_data_bucket,
+            Key=self.s3_key,
+            UploadId=self.__upload_id,
+            PartNumber=part_number,
+            Body=part,
+            ChecksumCRC32=part_checksum
+        )
+        self.checksum.update(part)
+
+        self.__parts.append({
+            'PartNumber': part_number,
+            'ETag': s3_response['ETag'],
+            'ChecksumCRC32': part_checksum
+        })
+
+
+def _encoding_attributes(codec):
+    """returns the S3 object attributes recording how a document is encoded"""
+
+    if not codec:
+        return {}
+
+    return {'ContentEncoding': codec.content_encoding, 'Metadata': codec.metadata}
+
+
+def _encode_crc32(crc):
+    """returns a CRC32 value base64 encoded, as S3 expects it"""
+
+    return base64.b64encode(crc.to_bytes(4, 'big')).decode('ascii')
+
+
+def _put_document(config, s3_key, content, codec=None, checksum=None):
+    """
+    store content at an S3 key, unless a document already exists there. S3 verifies
+    the content against its checksum and keeps the checksum with the object.
+    """
+
+    checksum = checksum or DocumentChecksum()
+    checksum.update(content)
+
+    try:
+        s3_response = config.s3_client.put_object(
+            Bucket=config.transactional_data_bucket,
+            Key=s3_key,
+            Body=content,
+            ChecksumCRC32=checksum.value,
+            IfNoneMatch='*',
+            **_encoding_attributes(codec)
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'PreconditionFailed':
+            raise DocumentAlreadyExistsError(
+                f"Document already exists for key: {s3_key}"
+            ) from e
+        raise IntermediaryBodyStoreError(e) from e
+
+    if s3_response['ResponseMetadata']['HTTPStatusCode'] != 200:
+        raise IntermediaryBodyStoreError(s3_response)
+
+    return s3_key
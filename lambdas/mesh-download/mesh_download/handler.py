@@ -1,9 +1,10 @@
 """lambda handler for mesh download"""
 
 import json
-from dl_utils import EventPublisher
+import threading
+from dl_utils import EventPublisher, SqsBatchRunner, log, map_concurrently
 
-from .config import Config, log
+from .config import Config
 from .processor import MeshDownloadProcessor
 from .document_store import DocumentStore, DocumentStoreConfig
 
@@ -17,21 +18,17 @@ def handler(event, context):
 
     log.info("Received SQS event", record_count=len(event.get('Records', [])))
 
-    batch_item_failures = []
-    processed = {
-        'retrieved': 0,
-        'downloaded': 0,
-        'skipped': 0,
-        'failed': 0
-    }
-
     try:
         with Config() as config:
             doc_store_config = DocumentStoreConfig(
                 s3_client=config.s3_client,
                 transactional_data_bucket=config.transactional_data_bucket
             )
-            document_store = DocumentStore(doc_store_config)
+            document_store = DocumentStore(
+                doc_store_config,
+                codec=config.document_codec,
+                key_layout=config.document_key_layout
+            )
 
             event_publisher = EventPublisher(
                 event_bus_arn=config.event_publisher_event_bus_arn,
@@ -39,44 +36,98 @@ def handler(event, context):
                 logger=log
             )
 
-            processor = MeshDownloadProcessor(
-                config=config,
-                log=log,
-                mesh_client=config.mesh_client,
-                download_metric=config.download_metric,
-                duplicate_download_metric=config.duplicate_download_metric,
-                document_store=document_store,
-                event_publisher=event_publisher
+            def build_processor(mesh_client):
+                return MeshDownloadProcessor(
+                    config=config,
+                    log=log,
+                    mesh_client=mesh_client,
+                    download_metric=config.download_metric,
+                    duplicate_download_metric=config.duplicate_download_metric,
+                    document_store=document_store,
+                    event_publisher=event_publisher,
+                    streaming_part_size=int(config.streaming_part_size_bytes or 0),
+                    check_existing_documents=config.download_existence_check,
+                    stored_document_cache=config.stored_document_cache,
+                    prevalidator=config.prevalidator,
+                    missing_messages=config.missing_messages
+                )
+
+            processor = build_processor(config.mesh_client)
+
+            runner = SqsBatchRunner(
+                logger=log,
+                outcomes=('downloaded', 'skipped', 'invalid', 'dead_lettered'),
+                get_remaining_time_in_millis=getattr(context, 'get_remaining_time_in_millis', None),
+                minimum_remaining_millis=int(config.batch_minimum_remaining_millis),
+                metric_namespace=config.download_metric_namespace,
+                dimensions={"Environment": config.environment}
             )
 
-            # Process each SQS record
-            for record in event.get('Records', []):
-                processed['retrieved'] += 1
-                message_id = record.get('messageId')
-
-                if record.get('eventSource') != 'aws:sqs':
-                    log.warn("Skipping non-SQS record", message_id=message_id)
-                    continue
-
-                try:
-                    outcome = processor.process_sqs_message(record)
-                    processed[outcome] += 1
-
-                except Exception as exc:
-                    processed['failed'] += 1
-                    log.error("Failed to process SQS message",
-                            message_id=message_id,
-                            error=str(exc))
-                    batch_item_failures.append({"itemIdentifier": message_id})
+            records = event.get('Records', [])
+            max_workers = int(config.download_max_workers or 1)
+            if max_workers > 1 and len(records) > 1:
+                with WorkerProcessors(processor, build_processor, config) as processors:
+                    result = runner.run(
+                        records,
+                        lambda record: processors.get().process_sqs_message(record),
+                        map_records=map_concurrently(max_workers))
+            else:
+                result = runner.run(records, processor.process_sqs_message)
 
         log.info("Processed SQS event",
-                retrieved=processed['retrieved'],
-                downloaded=processed['downloaded'],
-                skipped=processed['skipped'],
-                failed=processed['failed'])
+                retrieved=result.counts['retrieved'],
+                downloaded=result.counts['downloaded'],
+                skipped=result.counts['skipped'],
+                invalid=result.counts['invalid'],
+                dead_lettered=result.counts['dead_lettered'],
+                failed=result.counts['failed'],
+                unstarted=result.counts['unstarted'])
 
-        return {"batchItemFailures": batch_item_failures}
+        return result.response()
 
     except Exception as exc:
         log.error("Error in mesh download handler", error=str(exc))
         raise
+
+
+class WorkerProcessors:
+    """
+    Gives each worker thread its own processor. MESH clients hold an HTTP session
+    that is not safe to share between threads, so each worker uses its own client;
+    the first worker reuses the primary processor. The boto3 clients behind the
+    document store and event publisher are thread-safe and shared.
+    """
+
+    def __init__(self, processor, build_processor, config):
+        self.__processor = processor
+        self.__build_processor = build_processor
+        self.__config = config
+        self.__local = threading.local()
+        self.__extra_mesh_clients = []
+        self.__lock = threading.Lock()
+        self.__primary_claimed = False
+
+    def get(self):
+        """
+        Returns the processor for the current thread, building it if needed
+        """
+        if not hasattr(self.__local, 'processor'):
+            with self.__lock:
+                if not self.__primary_claimed:
+                    self.__primary_claimed = True
+                    self.__local.processor = self.__processor
+                    return self.__local.processor
+
+                mesh_client = self.__config.build_mesh_client()
+                self.__extra_mesh_clients.append(mesh_client)
+
+            self.__local.processor = self.__build_processor(mesh_client)
+
+        return self.__local.processor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for mesh_client in self.__extra_mesh_clients:
+            mesh_client.close()
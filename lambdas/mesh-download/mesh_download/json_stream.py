@@ -0,0 +1,262 @@
+"""Module for reading large JSON documents from a stream in bounded memory"""
+
+import base64
+import binascii
+import hashlib
+import json
+import re
+
+# Long string values (such as base64 attachments) are kept up to this many bytes
+DEFAULT_MAX_STRING_BYTES = 64 * 1024
+
+_STRING_SPECIAL = re.compile(rb'[\\"]')
+_BACKSLASH = ord('\\')
+
+
+class StreamingJsonReader:
+    """
+    Consumes a JSON document chunk by chunk, keeping its structure but only a bounded
+    prefix of each string value. Very large values, such as base64 encoded
+    attachments, therefore never need to be held in memory in full, while the rest
+    of the document can still be parsed once the stream has ended. A document with
+    truncated strings is not the document that was sent, so truncated_string_count
+    tells callers when it must not be relied on for validation on its own.
+
+    Each truncated string is also decoded as base64 as it is read, and described by
+    a StreamedString in truncated_strings, in document order. Callers can check the
+    size and hash of an attachment against the data it really decodes to.
+
+    Truncated strings are cut to a multiple of four bytes, so a truncated base64
+    value still decodes, and never end part way through an escape sequence or a
+    multi-byte character. Object keys are strings too, so max_string_bytes must be
+    longer than any key the document's validation relies on.
+    """
+
+    def __init__(self, max_string_bytes=DEFAULT_MAX_STRING_BYTES):
+        self.max_string_bytes = max_string_bytes
+        self.size_bytes = 0
+        self.truncated_string_count = 0
+        self.truncated_strings = []
+        self.__buffer = bytearray()
+        self.__in_string = False
+        self.__escape_pending = False
+        self.__string_start = 0
+        self.__string_truncated = False
+        self.__streamed_string = None
+
+    def feed(self, chunk):
+        """
+        Consumes the next chunk of the document
+        """
+        self.size_bytes += len(chunk)
+        position = 0
+
+        while position < len(chunk):
+            if not self.__in_string:
+                string_open = chunk.find(b'"', position)
+                if string_open == -1:
+                    self.__buffer += chunk[position:]
+                    return
+
+                self.__buffer += chunk[position:string_open + 1]
+                self.__open_string()
+                position = string_open + 1
+                continue
+
+            if self.__escape_pending:
+                self.__append_to_string(chunk[position:position + 1])
+                self.__escape_pending = False
+                position += 1
+                continue
+
+            special = _STRING_SPECIAL.search(chunk, position)
+            if special is None:
+                self.__append_to_string(chunk[position:])
+                return
+
+            self.__append_to_string(chunk[position:special.start()])
+            position = special.end()
+
+            if chunk[special.start()] == _BACKSLASH:
+                self.__append_to_string(b'\\')
+                self.__escape_pending = True
+            else:
+                self.__close_string()
+
+    def document(self):
+        """
+        Returns the parsed document, with long string values truncated
+        """
+        if self.__in_string:
+            raise ValueError("JSON document ended inside a string")
+
+        return json.loads(bytes(self.__buffer))
+
+    def __open_string(self):
+        self.__in_string = True
+        self.__escape_pending = False
+        self.__string_start = len(self.__buffer)
+        self.__string_truncated = False
+        self.__streamed_string = None
+
+    def __append_to_string(self, data):
+        if self.__string_truncated:
+            self.__streamed_string.feed(data)
+            return
+
+        room = self.max_string_bytes - (len(self.__buffer) - self.__string_start)
+        if len(data) <= room:
+            self.__buffer += data
+            return
+
+        # The string is too long to keep, so from here it is decoded as it is read
+        self.__string_truncated = True
+        self.__streamed_string = StreamedString()
+        self.__streamed_string.feed(bytes(self.__buffer[self.__string_start:]))
+        self.__streamed_string.feed(data)
+        self.__buffer += data[:max(room, 0)]
+
+    def __close_string(self):
+        if self.__string_truncated:
+            self.__trim_truncated_string()
+            self.__streamed_string.close()
+            self.__streamed_string.prefix = _json_string(self.__buffer[self.__string_start:])
+            self.truncated_strings.append(self.__streamed_string)
+            self.truncated_string_count += 1
+
+        self.__buffer += b'"'
+        self.__in_string = False
+
+    def __trim_truncated_string(self):
+        """
+        Cuts a truncated string back to a multiple of four bytes, then back to the
+        start of any incomplete escape sequence or multi-byte character
+        """
+        length = len(self.__buffer) - self.__string_start
+        end = self.__string_start + length - length % 4
+
+        value = bytes(self.__buffer[self.__string_start:end])
+        escape_start = _incomplete_escape_start(value)
+        if escape_start is not None:
+            value = value[:escape_start]
+
+        # Drop any trailing bytes of an incomplete UTF-8 character
+        while value and value[-1] >= 0x80:
+            try:
+                value.decode('utf-8')
+                break
+            except UnicodeDecodeError:
+                value = value[:-1]
+
+        del self.__buffer[self.__string_start:]
+        self.__buffer += value
+
+
+class StreamedString:
+    """
+    Describes a string value too long to keep in full by the data it decodes to as
+    base64, worked out as the value is read. size and hash (base64 SHA-1, as used by
+    FHIR attachments) are only meaningful when is_base64 is True. prefix is the part
+    of the value kept in the document.
+    """
+
+    def __init__(self):
+        self.prefix = None
+        self.size = 0
+        self.is_base64 = True
+        self.__sha1 = hashlib.sha1(usedforsecurity=False)
+        self.__undecoded = b''
+        self.__escape_pending = False
+        self.__padded = False
+
+    @property
+    def hash(self):
+        """
+        Base64 encoded SHA-1 hash of the decoded data
+        """
+        return base64.b64encode(self.__sha1.digest()).decode('ascii')
+
+    def feed(self, data):
+        """
+        Decodes the next part of the value, as it appears in the JSON document
+        """
+        if not self.is_base64:
+            return
+
+        data = self.__undecoded + self.__unescape(data)
+        complete = len(data) - len(data) % 4
+        self.__undecoded = data[complete:]
+        self.__decode(data[:complete])
+
+    def close(self):
+        """
+        Marks the end of the value, which must have been a whole number of base64 blocks
+        """
+        if self.__undecoded or self.__escape_pending:
+            self.is_base64 = False
+
+    def __unescape(self, data):
+        """
+        Removes JSON escapes from base64 data, where only an escaped slash is valid
+        """
+        if self.__escape_pending:
+            self.__escape_pending = False
+            if data[:1] != b'/':
+                self.is_base64 = False
+                return b''
+
+        if data.endswith(b'\\') and not data.endswith(b'\\\\'):
+            self.__escape_pending = True
+            data = data[:-1]
+
+        data = data.replace(b'\\/', b'/')
+        if b'\\' in data:
+            self.is_base64 = False
+            return b''
+
+        return data
+
+    def __decode(self, data):
+        if not data or not self.is_base64:
+            return
+
+        try:
+            if self.__padded:
+                raise binascii.Error("Excess data after padding")
+            decoded = base64.b64decode(data, validate=True)
+        except binascii.Error:
+            self.is_base64 = False
+            return
+
+        self.__padded = data.endswith(b'=')
+        self.size += len(decoded)
+        self.__sha1.update(decoded)
+
+
+def _json_string(value):
+    """
+    Returns the string a JSON string value's contents stand for, or None if they are
+    not valid, which the document itself then fails on when it is parsed
+    """
+    try:
+        return json.loads(b'"' + bytes(value) + b'"')
+    except ValueError:
+        return None
+
+
+def _incomplete_escape_start(value):
+    """
+    Returns the index of an escape sequence left incomplete at the end of a string
+    value, or None if the value does not end part way through one
+    """
+    index = value.rfind(b'\\', max(len(value) - 6, 0))
+    if index == -1:
+        return None
+
+    # The last backslash only starts an escape if it ends an odd run of backslashes
+    run_length = len(value[:index + 1]) - len(value[:index + 1].rstrip(b'\\'))
+    if run_length % 2 == 0:
+        return None
+
+    needed = 6 if value[index + 1:index + 2] == b'u' else 2
+    return index if len(value) - index < needed else None
@@ -0,0 +1,67 @@
+"""Module for tracking MESH messages that could not be found in the inbox"""
+
+# Reason attached to records sent to the DLQ because their message was not found
+MISSING_MESSAGE_DLQ_REASON = 'MESH_MESSAGE_NOT_FOUND'
+
+
+class MissingMessageTracker:
+    """
+    Remembers, for the lifetime of a warm container, how many times each MESH
+    message has not been found. SQS redelivers a record whose message is missing
+    several times; once a message is known to be missing, redeliveries fail without
+    another round trip to MESH until the entry expires. Later misses keep the expiry
+    of the first, so a message is always looked up in MESH again after the TTL. When dlq_threshold misses
+    have been seen and a DLQ is configured, the record is sent straight to the DLQ
+    rather than waiting for SQS to exhaust its receive count.
+    """
+
+    def __init__(self, cache, metric=None, sqs_client=None, dlq_url=None, dlq_threshold=None):
+        self.__cache = cache
+        self.__metric = metric
+        self.__sqs_client = sqs_client
+        self.__dlq_url = dlq_url
+        self.__dlq_threshold = dlq_threshold
+
+    def miss_count(self, mesh_message_id):
+        """
+        Returns the number of times a message has recently not been found
+        """
+        return self.__cache.get(mesh_message_id) or 0
+
+    def record_miss(self, mesh_message_id):
+        """
+        Records that a message was not found, returning the number of misses so far
+        """
+        entry = self.__cache.get_entry(mesh_message_id)
+        if entry is None:
+            miss_count = 1
+            self.__cache.put(mesh_message_id, miss_count)
+        else:
+            miss_count = entry[0] + 1
+            self.__cache.put(mesh_message_id, miss_count, expires_at=entry[1])
+
+        if self.__metric is not None:
+            self.__metric.record(1)
+
+        return miss_count
+
+    def should_dead_letter(self, miss_count):
+        """
+        Returns True once a record has missed often enough to be sent to the DLQ
+        """
+        return bool(self.__dlq_url and self.__dlq_threshold) and miss_count >= self.__dlq_threshold
+
+    def dead_letter(self, sqs_record):
+        """
+        Sends the body of an SQS record to the DLQ
+        """
+        self.__sqs_client.send_message(
+            QueueUrl=self.__dlq_url,
+            MessageBody=sqs_record['body'],
+            MessageAttributes={
+                'DlqReason': {
+                    'DataType': 'String',
+                    'StringValue': MISSING_MESSAGE_DLQ_REASON
+                }
+            }
+        )
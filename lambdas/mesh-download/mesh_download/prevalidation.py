@@ -0,0 +1,126 @@
+"""Module for rejecting unsuitable MESH messages before their body is downloaded"""
+
+# Failure code published for messages rejected by pre-validation
+PREVALIDATION_FAILURE_CODE = 'DL_CLIV_007'
+
+# Bytes read from the start of a message to check that it looks like a JSON object
+DEFAULT_SNIFF_BYTES = 4096
+
+# Size of each read when the whole of a size-limited message is read
+READ_CHUNK_BYTES = 1024 * 1024
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+_JSON_WHITESPACE = b' \t\r\n'
+
+
+class MessageRejectedError(Exception):
+    """Raised when a message fails pre-validation"""
+
+
+class MessagePrevalidator:
+    """
+    Checks a MESH message before its body is downloaded. The message type and
+    content type headers are checked first, then the first few kilobytes of the
+    stream must start a JSON object. The body is then read through a reader that
+    gives up as soon as the message grows beyond the maximum size, so an oversize
+    message is never pulled in full.
+    """
+
+    def __init__(self, max_message_bytes=None, allowed_content_types=None,
+                 allowed_message_types=None, sniff_bytes=DEFAULT_SNIFF_BYTES):
+        self.max_message_bytes = max_message_bytes
+        self.allowed_content_types = _normalise(allowed_content_types)
+        self.allowed_message_types = _normalise(allowed_message_types)
+        self.sniff_bytes = sniff_bytes
+
+    def check_headers(self, message):
+        """
+        Raises MessageRejectedError if the message's headers rule it out. Headers
+        that are not present are not checked.
+        """
+        message_type = getattr(message, 'message_type', None)
+        if self.allowed_message_types and message_type and \
+                message_type.lower() not in self.allowed_message_types:
+            raise MessageRejectedError(f"Message type {message_type} is not accepted")
+
+        content_type = getattr(message, 'content_type', None)
+        if self.allowed_content_types and content_type and \
+                _media_type(content_type) not in self.allowed_content_types:
+            raise MessageRejectedError(f"Content type {content_type} is not accepted")
+
+    def check_start(self, prefix):
+        """
+        Raises MessageRejectedError if the start of a message is not the start of
+        a JSON object
+        """
+        content = prefix[len(_UTF8_BOM):] if prefix.startswith(_UTF8_BOM) else prefix
+        content = content.lstrip(_JSON_WHITESPACE)
+
+        if content and not content.startswith(b'{'):
+            raise MessageRejectedError("Message content is not a JSON object")
+
+    def open(self, message):
+        """
+        Checks a message's headers and the start of its content, returning a reader
+        over the whole body that enforces the maximum size
+        """
+        self.check_headers(message)
+
+        prefix = message.read(self.sniff_bytes)
+        self.check_start(prefix)
+
+        return PrevalidatedBody(message, prefix, self.max_message_bytes)
+
+
+class PrevalidatedBody:  # pylint: disable=too-few-public-methods
+    """
+    Reader over a message body whose first bytes have already been read, raising
+    MessageRejectedError once more than max_message_bytes have been read
+    """
+
+    def __init__(self, message, prefix, max_message_bytes=None):
+        self.__message = message
+        self.__prefix = prefix
+        self.__max_message_bytes = max_message_bytes
+        self.size_bytes = len(prefix)
+        self.__check_size()
+
+    def read(self, size=None):
+        """
+        Reads up to size bytes of the message, or the rest of it when size is not given
+        """
+        if size is None:
+            if self.__max_message_bytes is None:
+                return self.__take_prefix(None) + self.__read_message(None)
+
+            # Read in bounded chunks, so an oversize message is rejected part way through
+            return b''.join(iter(lambda: self.read(READ_CHUNK_BYTES), b''))
+
+        return self.__take_prefix(size) or self.__read_message(size)
+
+    def __take_prefix(self, size):
+        data = self.__prefix if size is None else self.__prefix[:size]
+        self.__prefix = self.__prefix[len(data):]
+        return data
+
+    def __read_message(self, size):
+        data = self.__message.read(size)
+        self.size_bytes += len(data)
+        self.__check_size()
+        return data
+
+    def __check_size(self):
+        if self.__max_message_bytes is not None and self.size_bytes > self.__max_message_bytes:
+            raise MessageRejectedError(
+                f"Message is larger than the maximum of {self.__max_message_bytes} bytes")
+
+
+def _normalise(values):
+    if not values:
+        return None
+
+    return {value.strip().lower() for value in values if value.strip()}
+
+
+def _media_type(content_type):
+    return content_type.split(';', 1)[0].strip().lower()
@@ -1,12 +1,27 @@
+import base64
+import hashlib
 import json
 from datetime import datetime, timezone
 from uuid import uuid4
 
-from pydantic import ValidationError
 from digital_letters_events import MESHInboxMessageDownloaded, MESHInboxMessageReceived, MESHInboxMessageInvalid
+from dl_utils import RecordDecoder
 from mesh_download.errors import MeshMessageNotFound
-from mesh_download.document_store import DocumentAlreadyExistsError
+from mesh_download.document_store import DocumentAlreadyExistsError, DocumentChecksum
+from mesh_download.json_stream import StreamingJsonReader
+from mesh_download.prevalidation import MessageRejectedError, PREVALIDATION_FAILURE_CODE
 from nhs_notify_letters_onboarding import validate
+from requests.exceptions import HTTPError
+
+# Statuses MESH responds with when a message is not, or is no longer, in the inbox
+MESSAGE_NOT_FOUND_STATUS_CODES = {404, 410}
+
+# Size of each read from MESH when streaming a message to S3
+STREAMING_READ_SIZE = 1024 * 1024
+
+RECEIVED_EVENT_TYPE = 'uk.nhs.notify.digital.letters.mesh.inbox.message.received.v1'
+
+_EVENT_DECODER = RecordDecoder({RECEIVED_EVENT_TYPE: MESHInboxMessageReceived})
 
 
 class MeshDownloadProcessor:
@@ -18,6 +33,11 @@ class MeshDownloadProcessor:
         self.__duplicate_download_metric = kwargs['duplicate_download_metric']
         self.__document_store = kwargs['document_store']
         self.__event_publisher = kwargs['event_publisher']
+        self.__streaming_part_size = kwargs.get('streaming_part_size')
+        self.__check_existing_documents = kwargs.get('check_existing_documents', False)
+        self.__stored_document_cache = kwargs.get('stored_document_cache')
+        self.__prevalidator = kwargs.get('prevalidator')
+        self.__missing_messages = kwargs.get('missing_messages')
 
         self.__mesh_client.handshake()
 
@@ -29,7 +49,7 @@ class MeshDownloadProcessor:
             logger = self.__log.bind(mesh_message_id=validated_event.data.meshMessageId)
 
             logger.info("Processing MESH download request")
-            return self._handle_download(validated_event, logger)
+            return self._handle_download(validated_event, logger, sqs_record)
 
         except Exception as exc:
             self.__log.error(
@@ -40,32 +60,42 @@ class MeshDownloadProcessor:
             raise
 
     def _parse_and_validate_event(self, sqs_record):
-        message_body = json.loads(sqs_record['body'])
-        event_detail = message_body.get('detail', {})
+        decoded = _EVENT_DECODER.decode(sqs_record)
 
-        try:
-            event = MESHInboxMessageReceived(**event_detail)
-            self.__log.debug("CloudEvent validation passed")
-            return event
-        except ValidationError as e:
+        if decoded.error is not None:
             self.__log.error(
                 "CloudEvent validation failed",
-                validation_errors=str(e),
-                event_detail=event_detail
+                reason=decoded.error.reason,
+                event_type=decoded.error.event_type,
+                validation_errors=str(decoded.error.exception or decoded.error)
             )
-            raise
+            raise decoded.error.exception or decoded.error
+
+        self.__log.debug("CloudEvent validation passed")
+        return decoded.event
 
     def _validate_fhir_content(self, content):
         json_content = json.loads(content)
         validate(json_content)
 
-    def _handle_download(self, event, logger):
+    def _validate_fhir_document(self, document):
+        validate(document)
+
+    def _handle_download(self, event, logger, sqs_record=None):
         data = event.data
 
-        message = self.__mesh_client.retrieve_message(data.meshMessageId)
+        if self.__check_existing_documents and self._is_document_stored(data, logger):
+            return self._skip_stored_document(data, logger)
+
+        missing_messages = self.__missing_messages
+        if missing_messages is not None and missing_messages.miss_count(data.meshMessageId):
+            logger.warning("Message recently not found in MESH inbox, not retrieving it again")
+            return self._handle_missing_message(data, logger, sqs_record)
+
+        message = self._retrieve_message(data.meshMessageId)
         if not message:
             logger.error("Message not found in MESH inbox")
-            raise MeshMessageNotFound(f"MESH message with ID {data.meshMessageId} not found")
+            return self._handle_missing_message(data, logger, sqs_record)
 
         logger.info(
             "Retrieved MESH message",
@@ -76,7 +106,16 @@ class MeshDownloadProcessor:
             message_type=getattr(message, 'message_type', '')
         )
 
-        content = message.read()
+        try:
+            body = self.__prevalidator.open(message) if self.__prevalidator else message
+
+            if self.__streaming_part_size:
+                return self._handle_streaming_download(event, message, body, logger)
+
+            content = body.read()
+        except MessageRejectedError as e:
+            return self._reject_message(event, message, logger, e)
+
         logger.info("Downloaded MESH message content")
 
         try:
@@ -89,17 +128,194 @@ class MeshDownloadProcessor:
             message.acknowledge()
             logger.info("Acknowledged message")
 
-            return
+            return 'invalid'
 
-        duplicate = False
-        try:
-            uri = self._store_message_content(
+        checksum = DocumentChecksum()
+
+        return self._complete_download(
+            event, message, logger,
+            lambda: self._store_message_content(
                 sender_id=data.senderId,
                 message_reference=data.messageReference,
                 mesh_message_id=data.meshMessageId,
                 message_content=content,
-                logger=logger
+                logger=logger,
+                checksum=checksum
+            ),
+            checksum
+        )
+
+    def _handle_streaming_download(self, event, message, body, logger):
+        """
+        Streams a message body from MESH to S3 in multipart upload parts while the
+        same stream is read for FHIR validation, so memory use does not grow with the
+        size of the message. Nothing is stored unless the content is valid.
+
+        Attachments too long for the streaming reader to keep are checked against the
+        size and hash of the data they decode to, worked out while they are read.
+        """
+        data = event.data
+
+        upload = self.__document_store.start_document_upload(
+            sender_id=data.senderId,
+            message_reference=data.messageReference,
+            mesh_message_id=data.meshMessageId,
+            part_size=self.__streaming_part_size
+        )
+        reader = StreamingJsonReader()
+
+        try:
+            for chunk in iter(lambda: body.read(STREAMING_READ_SIZE), b''):
+                reader.feed(chunk)
+                upload.write(chunk)
+        except Exception:
+            upload.abort()
+            raise
+
+        logger.info("Downloaded MESH message content", size_bytes=upload.size_bytes)
+
+        try:
+            self._validate_streamed_content(reader, logger)
+        except Exception as e:
+            upload.abort()
+            logger.error("FHIR content is invalid", error=str(e))
+
+            self._publish_message_invalid_event(incoming_event=event)
+
+            message.acknowledge()
+            logger.info("Acknowledged message")
+
+            return 'invalid'
+
+        return self._complete_download(
+            event, message, logger,
+            lambda: self._complete_message_upload(upload, logger),
+            upload.checksum
+        )
+
+    def _validate_streamed_content(self, reader, logger):
+        """
+        Validates a streamed document from the reader's copy. Only attachment data may
+        have been truncated in it; each truncated attachment must be valid base64 of
+        the stated size and hash, which are then restated for the data that was kept
+        so that the rest of the document can be validated as usual.
+        """
+        document = reader.document()
+
+        if reader.truncated_string_count:
+            logger.info("Validating truncated attachments",
+                        truncated_string_count=reader.truncated_string_count)
+            _restate_truncated_attachments(document, reader.truncated_strings)
+
+        self._validate_fhir_document(document)
+
+    def _retrieve_message(self, mesh_message_id):
+        """
+        Retrieves a message from the MESH inbox, returning None if it is not there.
+        MeshClient raises an HTTPError for a missing message, while MockMeshClient
+        returns None.
+        """
+        try:
+            return self.__mesh_client.retrieve_message(mesh_message_id)
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code in MESSAGE_NOT_FOUND_STATUS_CODES:
+                return None
+            raise
+
+    def _handle_missing_message(self, data, logger, sqs_record):
+        """
+        Fails a record whose message is not in the MESH inbox so that SQS retries it,
+        or sends it to the DLQ once the message has been missed too many times
+        """
+        if self.__missing_messages is None:
+            raise MeshMessageNotFound(f"MESH message with ID {data.meshMessageId} not found")
+
+        miss_count = self.__missing_messages.record_miss(data.meshMessageId)
+
+        if sqs_record is not None and self.__missing_messages.should_dead_letter(miss_count):
+            self.__missing_messages.dead_letter(sqs_record)
+            logger.error("Sent request for missing MESH message to DLQ", miss_count=miss_count)
+            return 'dead_lettered'
+
+        raise MeshMessageNotFound(
+            f"MESH message with ID {data.meshMessageId} not found (miss {miss_count})")
+
+    def _reject_message(self, event, message, logger, error):
+        """
+        Rejects a message that failed pre-validation without reading the rest of it
+        """
+        logger.error("MESH message rejected before download", reason=str(error))
+
+        self._publish_message_invalid_event(
+            incoming_event=event, failure_code=PREVALIDATION_FAILURE_CODE)
+
+        message.acknowledge()
+        logger.info("Acknowledged message")
+
+        return 'invalid'
+
+    def _is_document_stored(self, data, logger):
+        """
+        Checks, before anything is retrieved from MESH, whether the document for a
+        message is already stored. Recently stored keys are answered from the warm
+        cache; otherwise S3 is asked. A failed check is treated as not stored, since
+        storing the document is still protected against duplicates.
+        """
+        s3_key = self.__document_store.document_key(
+            data.senderId, data.messageReference, data.meshMessageId)
+
+        if self.__stored_document_cache is not None and self.__stored_document_cache.get(s3_key):
+            return True
+
+        try:
+            stored = self.__document_store.document_exists(
+                sender_id=data.senderId,
+                message_reference=data.messageReference,
+                mesh_message_id=data.meshMessageId
             )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to check for an existing document", error=str(e))
+            return False
+
+        if stored:
+            self._remember_stored_document(data)
+
+        return stored
+
+    def _remember_stored_document(self, data):
+        if self.__stored_document_cache is None:
+            return
+
+        s3_key = self.__document_store.document_key(
+            data.senderId, data.messageReference, data.meshMessageId)
+        self.__stored_document_cache.put(s3_key, True)
+
+    def _skip_stored_document(self, data, logger):
+        """
+        Acknowledges a message whose document is already stored without downloading it
+        """
+        logger.warning(
+            "Message already stored in S3, skipping download (duplicate delivery)",
+            mesh_message_id=data.meshMessageId,
+            message_reference=data.messageReference
+        )
+        self.__duplicate_download_metric.record(1)
+
+        try:
+            self.__mesh_client.acknowledge_message(data.meshMessageId)
+            logger.info("Acknowledged message")
+        except Exception as e:  # pylint: disable=broad-except
+            # The first delivery will usually have acknowledged the message already
+            logger.warning("Failed to acknowledge message", error=str(e))
+
+        return 'skipped'
+
+    def _complete_download(self, event, message, logger, store_content, checksum):
+        data = event.data
+
+        duplicate = False
+        try:
+            uri = store_content()
         except DocumentAlreadyExistsError:
             logger.warning(
                 "Message already stored in S3, skipping publish (duplicate delivery)",
@@ -109,10 +325,13 @@ class MeshDownloadProcessor:
             duplicate = True
             self.__duplicate_download_metric.record(1)
 
+        self._remember_stored_document(data)
+
         if not duplicate:
             self._publish_downloaded_event(
                 incoming_event=event,
-                message_uri=uri
+                message_uri=uri,
+                checksum=checksum
             )
             self.__download_metric.record(1)
 
@@ -121,24 +340,40 @@ class MeshDownloadProcessor:
 
         return 'skipped' if duplicate else 'downloaded'
 
-    def _store_message_content(self, sender_id, message_reference, mesh_message_id, message_content, logger):
+    def _store_message_content(self, sender_id, message_reference, mesh_message_id,
+                               message_content, logger, checksum=None):
         s3_key = self.__document_store.store_document(
             sender_id=sender_id,
             message_reference=message_reference,
             mesh_message_id=mesh_message_id,
             content=message_content,
+            checksum=checksum,
         )
 
         message_uri = f"s3://{self.__storage_bucket}/{s3_key}"
         logger.info("Stored MESH message in S3",
                     s3_bucket=self.__storage_bucket,
-                    s3_key=s3_key)
+                    s3_key=s3_key,
+                    checksum=checksum.value if checksum else None)
 
         return message_uri
 
-    def _publish_downloaded_event(self, incoming_event, message_uri):
+    def _complete_message_upload(self, upload, logger):
+        s3_key = upload.complete()
+
+        message_uri = f"s3://{self.__storage_bucket}/{s3_key}"
+        logger.info("Stored MESH message in S3",
+                    s3_bucket=self.__storage_bucket,
+                    s3_key=s3_key,
+                    size_bytes=upload.size_bytes,
+                    checksum=upload.checksum.value)
+
+        return message_uri
+
+    def _publish_downloaded_event(self, incoming_event, message_uri, checksum=None):
         """
-        Publishes a MESHInboxMessageDownloaded event.
+        Publishes a MESHInboxMessageDownloaded event, carrying the checksum of the
+        stored document when there is one.
         """
         now = datetime.now(timezone.utc).isoformat()
 
@@ -162,6 +397,9 @@ class MeshDownloadProcessor:
             }
         }
 
+        if checksum is not None:
+            cloud_event['data']['checksum'] = checksum.to_event_data()
+
         failed = self.__event_publisher.send_events([cloud_event], MESHInboxMessageDownloaded)
         if failed:
             msg = f"Failed to publish MESHInboxMessageDownloaded event: {failed}"
@@ -175,7 +413,7 @@ class MeshDownloadProcessor:
             message_reference=incoming_event.data.messageReference
         )
 
-    def _publish_message_invalid_event(self, incoming_event):
+    def _publish_message_invalid_event(self, incoming_event, failure_code='DL_CLIV_005'):
         """
         Publishes a MESHInboxMessageInvalid event.
         """
@@ -194,7 +432,7 @@ class MeshDownloadProcessor:
             'data': {
                 'senderId': incoming_event.data.senderId,
                 'meshMessageId': incoming_event.data.meshMessageId,
-                'failureCode': 'DL_CLIV_005',
+                'failureCode': failure_code,
                 'messageReference': incoming_event.data.messageReference,
             }
         }
@@ -210,3 +448,39 @@ class MeshDownloadProcessor:
             sender_id=incoming_event.data.senderId,
             message_reference=incoming_event.data.messageReference
         )
+
+
+def _restate_truncated_attachments(document, truncated_strings):
+    """
+    Checks each attachment whose data was truncated against the StreamedString read
+    for it, then restates its size and hash for the data kept in the document
+    """
+    remaining = list(truncated_strings)
+
+    for content in document.get('content') or []:
+        attachment = content.get('attachment') if isinstance(content, dict) else None
+        if not isinstance(attachment, dict) or not isinstance(attachment.get('data'), str):
+            continue
+
+        streamed = next((string for string in remaining
+                         if string.prefix == attachment['data']), None)
+        if streamed is None:
+            continue
+        remaining.remove(streamed)
+
+        if not streamed.is_base64:
+            raise ValueError("Attachment data is not valid base64")
+        if 'size' in attachment and attachment['size'] != streamed.size:
+            raise ValueError("Attachment size does not match its data")
+        if 'hash' in attachment and attachment['hash'] != streamed.hash:
+            raise ValueError("Attachment hash does not match its data")
+
+        kept_data = base64.b64decode(attachment['data'])
+        if 'size' in attachment:
+            attachment['size'] = len(kept_data)
+        if 'hash' in attachment:
+            kept_hash = hashlib.sha1(kept_data, usedforsecurity=False).digest()
+            attachment['hash'] = base64.b64encode(kept_hash).decode('ascii')
+
+    if remaining:
+        raise ValueError(f"{len(remaining)} string value(s) too long to validate")
@@ -0,0 +1,103 @@
+"""
+Benchmark for polling several MESH mailboxes from one mesh-poll invocation.
+
+Each mailbox is a MockMeshClient backed by an in-memory stand-in for S3 that adds
+a fixed latency to every call. The time taken to work through every message in
+every mailbox is compared between polling the mailboxes one after another and
+polling them concurrently, as the handler does.
+
+Usage (from the repository root):
+    PYTHONPATH=lambdas/mesh-poll:utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/mesh-poll/benchmarks/benchmark_multi_mailbox.py --mailboxes 4
+"""
+import argparse
+import time
+from unittest.mock import Mock, patch
+
+from py_mock_mesh import InMemoryS3, MockMeshClient
+from mesh_poll.handler import poll_mailboxes
+from mesh_poll.processor import MeshMessageProcessor
+
+
+def build_mailboxes(mailbox_count, message_count, latency_seconds):
+    """
+    Builds MockMeshClient instances, each with message_count messages in its inbox
+    """
+    mesh_clients = []
+    for mailbox_index in range(mailbox_count):
+        mailbox = f'MAILBOX{mailbox_index}'
+        s3_client = InMemoryS3(latency_seconds)
+        for message_index in range(message_count):
+            s3_client.put_object(
+                Bucket='bucket',
+                Key=f'mock-mesh/{mailbox}/in/{mailbox}_{message_index:06d}',
+                Body=b'{}',
+                Metadata={'sender': 'SENDER', 'local_id': f'ref-{message_index}'}
+            )
+        mesh_clients.append(MockMeshClient(s3_client, 's3://bucket/mock-mesh', mailbox, Mock()))
+
+    return mesh_clients
+
+
+def build_processors(mesh_clients):
+    """
+    Builds a processor per mailbox, each with its own time budget
+    """
+    config = Mock()
+    config.maximum_runtime_milliseconds = 0
+
+    sender_lookup = Mock()
+    sender_lookup.is_valid_sender.return_value = True
+    sender_lookup.get_sender_id.return_value = 'sender-id'
+
+    return [
+        MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=lambda: 900000,
+            log=Mock(),
+            polling_metric=Mock()
+        )
+        for mesh_client in mesh_clients
+    ]
+
+
+def run(label, poll, args):
+    """
+    Times one way of polling every mailbox and prints the result
+    """
+    mesh_clients = build_mailboxes(args.mailboxes, args.messages, args.latency_ms / 1000)
+    processors = build_processors(mesh_clients)
+
+    started = time.perf_counter()
+    poll(processors)
+    elapsed = time.perf_counter() - started
+
+    total = args.mailboxes * args.messages
+    print(f'{label:<12} {total} messages in {elapsed:.2f}s '
+          f'({total / elapsed:.1f} messages/s)')
+
+
+def poll_one_after_another(processors):
+    """Polls each mailbox in turn, as separate single-mailbox deployments would"""
+    for processor in processors:
+        processor.process_messages()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--mailboxes', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=50, help='messages per mailbox')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='latency of each S3 call')
+    args = parser.parse_args()
+
+    with patch('mesh_poll.processor.EventPublisher') as event_publisher_class:
+        event_publisher_class.return_value.send_events.return_value = []
+
+        run('serial', poll_one_after_another, args)
+        run('concurrent', poll_mailboxes, args)
+
+
+if __name__ == '__main__':
+    main()
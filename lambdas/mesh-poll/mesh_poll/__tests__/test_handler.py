@@ -16,6 +16,7 @@ def setup_mocks():
     mock_config = MagicMock()
     mock_config.mesh_client = Mock()
     mock_config.polling_metric = Mock()
+    mock_config.mailboxes = [mock_config]
 
     mock_ssm = Mock()
 
@@ -87,11 +88,59 @@ class TestHandler:
             == mock_context.get_remaining_time_in_millis
         )
         assert call_kwargs['polling_metric'] == mock_config.polling_metric
+        assert call_kwargs['max_workers'] == mock_config.poll_max_workers
+        assert call_kwargs['publish_batch_size'] == mock_config.poll_publish_batch_size
+        assert call_kwargs['headers_only'] == mock_config.poll_headers_only
+        assert call_kwargs['seen_message_store'] == mock_config.seen_message_store
+        assert (
+            call_kwargs['suppressed_duplicate_metric']
+            == mock_config.suppressed_duplicate_metric
+        )
+        assert call_kwargs['remaining_time_metric'] == mock_config.remaining_time_metric
+        assert (
+            call_kwargs['message_time_estimate_metric']
+            == mock_config.message_time_estimate_metric
+        )
+        assert call_kwargs['scan_checkpoint_store'] == mock_config.scan_checkpoint_store
+        assert call_kwargs['scan_checkpoint_key'] == mock_config.mesh_mailbox
+        assert call_kwargs['inbox_depth_metric'] == mock_config.inbox_depth_metric
+        assert call_kwargs['oldest_message_age_metric'] == mock_config.oldest_message_age_metric
+        assert call_kwargs['shard_index'] == mock_config.poll_shard_index
+        assert call_kwargs['shard_count'] == mock_config.poll_shard_count
         assert 'log' in call_kwargs
 
         # Verify process_messages was called
         mock_processor.process_messages.assert_called_once()
 
+    @patch('mesh_poll.handler.Config')
+    @patch('mesh_poll.handler.SenderLookup')
+    @patch('mesh_poll.handler.MeshMessageProcessor')
+    @patch('mesh_poll.handler.client')
+    def test_handler_uses_shard_from_event(
+        self,
+        mock_boto_client,
+        mock_processor_class,
+        mock_sender_lookup_class,
+        mock_config_class
+    ):
+        """Test that a scheduled event can select the shard to poll"""
+        from mesh_poll.handler import handler
+
+        (mock_context, mock_config, mock_ssm,
+        mock_sender_lookup, mock_processor) = setup_mocks()
+
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_boto_client.return_value = mock_ssm
+        mock_sender_lookup_class.return_value = mock_sender_lookup
+        mock_processor_class.return_value = mock_processor
+
+        handler({'shardIndex': 2, 'shardCount': 4}, mock_context)
+
+        call_kwargs = mock_processor_class.call_args[1]
+        assert call_kwargs['shard_index'] == 2
+        assert call_kwargs['shard_count'] == 4
+
     @patch('mesh_poll.handler.Config')
     @patch('mesh_poll.handler.SenderLookup')
     @patch('mesh_poll.handler.MeshMessageProcessor')
@@ -130,3 +179,76 @@ class TestHandler:
         call_args = mock_exit.call_args[0]
         assert call_args[0] == RuntimeError
         assert call_args[1] == test_exception
+
+    @patch('mesh_poll.handler.Config')
+    @patch('mesh_poll.handler.SenderLookup')
+    @patch('mesh_poll.handler.MeshMessageProcessor')
+    @patch('mesh_poll.handler.client')
+    def test_handler_polls_each_mailbox(
+        self,
+        mock_boto_client,
+        mock_processor_class,
+        mock_sender_lookup_class,
+        mock_config_class
+    ):
+        """Test that a processor is built for each mailbox with its own client and metric"""
+        from mesh_poll.handler import handler
+
+        (mock_context, mock_config, mock_ssm,
+        mock_sender_lookup, _) = setup_mocks()
+
+        second_mailbox = Mock()
+        second_mailbox.mesh_mailbox = 'SECOND_MAILBOX'
+        mock_config.mesh_mailbox = 'FIRST_MAILBOX'
+        mock_config.mailboxes = [mock_config, second_mailbox]
+
+        processors = [Mock(), Mock()]
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_boto_client.return_value = mock_ssm
+        mock_sender_lookup_class.return_value = mock_sender_lookup
+        mock_processor_class.side_effect = processors
+
+        handler(None, mock_context)
+
+        calls = [c[1] for c in mock_processor_class.call_args_list]
+        assert [c['mesh_client'] for c in calls] == [
+            mock_config.mesh_client, second_mailbox.mesh_client]
+        assert [c['polling_metric'] for c in calls] == [
+            mock_config.polling_metric, second_mailbox.polling_metric]
+        assert [c['scan_checkpoint_key'] for c in calls] == ['FIRST_MAILBOX', 'SECOND_MAILBOX']
+        for processor in processors:
+            processor.process_messages.assert_called_once()
+
+    @patch('mesh_poll.handler.Config')
+    @patch('mesh_poll.handler.SenderLookup')
+    @patch('mesh_poll.handler.MeshMessageProcessor')
+    @patch('mesh_poll.handler.client')
+    def test_handler_failure_in_one_mailbox_does_not_stop_others(
+        self,
+        mock_boto_client,
+        mock_processor_class,
+        mock_sender_lookup_class,
+        mock_config_class
+    ):
+        """Test that every mailbox is polled before a mailbox failure is raised"""
+        from mesh_poll.handler import handler
+
+        (mock_context, mock_config, mock_ssm,
+        mock_sender_lookup, _) = setup_mocks()
+
+        mock_config.mailboxes = [mock_config, Mock()]
+
+        failing_processor = Mock()
+        failing_processor.process_messages.side_effect = RuntimeError("Test error")
+        healthy_processor = Mock()
+        mock_config_class.return_value.__enter__.return_value = mock_config
+        mock_config_class.return_value.__exit__ = Mock(return_value=None)
+        mock_boto_client.return_value = mock_ssm
+        mock_sender_lookup_class.return_value = mock_sender_lookup
+        mock_processor_class.side_effect = [failing_processor, healthy_processor]
+
+        with pytest.raises(RuntimeError, match="Test error"):
+            handler(None, mock_context)
+
+        healthy_processor.process_messages.assert_called_once()
@@ -2,8 +2,12 @@
 Tests for mesh-poll MeshMessageProcessor
 Following the pattern from backend comms-mgr mesh-poll tests
 """
+import io
 from unittest.mock import Mock, patch
 
+import pytest
+from botocore.exceptions import ClientError
+
 from mesh_client import MeshClient
 from mesh_poll.processor import MeshMessageProcessor
 
@@ -314,3 +318,806 @@ class TestMeshMessageProcessor:
 
         message.acknowledge.assert_called_once()
         mock_event_publisher.send_events.assert_called_once()
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorConcurrent:
+    """Test suite for MeshMessageProcessor with a worker pool"""
+
+    def test_all_messages_are_processed_with_worker_pool(self, mock_event_publisher_class):
+        """Test that every message is processed when using multiple workers"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+        messages = [setup_message_data(str(i)) for i in range(10)]
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            max_workers=4
+        )
+
+        mesh_client.iterate_all_messages.return_value = messages
+
+        processor.process_messages()
+
+        assert sender_lookup.is_valid_sender.call_count == 10
+        assert mock_event_publisher.send_events.call_count == 10
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_worker_pool_stops_near_timeout(self, mock_event_publisher_class):
+        """Test that no message is started once time runs out"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis_near_timeout,
+            log=log,
+            polling_metric=polling_metric,
+            max_workers=4
+        )
+
+        mesh_client.iterate_all_messages.return_value = [
+            setup_message_data("1"), setup_message_data("2")]
+
+        processor.process_messages()
+
+        sender_lookup.is_valid_sender.assert_not_called()
+        mock_event_publisher.send_events.assert_not_called()
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_worker_pool_stops_starting_messages_when_time_runs_out(
+            self, mock_event_publisher_class):
+        """Test that the time budget is checked before each message is started"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        remaining_times = iter([1000, 1000, 100, 100])
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=lambda: next(remaining_times),
+            log=log,
+            polling_metric=polling_metric,
+            max_workers=2
+        )
+
+        mesh_client.iterate_all_messages.return_value = [
+            setup_message_data(str(i)) for i in range(4)]
+
+        processor.process_messages()
+
+        assert sender_lookup.is_valid_sender.call_count == 2
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_worker_pool_isolates_message_failures(self, mock_event_publisher_class):
+        """Test that an unexpected failure in one message does not stop the others"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+        messages = [setup_message_data(str(i)) for i in range(3)]
+
+        mock_event_publisher_class.return_value = Mock()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            max_workers=2
+        )
+
+        processed = []
+
+        def process_message(message):
+            if message is messages[1]:
+                raise RuntimeError("unexpected failure")
+            processed.append(message)
+
+        mesh_client.iterate_all_messages.return_value = messages
+
+        with patch.object(processor, 'process_message', side_effect=process_message):
+            processor.process_messages()
+
+        assert sorted(m.id() for m in processed) == ["test_message_id_0", "test_message_id_2"]
+        log.error.assert_called()
+        polling_metric.record.assert_called_once_with(1)
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorBatchedPublishing:
+    """Test suite for MeshMessageProcessor publishing events in batches"""
+
+    def create_processor(self, mesh_client_messages, publish_batch_size=10):
+        """Create a processor in batching mode with the given inbox contents"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+        mesh_client.iterate_all_messages.return_value = mesh_client_messages
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            publish_batch_size=publish_batch_size
+        )
+
+        return processor, sender_lookup, polling_metric
+
+    def test_events_are_published_in_full_batches(self, mock_event_publisher_class):
+        """Test that events are published in batches of the configured size"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        messages = [setup_message_data(str(i)) for i in range(25)]
+        processor, _, polling_metric = self.create_processor(messages)
+
+        processor.process_messages()
+
+        batch_sizes = [len(call[0][0]) for call in mock_event_publisher.send_events.call_args_list]
+        assert batch_sizes == [10, 10, 5]
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_invalid_messages_acknowledged_after_publish(self, mock_event_publisher_class):
+        """Test that invalid messages are acknowledged only once their event is published"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        valid_message = setup_message_data("1")
+        invalid_message = setup_message_data("2")
+        invalid_message.local_id = ""
+        processor, _, _ = self.create_processor([valid_message, invalid_message])
+
+        processor.process_message(valid_message)
+        processor.process_message(invalid_message)
+
+        mock_event_publisher.send_events.assert_not_called()
+        invalid_message.acknowledge.assert_not_called()
+
+        processor.flush_events()
+
+        assert mock_event_publisher.send_events.call_count == 2
+        invalid_message.acknowledge.assert_called_once()
+        valid_message.acknowledge.assert_not_called()
+
+    def test_failed_invalid_events_are_not_acknowledged(self, mock_event_publisher_class):
+        """Test that messages whose events fail to publish stay in the inbox"""
+        invalid_message_1 = setup_message_data("1")
+        invalid_message_1.local_id = ""
+        invalid_message_2 = setup_message_data("2")
+        invalid_message_2.local_id = ""
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.side_effect = lambda events, _: [events[0]]
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        processor, _, _ = self.create_processor([invalid_message_1, invalid_message_2])
+
+        processor.process_messages()
+
+        mock_event_publisher.send_events.assert_called_once()
+        invalid_message_1.acknowledge.assert_not_called()
+        invalid_message_2.acknowledge.assert_called_once()
+
+    def test_publish_exception_leaves_messages_in_inbox(self, mock_event_publisher_class):
+        """Test that a publishing error does not acknowledge any message in the batch"""
+        invalid_message = setup_message_data("1")
+        invalid_message.local_id = ""
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.side_effect = RuntimeError("EventBridge unavailable")
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        processor, _, polling_metric = self.create_processor([invalid_message])
+
+        processor.process_messages()
+
+        invalid_message.acknowledge.assert_not_called()
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_unknown_sender_is_acknowledged_without_publishing(self, mock_event_publisher_class):
+        """Test that unauthorised senders are still acknowledged immediately"""
+        mock_event_publisher = Mock()
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        message = setup_message_data("1")
+        processor, sender_lookup, _ = self.create_processor([message])
+        sender_lookup.is_valid_sender.return_value = False
+
+        processor.process_messages()
+
+        message.acknowledge.assert_called_once()
+        mock_event_publisher.send_events.assert_not_called()
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorSeenMessages:
+    """Test suite for suppressing duplicate received events"""
+
+    def create_processor(self, seen_message_store, suppressed_duplicate_metric,
+                         publish_batch_size=1):
+        """Create a processor with a seen message store"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            publish_batch_size=publish_batch_size,
+            seen_message_store=seen_message_store,
+            suppressed_duplicate_metric=suppressed_duplicate_metric
+        )
+
+        return processor, mesh_client
+
+    def test_already_announced_messages_are_skipped(self, mock_event_publisher_class):
+        """Test that messages already announced are not published again"""
+        from dl_utils import InMemoryTtlStore
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = InMemoryTtlStore(300)
+        suppressed_duplicate_metric = Mock()
+        processor, mesh_client = self.create_processor(store, suppressed_duplicate_metric)
+
+        message1 = setup_message_data("1")
+        message2 = setup_message_data("2")
+        mesh_client.iterate_all_messages.return_value = [message1, message2]
+
+        processor.process_messages()
+
+        assert mock_event_publisher.send_events.call_count == 2
+        assert store.get("test_message_id_1") is not None
+        suppressed_duplicate_metric.record.assert_called_once_with(0)
+
+        suppressed_duplicate_metric.reset_mock()
+        processor.process_messages()
+
+        assert mock_event_publisher.send_events.call_count == 2
+        suppressed_duplicate_metric.record.assert_called_once_with(2)
+        message1.acknowledge.assert_not_called()
+
+    def test_failed_publish_is_not_marked_as_announced(self, mock_event_publisher_class):
+        """Test that a message is only marked as announced once its event is published"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = [{"id": "failed-event-1"}]
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = Mock()
+        store.get.return_value = None
+        processor, _ = self.create_processor(store, Mock())
+
+        processor.process_message(setup_message_data("1"))
+
+        store.put.assert_not_called()
+
+    def test_batched_events_are_marked_once_published(self, mock_event_publisher_class):
+        """Test that batched received events are marked as announced after publishing"""
+        from dl_utils import InMemoryTtlStore
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = InMemoryTtlStore(300)
+        processor, mesh_client = self.create_processor(store, Mock(), publish_batch_size=10)
+        mesh_client.iterate_all_messages.return_value = [setup_message_data("1")]
+
+        processor.process_messages()
+
+        mock_event_publisher.send_events.assert_called_once()
+        assert store.get("test_message_id_1") is not None
+
+    def test_store_errors_do_not_block_publishing(self, mock_event_publisher_class):
+        """Test that the event is still published if the store cannot be read or written"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = Mock()
+        store.get.side_effect = RuntimeError("store unavailable")
+        store.put.side_effect = RuntimeError("store unavailable")
+        processor, _ = self.create_processor(store, Mock())
+
+        processor.process_message(setup_message_data("1"))
+
+        mock_event_publisher.send_events.assert_called_once()
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorHeadersOnly:
+    """Test suite for scanning the inbox using message headers only"""
+
+    def test_headers_only_mode_does_not_retrieve_full_messages(self, mock_event_publisher_class):
+        """Test that headers-only mode lists message IDs and never reads a body"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        response = Mock()
+        response.headers = {
+            'Mex-From': 'TEST_SENDER_1',
+            'Mex-LocalID': 'test_local_id_1',
+            'Mex-WorkflowID': 'NHS_NOTIFY_SEND_REQUEST',
+        }
+        mesh_client.iterate_message_ids.return_value = ['test_message_id_1']
+        mesh_client.retrieve_message_chunk.return_value = response
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            headers_only=True
+        )
+
+        processor.process_messages()
+
+        mesh_client.iterate_all_messages.assert_not_called()
+        mesh_client.retrieve_message.assert_not_called()
+        response.close.assert_called_once()
+        sender_lookup.is_valid_sender.assert_called_once_with('TEST_SENDER_1')
+        published_event = mock_event_publisher.send_events.call_args[0][0][0]
+        assert published_event['data']['meshMessageId'] == 'test_message_id_1'
+        assert published_event['data']['messageReference'] == 'test_local_id_1'
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_headers_only_mode_uses_mock_mesh_header_listing(self, mock_event_publisher_class):
+        """Test that MockMeshClient reads object metadata only when listing headers"""
+        from py_mock_mesh import MockMeshClient
+
+        (config, sender_lookup, _, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        s3_client = Mock()
+        s3_client.list_objects_v2.return_value = {
+            'Contents': [{'Key': 'mock-mesh/MAILBOX/in/test_message_id_1', 'ETag': 'etag'}],
+            'IsTruncated': False
+        }
+        s3_client.head_object.return_value = {
+            'Metadata': {'sender': 'TEST_SENDER_1', 'local_id': 'test_local_id_1'}
+        }
+
+        mesh_client = MockMeshClient(s3_client, 's3://bucket/mock-mesh', 'MAILBOX', log)
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            headers_only=True
+        )
+
+        processor.process_messages()
+
+        s3_client.head_object.assert_called_once_with(
+            Bucket='bucket', Key='mock-mesh/MAILBOX/in/test_message_id_1', IfMatch='etag')
+        s3_client.get_object.assert_not_called()
+        mock_event_publisher.send_events.assert_called_once()
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorTimeBudget:
+    """Test suite for the adaptive time budget"""
+
+    def test_stops_when_next_message_is_predicted_not_to_fit(self, mock_event_publisher_class):
+        """Test that measured message cost is added to the fixed reserve"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric
+        )
+
+        mesh_client.iterate_all_messages.return_value = [
+            setup_message_data(str(i)) for i in range(3)]
+
+        # Each message takes 600ms, so after the first there is not enough time for another
+        with patch('dl_utils.time_budget.time.monotonic', side_effect=[0.0, 0.6]):
+            processor.process_messages()
+
+        assert sender_lookup.is_valid_sender.call_count == 1
+        polling_metric.record.assert_called_once_with(1)
+
+    def test_records_time_budget_metrics(self, mock_event_publisher_class):
+        """Test that remaining time and message time estimate are recorded once per poll"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        remaining_time_metric = Mock()
+        message_time_estimate_metric = Mock()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            remaining_time_metric=remaining_time_metric,
+            message_time_estimate_metric=message_time_estimate_metric
+        )
+
+        mesh_client.iterate_all_messages.return_value = [setup_message_data("1")]
+
+        with patch('dl_utils.time_budget.time.monotonic', side_effect=[0.0, 0.2]):
+            processor.process_messages()
+
+        remaining_time_metric.record.assert_called_once_with(1000)
+        message_time_estimate_metric.record.assert_called_once()
+        assert message_time_estimate_metric.record.call_args[0][0] == pytest.approx(200)
+
+    def test_reserves_time_to_publish_final_batch_with_slow_publisher(
+            self, mock_event_publisher_class):
+        """Test that batch publishing is measured apart from messages and kept in reserve"""
+        (config, sender_lookup, mesh_client, log, polling_metric) = setup_mocks()
+        clock = SimulatedClock(remaining_millis=2000)
+
+        # Each message takes 100ms to process and each batch takes 300ms to publish
+        sender_lookup.is_valid_sender.side_effect = lambda _: clock.advance(100) or True
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.side_effect = lambda *_: clock.advance(300) or []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        message_time_estimate_metric = Mock()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=clock.remaining_millis,
+            log=log,
+            polling_metric=polling_metric,
+            message_time_estimate_metric=message_time_estimate_metric,
+            publish_batch_size=2
+        )
+
+        mesh_client.iterate_all_messages.return_value = [
+            setup_message_data(str(i)) for i in range(10)]
+
+        with patch('dl_utils.time_budget.time.monotonic', side_effect=clock.monotonic):
+            processor.process_messages()
+
+        published_count = sum(
+            len(call[0][0]) for call in mock_event_publisher.send_events.call_args_list)
+        assert published_count == sender_lookup.is_valid_sender.call_count == 5
+        assert clock.remaining_millis() >= 500
+        assert message_time_estimate_metric.record.call_args[0][0] == pytest.approx(100)
+
+
+class SimulatedClock:
+    """
+    Clock advanced by the test, standing in for both time.monotonic and the time
+    remaining in the lambda invocation
+    """
+
+    def __init__(self, remaining_millis):
+        self.__elapsed_millis = 0
+        self.__remaining_millis = remaining_millis
+
+    def advance(self, millis):
+        """Moves the clock forward"""
+        self.__elapsed_millis += millis
+
+    def monotonic(self):
+        """Elapsed time in seconds"""
+        return self.__elapsed_millis / 1000
+
+    def remaining_millis(self):
+        """Time remaining in the invocation"""
+        return self.__remaining_millis - self.__elapsed_millis
+
+
+class InMemoryS3:
+    """
+    Minimal in-memory stand-in for the S3 calls made by the checkpoint store,
+    shared between processors to represent separate lambda containers
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):  # pylint: disable=invalid-name
+        """Returns a stored object, raising NoSuchKey if it is missing"""
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, **_):  # pylint: disable=invalid-name
+        """Stores an object"""
+        self.objects[(Bucket, Key)] = Body
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorScanCheckpoint:
+    """Test suite for resuming the inbox scan from a checkpoint"""
+
+    def create_processor(self, mesh_client, scan_checkpoint_store, **kwargs):
+        """Create a processor with a scan checkpoint store"""
+        (config, sender_lookup, _, log, polling_metric) = setup_mocks()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=kwargs.pop(
+                'get_remaining_time_in_millis', get_remaining_time_in_millis),
+            log=log,
+            polling_metric=polling_metric,
+            scan_checkpoint_store=scan_checkpoint_store,
+            scan_checkpoint_key='MAILBOX',
+            **kwargs
+        )
+
+        return processor, sender_lookup
+
+    def create_mesh_client(self, message_ids):
+        """Create a MESH client whose inbox contains the given messages"""
+        mesh_client = Mock(spec=MeshClient)
+        mesh_client.iterate_message_ids.return_value = message_ids
+        messages = {}
+        for message_id in message_ids:
+            message = setup_message_data(message_id)
+            message.id.return_value = message_id
+            messages[message_id] = message
+        mesh_client.retrieve_message.side_effect = messages.get
+
+        return mesh_client
+
+    def test_resumes_after_checkpoint_and_wraps_around(self, mock_event_publisher_class):
+        """Test that the scan starts after the checkpoint and wraps to the start"""
+        from dl_utils import InMemoryTtlStore
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = InMemoryTtlStore(300)
+        store.put('MAILBOX', '2')
+        mesh_client = self.create_mesh_client(['1', '2', '3', '4'])
+        processor, _ = self.create_processor(mesh_client, store)
+
+        processor.process_messages()
+
+        retrieved = [c[0][0] for c in mesh_client.retrieve_message.call_args_list]
+        assert retrieved == ['3', '4', '1', '2']
+        mesh_client.iterate_all_messages.assert_not_called()
+        assert store.get('MAILBOX') == '2'
+
+    def test_checkpoint_is_last_message_started_when_out_of_time(
+            self, mock_event_publisher_class):
+        """Test that the next poll resumes at the first message not started"""
+        from dl_utils import InMemoryTtlStore
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        remaining_times = iter([1000, 1000, 100])
+        store = InMemoryTtlStore(300)
+        mesh_client = self.create_mesh_client(['1', '2', '3', '4'])
+        processor, sender_lookup = self.create_processor(
+            mesh_client, store, get_remaining_time_in_millis=lambda: next(remaining_times))
+
+        processor.process_messages()
+
+        assert sender_lookup.is_valid_sender.call_count == 2
+        assert store.get('MAILBOX') == '2'
+
+    def test_warm_container_resumes_from_checkpoint_saved_by_another(
+            self, mock_event_publisher_class):
+        """Test that a warm container resumes from the checkpoint another container saved in S3"""
+        from dl_utils import build_ttl_store
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        s3_client = InMemoryS3()
+        store_a = build_ttl_store(300, s3_client=s3_client, s3_uri='s3://bucket/checkpoints', warm_tier=False)
+        store_b = build_ttl_store(300, s3_client=s3_client, s3_uri='s3://bucket/checkpoints', warm_tier=False)
+        message_ids = ['1', '2', '3', '4']
+
+        # Container A starts two messages, container B then starts one more
+        remaining_times_a = iter([1000, 1000, 100])
+        processor_a, _ = self.create_processor(
+            self.create_mesh_client(message_ids), store_a,
+            get_remaining_time_in_millis=lambda: next(remaining_times_a))
+        processor_a.process_messages()
+
+        remaining_times_b = iter([1000, 100])
+        processor_b, _ = self.create_processor(
+            self.create_mesh_client(message_ids), store_b,
+            get_remaining_time_in_millis=lambda: next(remaining_times_b))
+        processor_b.process_messages()
+
+        # Container A polls again, still warm
+        mesh_client = self.create_mesh_client(message_ids)
+        processor_a, _ = self.create_processor(mesh_client, store_a)
+        processor_a.process_messages()
+
+        retrieved = [c[0][0] for c in mesh_client.retrieve_message.call_args_list]
+        assert retrieved == ['4', '1', '2', '3']
+
+    def test_records_inbox_depth_and_oldest_message_age(self, mock_event_publisher_class):
+        """Test that inbox metrics are recorded from the listed message IDs"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        inbox_depth_metric = Mock()
+        oldest_message_age_metric = Mock()
+        mesh_client = self.create_mesh_client(
+            ['20250101090000000000_000001', '20250101100000000000_000002'])
+        processor, _ = self.create_processor(
+            mesh_client, Mock(get=Mock(return_value=None)),
+            inbox_depth_metric=inbox_depth_metric,
+            oldest_message_age_metric=oldest_message_age_metric)
+
+        processor.process_messages()
+
+        inbox_depth_metric.record.assert_called_once_with(2)
+        oldest_message_age_metric.record.assert_called_once()
+        assert oldest_message_age_metric.record.call_args[0][0] > 0
+
+    def test_messages_that_cannot_be_retrieved_are_skipped(self, mock_event_publisher_class):
+        """Test that a message acknowledged since listing does not stop the scan"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        mesh_client = self.create_mesh_client(['1', '2'])
+        message2 = mesh_client.retrieve_message.side_effect('2')
+        mesh_client.retrieve_message.side_effect = [RuntimeError('404'), message2]
+        store = Mock()
+        store.get.return_value = None
+        processor, sender_lookup = self.create_processor(mesh_client, store)
+
+        processor.process_messages()
+
+        sender_lookup.is_valid_sender.assert_called_once()
+        store.put.assert_called_once_with('MAILBOX', '2')
+
+    def test_checkpoint_store_errors_do_not_block_polling(self, mock_event_publisher_class):
+        """Test that the scan starts from the beginning if the checkpoint cannot be read"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = Mock()
+        store.get.side_effect = RuntimeError('store unavailable')
+        store.put.side_effect = RuntimeError('store unavailable')
+        mesh_client = self.create_mesh_client(['1', '2'])
+        processor, sender_lookup = self.create_processor(mesh_client, store)
+
+        processor.process_messages()
+
+        assert sender_lookup.is_valid_sender.call_count == 2
+
+
+@patch('mesh_poll.processor.EventPublisher')
+class TestMeshMessageProcessorSharding:
+    """Test suite for sharing an inbox between several pollers"""
+
+    def create_processor(self, mesh_client, shard_index, shard_count, **kwargs):
+        """Create a processor for one shard of the inbox"""
+        (config, sender_lookup, _, log, polling_metric) = setup_mocks()
+
+        processor = MeshMessageProcessor(
+            config=config,
+            sender_lookup=sender_lookup,
+            mesh_client=mesh_client,
+            get_remaining_time_in_millis=get_remaining_time_in_millis,
+            log=log,
+            polling_metric=polling_metric,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            **kwargs
+        )
+
+        return processor
+
+    def create_mesh_client(self, message_ids):
+        """Create a MESH client whose inbox contains the given messages"""
+        mesh_client = Mock(spec=MeshClient)
+        mesh_client.iterate_message_ids.return_value = message_ids
+
+        def retrieve_message(message_id):
+            message = setup_message_data(message_id)
+            message.id.return_value = message_id
+            return message
+
+        mesh_client.retrieve_message.side_effect = retrieve_message
+
+        return mesh_client
+
+    def test_shards_process_disjoint_messages_covering_the_inbox(
+            self, mock_event_publisher_class):
+        """Test that every message is published by exactly one shard"""
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        message_ids = [f'20250101090000000000_{i:06d}' for i in range(20)]
+        published = []
+
+        for shard_index in range(3):
+            mesh_client = self.create_mesh_client(message_ids)
+            processor = self.create_processor(mesh_client, shard_index, 3)
+
+            processor.process_messages()
+
+            mesh_client.iterate_all_messages.assert_not_called()
+
+        for call in mock_event_publisher.send_events.call_args_list:
+            published.extend(event['data']['meshMessageId'] for event in call[0][0])
+
+        assert sorted(published) == message_ids
+
+    def test_shard_checkpoint_is_kept_per_shard(self, mock_event_publisher_class):
+        """Test that each shard resumes from its own checkpoint"""
+        from dl_utils import InMemoryTtlStore
+
+        mock_event_publisher = Mock()
+        mock_event_publisher.send_events.return_value = []
+        mock_event_publisher_class.return_value = mock_event_publisher
+
+        store = InMemoryTtlStore(300)
+        message_ids = [f'20250101090000000000_{i:06d}' for i in range(20)]
+        mesh_client = self.create_mesh_client(message_ids)
+        processor = self.create_processor(
+            mesh_client, 1, 2, scan_checkpoint_store=store, scan_checkpoint_key='MAILBOX')
+
+        processor.process_messages()
+
+        assert store.get('MAILBOX') is None
+        assert store.get('MAILBOX/shard-1-of-2') is not None
+
+    def test_invalid_shard_index_is_rejected(self, mock_event_publisher_class):
+        """Test that a shard index outside the shard count is rejected"""
+        with pytest.raises(ValueError):
+            self.create_processor(Mock(spec=MeshClient), 2, 2)
@@ -1,7 +1,9 @@
 """
 Module for configuring Mesh Poll application
 """
-from dl_utils import BaseMeshConfig, Metric, log
+from contextlib import ExitStack
+
+from dl_utils import BaseMeshConfig, MeshMailboxConfig, Metric, build_ttl_store, log
 
 __all__ = ['Config', 'log']
 
@@ -18,34 +20,221 @@ _REQUIRED_ENV_VAR_MAP = {
     "polling_metric_namespace": "POLLING_METRIC_NAMESPACE"
 }
 
+_OPTIONAL_ENV_VAR_MAP = {
+    **BaseMeshConfig._OPTIONAL_ENV_VAR_MAP,  # pylint: disable=protected-access
+    "ssm_mesh_prefixes": "SSM_MESH_PREFIXES",
+    "poll_max_workers": "POLL_MAX_WORKERS",
+    "poll_publish_batch_size": "POLL_PUBLISH_BATCH_SIZE",
+    "poll_headers_only": "POLL_HEADERS_ONLY",
+    "poll_shard_index": "POLL_SHARD_INDEX",
+    "poll_shard_count": "POLL_SHARD_COUNT",
+    "seen_message_ttl_seconds": "SEEN_MESSAGE_TTL_SECONDS",
+    "seen_message_store_uri": "SEEN_MESSAGE_STORE_URI",
+    "suppressed_duplicate_metric_name": "SUPPRESSED_DUPLICATE_METRIC_NAME",
+    "remaining_time_metric_name": "REMAINING_TIME_METRIC_NAME",
+    "message_time_estimate_metric_name": "MESSAGE_TIME_ESTIMATE_METRIC_NAME",
+    "scan_checkpoint_ttl_seconds": "SCAN_CHECKPOINT_TTL_SECONDS",
+    "scan_checkpoint_store_uri": "SCAN_CHECKPOINT_STORE_URI",
+    "inbox_depth_metric_name": "INBOX_DEPTH_METRIC_NAME",
+    "oldest_message_age_metric_name": "OLDEST_MESSAGE_AGE_METRIC_NAME",
+}
+
+# Messages are processed one at a time unless POLL_MAX_WORKERS is set
+DEFAULT_POLL_MAX_WORKERS = 1
+
+# Each event is published on its own unless POLL_PUBLISH_BATCH_SIZE is set
+DEFAULT_POLL_PUBLISH_BATCH_SIZE = 1
+
+# The whole inbox is handled by one poller unless POLL_SHARD_COUNT is set
+DEFAULT_POLL_SHARD_COUNT = 1
+
+DEFAULT_SUPPRESSED_DUPLICATE_METRIC_NAME = "mesh-poll-suppressed-duplicates"
+DEFAULT_REMAINING_TIME_METRIC_NAME = "mesh-poll-remaining-time"
+DEFAULT_MESSAGE_TIME_ESTIMATE_METRIC_NAME = "mesh-poll-message-time-estimate"
+DEFAULT_INBOX_DEPTH_METRIC_NAME = "mesh-poll-inbox-depth"
+DEFAULT_OLDEST_MESSAGE_AGE_METRIC_NAME = "mesh-poll-oldest-message-age"
 
-class Config(BaseMeshConfig):
+# Stores are kept at module level so that they stay warm between invocations
+_SEEN_MESSAGE_STORES = {}
+_SCAN_CHECKPOINT_STORES = {}
+
+
+class Config(BaseMeshConfig):  # pylint: disable=too-many-instance-attributes
     """
     Represents the configuration of the Mesh Poll application.
-    Inherits common MESH configuration from BaseMeshConfig.
+    Inherits common MESH configuration from BaseMeshConfig. As there, each setting
+    is an attribute populated from its environment variable.
     """
 
     _REQUIRED_ENV_VAR_MAP = _REQUIRED_ENV_VAR_MAP
+    _OPTIONAL_ENV_VAR_MAP = _OPTIONAL_ENV_VAR_MAP
+    _BOOLEAN_ENV_VARS = {*BaseMeshConfig._BOOLEAN_ENV_VARS, "poll_headers_only"}
 
     def __init__(self, ssm=None):
+        self.ssm_mesh_prefixes = None
+        self.poll_max_workers = DEFAULT_POLL_MAX_WORKERS
+        self.poll_publish_batch_size = DEFAULT_POLL_PUBLISH_BATCH_SIZE
+        self.poll_headers_only = False
+        self.poll_shard_index = 0
+        self.poll_shard_count = DEFAULT_POLL_SHARD_COUNT
+        self.seen_message_ttl_seconds = None
+        self.seen_message_store_uri = None
+        self.suppressed_duplicate_metric_name = DEFAULT_SUPPRESSED_DUPLICATE_METRIC_NAME
+        self.remaining_time_metric_name = DEFAULT_REMAINING_TIME_METRIC_NAME
+        self.message_time_estimate_metric_name = DEFAULT_MESSAGE_TIME_ESTIMATE_METRIC_NAME
+        self.scan_checkpoint_ttl_seconds = None
+        self.scan_checkpoint_store_uri = None
+        self.inbox_depth_metric_name = DEFAULT_INBOX_DEPTH_METRIC_NAME
+        self.oldest_message_age_metric_name = DEFAULT_OLDEST_MESSAGE_AGE_METRIC_NAME
+
         super().__init__(ssm=ssm)
 
         self.polling_metric = None
+        self.mailboxes = []
+        self.__mailbox_stack = ExitStack()
+        self.seen_message_store = None
+        self.suppressed_duplicate_metric = None
+        self.remaining_time_metric = None
+        self.message_time_estimate_metric = None
+        self.scan_checkpoint_store = None
+        self.inbox_depth_metric = None
+        self.oldest_message_age_metric = None
 
     def __enter__(self):
         super().__enter__()
 
-        # Build polling metric
-        self.polling_metric = self.build_polling_metric()
+        # Load any additional mailboxes, each with its own MESH client and polling metric
+        self.mailboxes = [self]
+        for ssm_mesh_prefix in self.additional_ssm_mesh_prefixes():
+            self.mailboxes.append(
+                self.__mailbox_stack.enter_context(MeshMailboxConfig(self, ssm_mesh_prefix)))
+
+        # Build polling metric, per mailbox when more than one is polled
+        for mailbox_config in self.mailboxes:
+            mailbox_config.polling_metric = self.build_polling_metric(
+                mailbox_config.mesh_mailbox if len(self.mailboxes) > 1 else None)
+
+        # Build store used to suppress duplicate received events
+        self.seen_message_store = self.build_seen_message_store()
+        self.suppressed_duplicate_metric = self.build_suppressed_duplicate_metric()
+
+        # Build metrics describing the adaptive time budget
+        self.remaining_time_metric = self.build_time_budget_metric(
+            self.remaining_time_metric_name)
+        self.message_time_estimate_metric = self.build_time_budget_metric(
+            self.message_time_estimate_metric_name)
+
+        # Build checkpoint store used to resume scanning the inbox between polls
+        self.scan_checkpoint_store = self.build_scan_checkpoint_store()
+        self.inbox_depth_metric = self.build_inbox_metric(self.inbox_depth_metric_name)
+        self.oldest_message_age_metric = self.build_inbox_metric(
+            self.oldest_message_age_metric_name, unit='Seconds')
 
         return self
 
-    def build_polling_metric(self):
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__mailbox_stack.close()
+        super().__exit__(exc_type, exc_value, traceback)
+
+    def additional_ssm_mesh_prefixes(self):
+        """
+        Returns the SSM prefixes of mailboxes listed in SSM_MESH_PREFIXES, other than
+        the mailbox loaded from SSM_MESH_PREFIX
+        """
+        if not self.ssm_mesh_prefixes:
+            return []
+
+        prefixes = []
+        for prefix in self.ssm_mesh_prefixes.split(','):
+            prefix = prefix.strip()
+            if prefix and prefix != self.ssm_mesh_prefix and prefix not in prefixes:
+                prefixes.append(prefix)
+
+        return prefixes
+
+    def build_polling_metric(self, mailbox=None):
         """
         Returns a custom metric to record messages found in the MESH inbox during polling
         """
+        dimensions = {"Environment": self.environment}
+        if mailbox:
+            dimensions["Mailbox"] = mailbox
+
         return Metric(
             name=self.polling_metric_name,
             namespace=self.polling_metric_namespace,
+            dimensions=dimensions
+        )
+
+    def build_seen_message_store(self):
+        """
+        Returns a store of MESH message IDs that have already been announced, or None
+        when SEEN_MESSAGE_TTL_SECONDS is not set. Entries are kept in memory and,
+        when SEEN_MESSAGE_STORE_URI is set, in S3 so they survive cold starts.
+        """
+        if not self.seen_message_ttl_seconds:
+            return None
+
+        store_key = (int(self.seen_message_ttl_seconds), self.seen_message_store_uri)
+        if store_key not in _SEEN_MESSAGE_STORES:
+            _SEEN_MESSAGE_STORES[store_key] = build_ttl_store(
+                store_key[0],
+                s3_client=self.s3_client,
+                s3_uri=self.seen_message_store_uri
+            )
+
+        return _SEEN_MESSAGE_STORES[store_key]
+
+    def build_suppressed_duplicate_metric(self):
+        """
+        Returns a custom metric to record received events suppressed because the message
+        had already been announced
+        """
+        return Metric(
+            name=self.suppressed_duplicate_metric_name,
+            namespace=self.polling_metric_namespace,
             dimensions={"Environment": self.environment}
         )
+
+    def build_time_budget_metric(self, name):
+        """
+        Returns a custom metric, in milliseconds, describing the time budget of a poll
+        """
+        return Metric(
+            name=name,
+            namespace=self.polling_metric_namespace,
+            dimensions={"Environment": self.environment},
+            unit='Milliseconds'
+        )
+
+    def build_scan_checkpoint_store(self):
+        """
+        Returns a store holding the position reached in the inbox by the previous poll,
+        or None when SCAN_CHECKPOINT_TTL_SECONDS is not set. The checkpoint is kept in
+        memory or, when SCAN_CHECKPOINT_STORE_URI is set, only in S3, so that a warm
+        container resumes from the position saved by whichever invocation polled last.
+        """
+        if not self.scan_checkpoint_ttl_seconds:
+            return None
+
+        store_key = (int(self.scan_checkpoint_ttl_seconds), self.scan_checkpoint_store_uri)
+        if store_key not in _SCAN_CHECKPOINT_STORES:
+            _SCAN_CHECKPOINT_STORES[store_key] = build_ttl_store(
+                store_key[0],
+                s3_client=self.s3_client,
+                s3_uri=self.scan_checkpoint_store_uri,
+                warm_tier=False
+            )
+
+        return _SCAN_CHECKPOINT_STORES[store_key]
+
+    def build_inbox_metric(self, name, unit='Count'):
+        """
+        Returns a custom metric describing the contents of the MESH inbox
+        """
+        return Metric(
+            name=name,
+            namespace=self.polling_metric_namespace,
+            dimensions={"Environment": self.environment},
+            unit=unit
+        )
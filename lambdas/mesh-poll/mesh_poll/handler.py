@@ -1,20 +1,77 @@
 """lambda handler for mesh poll application"""
 
+from concurrent.futures import ThreadPoolExecutor
+
 from boto3 import client
 from dl_utils import SenderLookup
 from .config import Config, log
 from .processor import MeshMessageProcessor
 
 
-def handler(_, context):
-    """lambda handler for mesh poll application"""
+def handler(event, context):
+    """
+    lambda handler for mesh poll application. A scheduled event may carry
+    shardIndex and shardCount to run one of several pollers sharing the inbox.
+    """
+    event = event if isinstance(event, dict) else {}
+
     with Config() as config:
-        processor = MeshMessageProcessor(
-            config=config,
-            sender_lookup=SenderLookup(client('ssm'), config, log),
-            mesh_client=config.mesh_client,
-            get_remaining_time_in_millis=context.get_remaining_time_in_millis,
-            log=log,
-            polling_metric=config.polling_metric)
-
-        processor.process_messages()
+        sender_lookup = SenderLookup(client('ssm'), config, log)
+
+        processors = [
+            build_processor(config, mailbox_config, sender_lookup, context, event)
+            for mailbox_config in config.mailboxes
+        ]
+
+        poll_mailboxes(processors)
+
+
+def build_processor(config, mailbox_config, sender_lookup, context, event):
+    """
+    Builds a processor for one mailbox, with its own MESH client, polling metric and
+    time budget
+    """
+    mailbox_log = log
+    if len(config.mailboxes) > 1:
+        mailbox_log = log.bind(mailbox=mailbox_config.mesh_mailbox)
+
+    return MeshMessageProcessor(
+        config=config,
+        sender_lookup=sender_lookup,
+        mesh_client=mailbox_config.mesh_client,
+        get_remaining_time_in_millis=context.get_remaining_time_in_millis,
+        log=mailbox_log,
+        polling_metric=mailbox_config.polling_metric,
+        max_workers=config.poll_max_workers,
+        publish_batch_size=config.poll_publish_batch_size,
+        headers_only=config.poll_headers_only,
+        seen_message_store=config.seen_message_store,
+        suppressed_duplicate_metric=config.suppressed_duplicate_metric,
+        remaining_time_metric=config.remaining_time_metric,
+        message_time_estimate_metric=config.message_time_estimate_metric,
+        scan_checkpoint_store=config.scan_checkpoint_store,
+        scan_checkpoint_key=mailbox_config.mesh_mailbox,
+        inbox_depth_metric=config.inbox_depth_metric,
+        oldest_message_age_metric=config.oldest_message_age_metric,
+        shard_index=event.get('shardIndex', config.poll_shard_index),
+        shard_count=event.get('shardCount', config.poll_shard_count))
+
+
+def poll_mailboxes(processors):
+    """
+    Polls each mailbox, concurrently when there is more than one. A failure in one
+    mailbox does not stop the others; the first failure is raised once all have finished.
+    """
+    if len(processors) == 1:
+        processors[0].process_messages()
+        return
+
+    with ThreadPoolExecutor(max_workers=len(processors)) as executor:
+        futures = [executor.submit(processor.process_messages) for processor in processors]
+
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    for error in errors:
+        log.error('Failed to poll mailbox', error=str(error))
+
+    if errors:
+        raise errors[0]
@@ -2,10 +2,21 @@
 Module for processing messages from a MESH mailbox
 """
 
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from threading import Lock
 from uuid import uuid4
 
-from dl_utils import EventPublisher
+from dl_utils import (
+    EventPublisher,
+    TimeBudget,
+    is_in_shard,
+    iterate_all_message_headers,
+    oldest_message_age_seconds,
+    resume_order,
+    retrieve_message_headers,
+)
 from digital_letters_events import MESHInboxMessageReceived, MESHInboxMessageInvalid
 
 from .errors import AuthorizationError, format_exception
@@ -13,6 +24,10 @@ from .errors import AuthorizationError, format_exception
 ACKNOWLEDGED_MESSAGE = "acknowledged message"
 PROCESSING_MESSAGE = "processing message"
 
+# An event waiting to be published in a batch, along with the message it describes
+PendingEvent = namedtuple(
+    'PendingEvent', ['cloud_event', 'validator', 'message', 'logger', 'acknowledge'])
+
 
 class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
     """
@@ -27,6 +42,37 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
         self.__get_remaining_time_in_millis = kwargs['get_remaining_time_in_millis']
         self.__mesh_client.handshake()
         self.__polling_metric = kwargs['polling_metric']
+        self.__time_budget = TimeBudget(
+            self.__get_remaining_time_in_millis,
+            self.__config.maximum_runtime_milliseconds
+        )
+        # Publishing a batch of events is measured apart from messages, so that it does
+        # not skew the per message estimate, and its predicted cost is kept in reserve
+        self.__flush_budget = TimeBudget(self.__get_remaining_time_in_millis, 0)
+        self.__remaining_time_metric = kwargs.get('remaining_time_metric')
+        self.__message_time_estimate_metric = kwargs.get('message_time_estimate_metric')
+        self.__max_workers = max(int(kwargs.get('max_workers', 1)), 1)
+        self.__headers_only = kwargs.get('headers_only', False)
+        self.__publish_batch_size = max(int(kwargs.get('publish_batch_size', 1)), 1)
+        self.__pending_events = []
+        self.__pending_events_lock = Lock()
+        self.__seen_message_store = kwargs.get('seen_message_store')
+        self.__suppressed_duplicate_metric = kwargs.get('suppressed_duplicate_metric')
+        self.__suppressed_duplicate_count = 0
+        self.__suppressed_duplicate_lock = Lock()
+        self.__scan_checkpoint_store = kwargs.get('scan_checkpoint_store')
+        self.__shard_index = int(kwargs.get('shard_index', 0))
+        self.__shard_count = int(kwargs.get('shard_count', 1))
+        if not 0 <= self.__shard_index < max(self.__shard_count, 1):
+            raise ValueError(
+                f'Shard index {self.__shard_index} is not valid for {self.__shard_count} shard(s)')
+        self.__scan_checkpoint_key = kwargs.get('scan_checkpoint_key', 'mesh-poll')
+        if self.__is_sharded():
+            self.__scan_checkpoint_key = (
+                f'{self.__scan_checkpoint_key}/shard-{self.__shard_index}-of-{self.__shard_count}')
+        self.__scan_position = None
+        self.__inbox_depth_metric = kwargs.get('inbox_depth_metric')
+        self.__oldest_message_age_metric = kwargs.get('oldest_message_age_metric')
 
         environment = 'development'
         deployment = 'primary'
@@ -44,38 +90,213 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
 
     def is_enough_time_to_process_message(self):
         """
-        Determines whether the lambda should continue to process messages
+        Determines whether the lambda should continue to process messages. The next
+        message must be predicted to finish, based on the measured cost of previous
+        messages, while still leaving MAXIMUM_RUNTIME_MILLISECONDS in reserve. When
+        events are published in batches, the measured cost of publishing a batch is
+        also kept in reserve so that the final batch can be published.
         """
-        remaining_time_in_millis = self.__get_remaining_time_in_millis()
+        reserved_millis = 0
+        if self.__is_batching_events():
+            reserved_millis = self.__flush_budget.predicted_millis
 
-        return int(self.__config.maximum_runtime_milliseconds) \
-            < remaining_time_in_millis
+        return self.__time_budget.has_time_for_next(reserved_millis=reserved_millis)
 
     def process_messages(self):
         """
         Iterates over and processes messages in a MESH inbox
         """
         self.__log.info('Polling for messages')
+        self.__suppressed_duplicate_count = 0
+        self.__scan_position = None
 
-        # Process all messages in the inbox
-        message_count = 0
-        for message in self.__mesh_client.iterate_all_messages():
-            message_count += 1
-            if not self.is_enough_time_to_process_message():
-                self.__log.info(
-                    'Not enough time to process more files. Exiting')
-                self.__polling_metric.record(1)
-                return
+        if self.__max_workers > 1:
+            message_count, out_of_time = self.__process_messages_concurrently()
+        else:
+            message_count, out_of_time = self.__process_messages_serially()
 
-            self.process_message(message)
+        self.__flush_pending_events()
+        self.__save_scan_checkpoint()
 
-        if message_count == 0:
+        if out_of_time:
+            self.__log.info('Not enough time to process more files. Exiting')
+        elif message_count == 0:
             self.__log.info('No messages found in inbox')
         else:
             self.__log.info(f'Processed {message_count} message(s)')
 
+        if self.__seen_message_store is not None:
+            self.__log.info('Suppressed duplicate received events',
+                            suppressed_count=self.__suppressed_duplicate_count)
+            if self.__suppressed_duplicate_metric is not None:
+                self.__suppressed_duplicate_metric.record(self.__suppressed_duplicate_count)
+
+        self.__record_time_budget_metrics()
         self.__polling_metric.record(1)
 
+    def __record_time_budget_metrics(self):
+        """
+        Records the time left at the end of the poll and the predicted cost of a message
+        """
+        if self.__remaining_time_metric is not None:
+            self.__remaining_time_metric.record(self.__time_budget.remaining_millis())
+
+        if self.__message_time_estimate_metric is not None:
+            self.__message_time_estimate_metric.record(self.__time_budget.predicted_millis)
+
+    def __iterate_inbox(self):
+        """
+        Iterates over the messages in the inbox. In headers-only mode message bodies
+        are never opened, as polling only needs the message headers.
+        """
+        if self.__scan_checkpoint_store is not None or self.__is_sharded():
+            return self.__iterate_inbox_by_id()
+
+        if self.__headers_only:
+            return iterate_all_message_headers(self.__mesh_client)
+
+        return self.__mesh_client.iterate_all_messages()
+
+    def __is_sharded(self):
+        """
+        Determines whether the inbox is shared between several pollers
+        """
+        return self.__shard_count > 1
+
+    def __iterate_inbox_by_id(self):
+        """
+        Lists the message IDs in the inbox and retrieves only the messages in this
+        poller's shard, starting after the checkpoint saved by the previous poll and
+        wrapping around to the start of the inbox. A message becomes the scan position
+        once the next message is requested, which only happens after it has been started.
+        """
+        message_ids = list(self.__mesh_client.iterate_message_ids())
+        self.__record_inbox_metrics(message_ids)
+
+        shard_message_ids = [
+            message_id for message_id in message_ids
+            if is_in_shard(message_id, self.__shard_index, self.__shard_count)
+        ]
+
+        checkpoint = None
+        if self.__scan_checkpoint_store is not None:
+            checkpoint = self.__load_scan_checkpoint()
+
+        for message_id in resume_order(shard_message_ids, checkpoint):
+            message = self.__retrieve_message(message_id)
+            if message is None:
+                continue
+
+            yield message
+            self.__scan_position = message_id
+
+    def __retrieve_message(self, message_id):
+        """
+        Retrieves a message listed in the inbox, returning None if it cannot be retrieved,
+        for example because another poller has already acknowledged it
+        """
+        try:
+            if self.__headers_only:
+                return retrieve_message_headers(self.__mesh_client, message_id)
+
+            return self.__mesh_client.retrieve_message(message_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warning('Failed to retrieve message', message_id=message_id,
+                               error=format_exception(exc))
+            return None
+
+    def __load_scan_checkpoint(self):
+        """
+        Returns the ID of the last message started by the previous poll, if any
+        """
+        try:
+            checkpoint = self.__scan_checkpoint_store.get(self.__scan_checkpoint_key)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warning('Failed to read scan checkpoint', error=str(exc))
+            return None
+
+        if checkpoint:
+            self.__log.info('Resuming inbox scan', checkpoint=checkpoint)
+
+        return checkpoint
+
+    def __save_scan_checkpoint(self):
+        """
+        Saves the ID of the last message started so the next poll resumes after it
+        """
+        if self.__scan_checkpoint_store is None or self.__scan_position is None:
+            return
+
+        try:
+            self.__scan_checkpoint_store.put(self.__scan_checkpoint_key, self.__scan_position)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.warning('Failed to update scan checkpoint', error=str(exc))
+
+    def __record_inbox_metrics(self, message_ids):
+        """
+        Records the number of messages in the inbox and the age of the oldest message
+        """
+        if self.__inbox_depth_metric is not None:
+            self.__inbox_depth_metric.record(len(message_ids))
+
+        oldest_age = oldest_message_age_seconds(message_ids)
+        if self.__oldest_message_age_metric is not None and oldest_age is not None:
+            self.__oldest_message_age_metric.record(oldest_age)
+
+    def __process_messages_serially(self):
+        """
+        Processes messages one at a time until the inbox is empty or time runs out
+        """
+        message_count = 0
+        for message in self.__iterate_inbox():
+            message_count += 1
+            if not self.is_enough_time_to_process_message():
+                return message_count, True
+
+            with self.__time_budget.measure():
+                self.process_message(message)
+
+            self.__flush_pending_events(full_batch_only=True)
+
+        return message_count, False
+
+    def __process_messages_concurrently(self):
+        """
+        Processes messages on a bounded pool of worker threads. No new message is
+        started once time runs out; messages already in flight are allowed to finish.
+        """
+        message_count = 0
+        out_of_time = False
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            for message in self.__iterate_inbox():
+                message_count += 1
+                if not self.is_enough_time_to_process_message():
+                    out_of_time = True
+                    break
+
+                pending.add(executor.submit(self.__process_message_isolated, message))
+
+                if len(pending) >= self.__max_workers:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            wait(pending)
+
+        return message_count, out_of_time
+
+    def __process_message_isolated(self, message):
+        """
+        Processes a message on a worker thread, ensuring one failure cannot affect others
+        """
+        try:
+            with self.__time_budget.measure():
+                self.process_message(message)
+
+            self.__flush_pending_events(full_batch_only=True)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.error(format_exception(exc))
+
     def process_message(self, message):
         """
         Processes an individual message from a MESH inbox - validates sender and publishes event
@@ -120,6 +341,16 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
                     }
                 }
 
+                if self.__is_batching_events():
+                    # Acknowledged once the event has been published
+                    self.__defer_event(PendingEvent(
+                        cloud_event=self._build_mesh_inbox_message_invalid_event(event_detail),
+                        validator=MESHInboxMessageInvalid,
+                        message=message,
+                        logger=logger,
+                        acknowledge=True))
+                    return
+
                 self._publish_mesh_inbox_message_invalid_event(event_detail)
 
                 message.acknowledge()  # Remove from inbox
@@ -128,6 +359,10 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
 
             # Publish event for valid sender
             message_id = message.id()
+
+            if self.__is_already_announced(message_id, logger):
+                return
+
             event_detail = {
                 "data": {
                     "meshMessageId": message_id,
@@ -136,7 +371,17 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
                 }
             }
 
+            if self.__is_batching_events():
+                self.__defer_event(PendingEvent(
+                    cloud_event=self._build_mesh_inbox_message_received_event(event_detail),
+                    validator=MESHInboxMessageReceived,
+                    message=message,
+                    logger=logger,
+                    acknowledge=False))
+                return
+
             self._publish_mesh_inbox_message_received_event(event_detail)
+            self.__mark_announced(message_id, logger)
 
         except AuthorizationError as exception:
             logger.error(format_exception(exception))
@@ -147,13 +392,144 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
         except Exception as exc:  # pylint: disable=broad-except
             logger.error(format_exception(exc))
 
+    def __is_already_announced(self, message_id, logger):
+        """
+        Determines whether a received event has already been published for a message
+        that is still waiting in the inbox
+        """
+        if self.__seen_message_store is None:
+            return False
+
+        try:
+            announced_at = self.__seen_message_store.get(message_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning('Failed to read seen message store', error=str(exc))
+            return False
+
+        if announced_at is None:
+            return False
+
+        logger.info('Skipping message already announced', announced_at=announced_at)
+        with self.__suppressed_duplicate_lock:
+            self.__suppressed_duplicate_count += 1
+
+        return True
+
+    def __mark_announced(self, message_id, logger):
+        """
+        Records that a received event has been published for a message
+        """
+        if self.__seen_message_store is None:
+            return
+
+        try:
+            self.__seen_message_store.put(message_id, datetime.now(timezone.utc).isoformat())
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning('Failed to update seen message store', error=str(exc))
+
+    def __is_batching_events(self):
+        """
+        Determines whether events are collected and published in batches
+        """
+        return self.__publish_batch_size > 1
+
+    def __defer_event(self, pending_event):
+        """
+        Adds an event to the pending batch, which is published by the polling loop
+        once it is full
+        """
+        with self.__pending_events_lock:
+            self.__pending_events.append(pending_event)
+
+    def __flush_pending_events(self, full_batch_only=False):
+        """
+        Publishes any pending events, measuring how long publishing takes. With
+        full_batch_only, events are only published once the batch is full.
+        """
+        with self.__pending_events_lock:
+            pending_count = len(self.__pending_events)
+
+        if pending_count == 0 or (full_batch_only and pending_count < self.__publish_batch_size):
+            return
+
+        with self.__flush_budget.measure():
+            self.flush_events()
+
+    def flush_events(self):
+        """
+        Publishes any pending events, acknowledging invalid messages only once their
+        event has been published. Messages whose events fail remain in the inbox and
+        are retried on the next poll.
+        """
+        with self.__pending_events_lock:
+            pending_events, self.__pending_events = self.__pending_events, []
+
+        for validator in (MESHInboxMessageReceived, MESHInboxMessageInvalid):
+            batch = [event for event in pending_events if event.validator is validator]
+            if batch:
+                self.__publish_pending_events(batch, validator)
+
+    def __publish_pending_events(self, pending_events, validator):
+        """
+        Publishes a batch of pending events of the same type
+        """
+        event_name = validator.__name__
+
+        try:
+            failed_events = self.__event_publisher.send_events(
+                [pending_event.cloud_event for pending_event in pending_events], validator)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.__log.error(f"Failed to publish {event_name} events",
+                             error=format_exception(exc), failed_count=len(pending_events))
+            return
+
+        if failed_events:
+            self.__log.error(f"Failed to publish {event_name} events: {failed_events}",
+                             failed_count=len(failed_events))
+
+        failed_event_ids = {failed_event.get('id') for failed_event in failed_events}
+
+        for pending_event in pending_events:
+            if pending_event.cloud_event['id'] in failed_event_ids:
+                continue
+
+            pending_event.logger.info(f"Published {event_name} event")
+
+            if validator is MESHInboxMessageReceived:
+                self.__mark_announced(
+                    pending_event.cloud_event['data']['meshMessageId'], pending_event.logger)
+
+            if pending_event.acknowledge:
+                try:
+                    pending_event.message.acknowledge()  # Remove from inbox
+                    pending_event.logger.info(ACKNOWLEDGED_MESSAGE)
+                except Exception as exc:  # pylint: disable=broad-except
+                    pending_event.logger.error(format_exception(exc))
+
     def _publish_mesh_inbox_message_received_event(self, event_detail):
         """
         Publishes a MESHInboxMessageReceived event for the retriever component.
         """
+        cloud_event = self._build_mesh_inbox_message_received_event(event_detail)
+
+        failed_events = self.__event_publisher.send_events([cloud_event], MESHInboxMessageReceived)
+
+        if failed_events:
+            error_msg = f"Failed to publish MESHInboxMessageReceived event: {failed_events}"
+            self.__log.error(error_msg, failed_count=len(failed_events))
+            raise RuntimeError(error_msg)
+
+        self.__log.info("Published MESHInboxMessageReceived event",
+                        mesh_message_id=event_detail["data"]["meshMessageId"],
+                        sender_id=event_detail["data"]["senderId"])
+
+    def _build_mesh_inbox_message_received_event(self, event_detail):
+        """
+        Builds a MESHInboxMessageReceived event for the retriever component.
+        """
         now = datetime.now(timezone.utc).isoformat()
 
-        cloud_event = {
+        return {
             'id': str(uuid4()),
             'specversion': '1.0',
             'source': self.__cloud_event_source,
@@ -177,24 +553,31 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
             'data': event_detail.get('data', {}),
         }
 
-        failed_events = self.__event_publisher.send_events([cloud_event], MESHInboxMessageReceived)
+    def _publish_mesh_inbox_message_invalid_event(self, event_detail):
+        """
+        Publishes a MESHInboxMessageInvalid event when a message fails validation.
+        """
+        cloud_event = self._build_mesh_inbox_message_invalid_event(event_detail)
+
+        failed_events = self.__event_publisher.send_events([cloud_event], MESHInboxMessageInvalid)
 
         if failed_events:
-            error_msg = f"Failed to publish MESHInboxMessageReceived event: {failed_events}"
+            error_msg = f"Failed to publish MESHInboxMessageInvalid event: {failed_events}"
             self.__log.error(error_msg, failed_count=len(failed_events))
             raise RuntimeError(error_msg)
 
-        self.__log.info("Published MESHInboxMessageReceived event",
+        self.__log.info("Published MESHInboxMessageInvalid event",
                         mesh_message_id=event_detail["data"]["meshMessageId"],
-                        sender_id=event_detail["data"]["senderId"])
+                        sender_id=event_detail["data"]["senderId"],
+                        failure_code=event_detail["data"]["failureCode"])
 
-    def _publish_mesh_inbox_message_invalid_event(self, event_detail):
+    def _build_mesh_inbox_message_invalid_event(self, event_detail):
         """
-        Publishes a MESHInboxMessageInvalid event when a message fails validation.
+        Builds a MESHInboxMessageInvalid event for a message that failed validation.
         """
         now = datetime.now(timezone.utc).isoformat()
 
-        cloud_event = {
+        return {
             'id': str(uuid4()),
             'specversion': '1.0',
             'source': self.__cloud_event_source,
@@ -214,15 +597,3 @@ class MeshMessageProcessor:  # pylint: disable=too-many-instance-attributes
             'datacontenttype': 'application/json',
             'data': event_detail.get('data', {})
         }
-
-        failed_events = self.__event_publisher.send_events([cloud_event], MESHInboxMessageInvalid)
-
-        if failed_events:
-            error_msg = f"Failed to publish MESHInboxMessageInvalid event: {failed_events}"
-            self.__log.error(error_msg, failed_count=len(failed_events))
-            raise RuntimeError(error_msg)
-
-        self.__log.info("Published MESHInboxMessageInvalid event",
-                        mesh_message_id=event_detail["data"]["meshMessageId"],
-                        sender_id=event_detail["data"]["senderId"],
-                        failure_code=event_detail["data"]["failureCode"])
@@ -0,0 +1,111 @@
+"""
+Benchmark for streaming reports from S3 to MESH in report-sender.
+
+Reports of increasing size are sent through MockMeshClient, backed by an
+in-memory stand-in for S3 that generates report content as it is read and
+discards uploaded content after counting it. The peak memory allocated while
+sending each report is compared between reading the report into memory in
+full and streaming it in chunks, optionally compressed.
+
+Usage (from the repository root):
+    PYTHONPATH=lambdas/report-sender:utils/py-utils:utils/py-mock-mesh \\
+        python lambdas/report-sender/benchmarks/benchmark_streaming_reports.py --sizes-mib 8 32 128
+"""
+import argparse
+import time
+import tracemalloc
+from unittest.mock import Mock
+
+from py_mock_mesh import InMemoryS3, MockMeshClient
+from report_sender.mesh_report_sender import MeshReportsSender
+from report_sender.reports_store import ReportsStore
+
+MIB = 1024 * 1024
+REPORT_LINE = b'2026-02-03,920fca11-596a-4eca-9c47-99f624614658,DELIVERED\n'
+
+
+class GeneratedReport:
+    """
+    Stream of report lines that is generated as it is read rather than held in memory
+    """
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes of the report, or the rest of it when size is not given
+        """
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        lines = REPORT_LINE * (size // len(REPORT_LINE) + 1)
+        return lines[:size]
+
+    def close(self):
+        """
+        Nothing to release
+        """
+
+
+class GeneratedReportS3(InMemoryS3):
+    """
+    S3 stand-in that serves a generated report and counts the bytes uploaded to
+    MockMeshClient without keeping them
+    """
+
+    def __init__(self, report_size):
+        super().__init__(keep_bodies=False)
+        self.report_size = report_size
+
+    def get_object(self, **_):  # pylint: disable=missing-function-docstring
+        return {
+            'Body': GeneratedReport(self.report_size),
+            'ContentLength': self.report_size,
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+
+
+def run(label, report_size, chunk_size=None, compress=False):
+    """
+    Sends one report and prints the peak memory allocated while doing so
+    """
+    s3_client = GeneratedReportS3(report_size)
+    logger = Mock()
+    reports_store = ReportsStore(s3_client)
+    sender = MeshReportsSender(
+        MockMeshClient(s3_client, 's3://bucket/mock-mesh', 'MAILBOX', logger), logger)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    if chunk_size:
+        report = reports_store.open_report('s3://bucket/report-2026-02-03.csv')
+    else:
+        report = reports_store.download_report('s3://bucket/report-2026-02-03.csv')
+    sender.send_report('RECIPIENT', report, '2026-02-03', 'reference',
+                       max_chunk_size=chunk_size, compress=compress)
+
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{label:<12} {report_size // MIB:>5} MiB report: peak {peak / MIB:7.1f} MiB, '
+          f'{elapsed:.2f}s, {s3_client.parts} parts, {s3_client.uploaded_bytes / MIB:.1f} MiB sent')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--sizes-mib', type=int, nargs='+', default=[8, 32, 128],
+                        help='report sizes to send')
+    parser.add_argument('--chunk-mib', type=int, default=8, help='streaming chunk size')
+    args = parser.parse_args()
+
+    for size_mib in args.sizes_mib:
+        report_size = size_mib * MIB
+        run('buffered', report_size)
+        run('streamed', report_size, chunk_size=args.chunk_mib * MIB)
+        run('compressed', report_size, chunk_size=args.chunk_mib * MIB, compress=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,11 +13,18 @@ def setup_mocks():
     Create all mock objects needed for handler testing
     """
     mock_context = Mock()
+    mock_context.get_remaining_time_in_millis.return_value = 300000
 
     mock_config = MagicMock()
     mock_config.mesh_client = Mock()
     mock_config.s3_client = Mock()
     mock_config.send_metric = Mock()
+    mock_config.batch_minimum_remaining_millis = 5000
+    mock_config.send_metric_namespace = 'dl-report-sender'
+    mock_config.environment = 'test'
+    mock_config.report_chunk_size_bytes = '8388608'
+    mock_config.report_compress = True
+    mock_config.report_cache = None
 
     mock_ssm = Mock()
 
@@ -298,4 +305,6 @@ class TestHandler:
         assert isinstance(mock_processor_args['reports_store'], ReportsStore)
         assert mock_processor_args['event_publisher'] == mock_event_publisher
         assert mock_processor_args['send_metric'] == mock_config.send_metric
+        assert mock_processor_args['streaming_chunk_size'] == 8388608
+        assert mock_processor_args['compress_reports'] is True
         assert 'log' in mock_processor_args
@@ -55,6 +55,26 @@ class TestMeshReportsSender:
             local_id=report_reference
         )
 
+    def test_send_report_streams_in_chunks_with_compression(
+        self, mesh_report_sender, mock_mesh_client
+    ):
+        """Test that send_report passes a chunk size and compression through to MESH"""
+        report = {'Body': Mock(), 'ContentLength': 14}
+
+        mesh_report_sender.send_report(
+            "MAILBOX001", report, "2026-02-03", "report-reference-123",
+            max_chunk_size=1024, compress=True)
+
+        mock_mesh_client.send_message.assert_called_once_with(
+            "MAILBOX001",
+            report,
+            workflow_id='NHS_NOTIFY_DIGITAL_LETTERS_DAILY_REPORT',
+            subject="2026-02-03",
+            local_id="report-reference-123",
+            max_chunk_size=1024,
+            compress=True
+        )
+
     def test_send_report_raises_error_if_mesh_send_fails(
             self, mesh_report_sender, mock_mesh_client
     ):
@@ -0,0 +1,92 @@
+"""Tests for ReportCache"""
+import io
+import os
+import pytest
+from report_sender.report_cache import ReportCache
+
+
+@pytest.fixture(name='cache_dir')
+def create_cache_dir(tmp_path):
+    """Directory for the cached reports"""
+    return str(tmp_path / 'report-cache')
+
+
+@pytest.fixture(name='report_cache')
+def create_report_cache(cache_dir):
+    """Create ReportCache instance holding up to 10 bytes"""
+    return ReportCache(cache_dir, max_bytes=10)
+
+
+def read_cached(report_cache, bucket, key, etag):
+    """Reads the cached copy of a report, closing it afterwards"""
+    cached_report = report_cache.open(bucket, key, etag)
+    if cached_report is None:
+        return None
+    with cached_report['Body'] as body:
+        return body.read()
+
+
+class TestReportCache:
+    """Test suite for ReportCache"""
+
+    def test_put_then_open_returns_cached_report(self, report_cache):
+        """A cached report is returned with its size and ETag"""
+        report_cache.put('bucket', 'key', '"etag-1"', io.BytesIO(b'report'))
+
+        cached_report = report_cache.open('bucket', 'key', '"etag-1"')
+        with cached_report['Body'] as body:
+            assert body.read() == b'report'
+        assert cached_report['ContentLength'] == 6
+        assert cached_report['ETag'] == '"etag-1"'
+        assert report_cache.etag('bucket', 'key') == '"etag-1"'
+
+    def test_open_with_different_etag_returns_none(self, report_cache):
+        """A cached report is only returned for the ETag it was stored with"""
+        report_cache.put('bucket', 'key', '"etag-1"', io.BytesIO(b'report'))
+
+        assert report_cache.open('bucket', 'key', '"etag-2"') is None
+
+    def test_missing_report_returns_none(self, report_cache):
+        """Reports that were never cached are not found"""
+        assert report_cache.etag('bucket', 'key') is None
+        assert report_cache.open('bucket', 'key', '"etag-1"') is None
+
+    def test_put_replaces_older_copy(self, report_cache, cache_dir):
+        """Caching a new version of a report removes the old one"""
+        report_cache.put('bucket', 'key', '"etag-1"', io.BytesIO(b'old'))
+        report_cache.put('bucket', 'key', '"etag-2"', io.BytesIO(b'new'))
+
+        assert report_cache.etag('bucket', 'key') == '"etag-2"'
+        assert read_cached(report_cache, 'bucket', 'key', '"etag-2"') == b'new'
+        assert len(os.listdir(cache_dir)) == 1
+
+    def test_evicts_least_recently_used_reports_over_size_limit(self, report_cache, cache_dir):
+        """Reports used least recently are evicted once the cache exceeds its size limit"""
+        report_cache.put('bucket', 'first', '"1"', io.BytesIO(b'1111'))
+        report_cache.put('bucket', 'second', '"2"', io.BytesIO(b'2222'))
+        assert read_cached(report_cache, 'bucket', 'first', '"1"') == b'1111'
+
+        report_cache.put('bucket', 'third', '"3"', io.BytesIO(b'3333'))
+
+        assert report_cache.etag('bucket', 'second') is None
+        assert read_cached(report_cache, 'bucket', 'first', '"1"') == b'1111'
+        assert read_cached(report_cache, 'bucket', 'third', '"3"') == b'3333'
+        assert len(os.listdir(cache_dir)) == 2
+
+    def test_report_removed_from_disk_is_forgotten(self, report_cache, cache_dir):
+        """A report whose file has gone is treated as not cached"""
+        report_cache.put('bucket', 'key', '"etag-1"', io.BytesIO(b'report'))
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+
+        assert report_cache.open('bucket', 'key', '"etag-1"') is None
+        assert report_cache.etag('bucket', 'key') is None
+
+    def test_removes_files_left_by_earlier_cache(self, cache_dir):
+        """Files in the directory from an earlier cache are removed"""
+        ReportCache(cache_dir, max_bytes=10).put('bucket', 'key', '"etag-1"', io.BytesIO(b'report'))
+
+        report_cache = ReportCache(cache_dir, max_bytes=10)
+
+        assert not os.listdir(cache_dir)
+        assert report_cache.etag('bucket', 'key') is None
@@ -175,10 +175,83 @@ class TestReportSenderProcessor:
             b'report content',
             '2026-02-03',
             ANY,
+            max_chunk_size=None,
+            compress=False
         )
         mock_event_publisher.send_events.assert_called_once()
         mock_send_metric.record.assert_called_once_with(1)
 
+    def test_process_sqs_message_streams_report_when_chunk_size_set(
+        self,
+        mock_logger,
+        mock_sender_lookup,
+        mock_reports_store,
+        mock_mesh_report_sender,
+        mock_event_publisher,
+        mock_send_metric,
+    ):
+        """Test the report is streamed from S3 to MESH, and closed, when a chunk size is set"""
+        processor = ReportSenderProcessor(
+            config=Mock(),
+            log=mock_logger,
+            sender_lookup=mock_sender_lookup,
+            reports_store=mock_reports_store,
+            event_publisher=mock_event_publisher,
+            send_metric=mock_send_metric,
+            mesh_report_sender=mock_mesh_report_sender,
+            streaming_chunk_size=1024,
+            compress_reports=True
+        )
+        report = {'Body': Mock(), 'ContentLength': 14}
+        mock_sender_lookup.get_mesh_mailbox_reports_id_from_sender.return_value = 'MAILBOX001'
+        mock_reports_store.open_report.return_value = report
+
+        processor.process_sqs_message(create_valid_sqs_record())
+
+        mock_reports_store.open_report.assert_called_once_with(REPORT_URI)
+        mock_reports_store.download_report.assert_not_called()
+        mock_mesh_report_sender.send_report.assert_called_once_with(
+            'MAILBOX001',
+            report,
+            '2026-02-03',
+            ANY,
+            max_chunk_size=1024,
+            compress=True
+        )
+        report['Body'].close.assert_called_once()
+        mock_send_metric.record.assert_called_once_with(1)
+
+    def test_process_sqs_message_closes_streamed_report_when_mesh_send_fails(
+        self,
+        mock_logger,
+        mock_sender_lookup,
+        mock_reports_store,
+        mock_mesh_report_sender,
+        mock_event_publisher,
+        mock_send_metric,
+    ):
+        """Test the streamed report is closed when sending it to MESH fails"""
+        processor = ReportSenderProcessor(
+            config=Mock(),
+            log=mock_logger,
+            sender_lookup=mock_sender_lookup,
+            reports_store=mock_reports_store,
+            event_publisher=mock_event_publisher,
+            send_metric=mock_send_metric,
+            mesh_report_sender=mock_mesh_report_sender,
+            streaming_chunk_size=1024
+        )
+        report = {'Body': Mock(), 'ContentLength': 14}
+        mock_sender_lookup.get_mesh_mailbox_reports_id_from_sender.return_value = 'MAILBOX001'
+        mock_reports_store.open_report.return_value = report
+        mock_mesh_report_sender.send_report.side_effect = Exception("MESH error")
+
+        with pytest.raises(Exception, match="MESH error"):
+            processor.process_sqs_message(create_valid_sqs_record())
+
+        report['Body'].close.assert_called_once()
+        mock_event_publisher.send_events.assert_not_called()
+
     def test_process_sqs_message_sender_lookup_fails(
         self,
         processor,
@@ -1,6 +1,9 @@
 """Tests for ReportsStore"""
+import io
 import pytest
 from unittest.mock import Mock
+from botocore.exceptions import ClientError
+from report_sender.report_cache import ReportCache
 from report_sender.reports_store import ReportsStore
 from report_sender.errors import ReportNotFoundError
 
@@ -15,6 +18,25 @@ def create_reports_store(mock_s3_client):
     """Create ReportsStore instance with mocked S3 client for testing"""
     return ReportsStore(mock_s3_client)
 
+def create_s3_response(content, etag='"etag-1"'):
+    """Create an S3 get_object response for a report"""
+    return {
+        'Body': io.BytesIO(content),
+        'ContentLength': len(content),
+        'ETag': etag,
+        'ResponseMetadata': {'HTTPStatusCode': 200}
+    }
+
+
+def create_not_modified_error():
+    """Create the error raised by a conditional get_object for an unchanged object"""
+    return ClientError(
+        {'Error': {'Code': '304', 'Message': 'Not Modified'},
+         'ResponseMetadata': {'HTTPStatusCode': 304}},
+        'GetObject'
+    )
+
+
 class TestReportsStore:
     """Test suite for ReportsStore"""
 
@@ -58,3 +80,135 @@ class TestReportsStore:
             reports_store.download_report(
                 s3_uri='s3://test-bucket/report-key'
             )
+
+    def test_open_report_returns_s3_response_without_reading(self, reports_store, mock_s3_client):
+        """Returns the S3 response so that the report can be streamed"""
+        s3_response = {
+            'Body': Mock(),
+            'ContentLength': 14,
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+        mock_s3_client.get_object.return_value = s3_response
+
+        result = reports_store.open_report('s3://test-bucket/report-key')
+
+        assert result is s3_response
+        s3_response['Body'].read.assert_not_called()
+        mock_s3_client.get_object.assert_called_once_with(
+            Bucket='test-bucket',
+            Key='report-key'
+        )
+
+    def test_open_report_non_200_status_code_raises_error(self, reports_store, mock_s3_client):
+        """Raises Exception when S3 returns non-200 status code"""
+        mock_s3_client.get_object.return_value = {
+            'Body': Mock(),
+            'ResponseMetadata': {'HTTPStatusCode': 404}
+        }
+
+        with pytest.raises(ReportNotFoundError, match="Failed to fetch report from S3"):
+            reports_store.open_report('s3://test-bucket/report-key')
+
+
+class TestReportsStoreCache:
+    """Test suite for ReportsStore with a local report cache"""
+
+    @pytest.fixture(name='hit_metric')
+    def create_hit_metric(self):
+        """Create a mock cache hit metric"""
+        return Mock()
+
+    @pytest.fixture(name='miss_metric')
+    def create_miss_metric(self):
+        """Create a mock cache miss metric"""
+        return Mock()
+
+    @pytest.fixture(name='cached_reports_store')
+    def create_cached_reports_store(self, tmp_path, mock_s3_client, hit_metric, miss_metric):
+        """Create ReportsStore instance with a report cache holding up to 1 KiB"""
+        return ReportsStore(
+            mock_s3_client,
+            cache=ReportCache(str(tmp_path), max_bytes=1024),
+            hit_metric=hit_metric,
+            miss_metric=miss_metric
+        )
+
+    def test_first_download_fetches_and_caches_report(
+        self, cached_reports_store, mock_s3_client, hit_metric, miss_metric
+    ):
+        """A report not yet cached is fetched unconditionally and counted as a miss"""
+        mock_s3_client.get_object.return_value = create_s3_response(b'report content')
+
+        assert cached_reports_store.download_report('s3://test-bucket/report-key') == b'report content'
+
+        mock_s3_client.get_object.assert_called_once_with(Bucket='test-bucket', Key='report-key')
+        miss_metric.record.assert_called_once_with(1)
+        hit_metric.record.assert_not_called()
+
+    def test_unchanged_report_is_revalidated_and_read_from_cache(
+        self, cached_reports_store, mock_s3_client, hit_metric
+    ):
+        """A cached report is revalidated with IfNoneMatch and read from disk when unchanged"""
+        mock_s3_client.get_object.return_value = create_s3_response(b'report content')
+        cached_reports_store.download_report('s3://test-bucket/report-key')
+        mock_s3_client.get_object.reset_mock()
+        mock_s3_client.get_object.side_effect = create_not_modified_error()
+
+        assert cached_reports_store.download_report('s3://test-bucket/report-key') == b'report content'
+
+        mock_s3_client.get_object.assert_called_once_with(
+            Bucket='test-bucket', Key='report-key', IfNoneMatch='"etag-1"')
+        hit_metric.record.assert_called_once_with(1)
+
+    def test_changed_report_is_fetched_once_and_recached(
+        self, cached_reports_store, mock_s3_client, hit_metric, miss_metric
+    ):
+        """A report changed since it was cached is taken from the conditional response"""
+        mock_s3_client.get_object.return_value = create_s3_response(b'old content')
+        cached_reports_store.download_report('s3://test-bucket/report-key')
+        mock_s3_client.get_object.reset_mock()
+        mock_s3_client.get_object.return_value = create_s3_response(b'new content', etag='"etag-2"')
+
+        assert cached_reports_store.download_report('s3://test-bucket/report-key') == b'new content'
+
+        mock_s3_client.get_object.assert_called_once_with(
+            Bucket='test-bucket', Key='report-key', IfNoneMatch='"etag-1"')
+        assert miss_metric.record.call_count == 2
+        hit_metric.record.assert_not_called()
+
+    def test_open_report_returns_cached_copy_for_streaming(
+        self, cached_reports_store, mock_s3_client
+    ):
+        """An opened report is read from the cache in the shape of an S3 response"""
+        mock_s3_client.get_object.return_value = create_s3_response(b'report content')
+
+        report = cached_reports_store.open_report('s3://test-bucket/report-key')
+
+        with report['Body'] as body:
+            assert body.read() == b'report content'
+        assert report['ContentLength'] == 14
+
+    def test_report_larger_than_cache_is_returned_from_s3(
+        self, cached_reports_store, mock_s3_client
+    ):
+        """Reports too large for the cache are returned without being cached"""
+        s3_response = create_s3_response(b'x' * 2048)
+        mock_s3_client.get_object.return_value = s3_response
+
+        assert cached_reports_store.open_report('s3://test-bucket/report-key') is s3_response
+
+        mock_s3_client.get_object.reset_mock()
+        cached_reports_store.open_report('s3://test-bucket/report-key')
+        mock_s3_client.get_object.assert_called_once_with(Bucket='test-bucket', Key='report-key')
+
+    def test_revalidation_error_is_raised(self, cached_reports_store, mock_s3_client):
+        """Errors other than Not Modified from the conditional get_object are raised"""
+        mock_s3_client.get_object.return_value = create_s3_response(b'report content')
+        cached_reports_store.download_report('s3://test-bucket/report-key')
+        mock_s3_client.get_object.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied'}, 'ResponseMetadata': {'HTTPStatusCode': 403}},
+            'GetObject'
+        )
+
+        with pytest.raises(ClientError):
+            cached_reports_store.download_report('s3://test-bucket/report-key')
@@ -1,7 +1,9 @@
 """
 Module for configuring Report Sender application
 """
-from dl_utils import BaseMeshConfig, Metric
+from dl_utils import DEFAULT_MINIMUM_REMAINING_MILLIS, BaseMeshConfig, Metric
+
+from .report_cache import ReportCache
 
 
 _REQUIRED_ENV_VAR_MAP = {
@@ -14,6 +16,24 @@ _REQUIRED_ENV_VAR_MAP = {
     "send_metric_namespace": "REPORT_SENDER_METRIC_NAMESPACE"
 }
 
+_OPTIONAL_ENV_VAR_MAP = {
+    **BaseMeshConfig._OPTIONAL_ENV_VAR_MAP,  # pylint: disable=protected-access
+    "batch_minimum_remaining_millis": "BATCH_MINIMUM_REMAINING_MILLIS",
+    "report_chunk_size_bytes": "REPORT_CHUNK_SIZE_BYTES",
+    "report_compress": "REPORT_COMPRESS",
+    "report_cache_max_bytes": "REPORT_CACHE_MAX_BYTES",
+    "report_cache_dir": "REPORT_CACHE_DIR",
+    "report_cache_hit_metric_name": "REPORT_CACHE_HIT_METRIC_NAME",
+    "report_cache_miss_metric_name": "REPORT_CACHE_MISS_METRIC_NAME"
+}
+
+DEFAULT_REPORT_CACHE_DIR = "/tmp/report-cache"
+DEFAULT_REPORT_CACHE_HIT_METRIC_NAME = "report-sender-cache-hits"
+DEFAULT_REPORT_CACHE_MISS_METRIC_NAME = "report-sender-cache-misses"
+
+# Reports cached on local disk, kept for the lifetime of a warm container
+_REPORT_CACHES = {}
+
 
 class Config(BaseMeshConfig):
     """
@@ -22,17 +42,45 @@ class Config(BaseMeshConfig):
     """
 
     _REQUIRED_ENV_VAR_MAP = _REQUIRED_ENV_VAR_MAP
+    _OPTIONAL_ENV_VAR_MAP = _OPTIONAL_ENV_VAR_MAP
+    _BOOLEAN_ENV_VARS = {
+        *BaseMeshConfig._BOOLEAN_ENV_VARS,  # pylint: disable=protected-access
+        "report_compress"
+    }
 
     def __init__(self, ssm=None):
+        # Time left in reserve when deciding whether to start another SQS record
+        self.batch_minimum_remaining_millis = DEFAULT_MINIMUM_REMAINING_MILLIS
+        # Reports are read into memory in full unless a chunk size is set
+        self.report_chunk_size_bytes = None
+        # Reports are sent uncompressed unless REPORT_COMPRESS is set
+        self.report_compress = False
+        # Reports are only cached on local disk when REPORT_CACHE_MAX_BYTES is set
+        self.report_cache_max_bytes = 0
+        self.report_cache_dir = DEFAULT_REPORT_CACHE_DIR
+        self.report_cache_hit_metric_name = DEFAULT_REPORT_CACHE_HIT_METRIC_NAME
+        self.report_cache_miss_metric_name = DEFAULT_REPORT_CACHE_MISS_METRIC_NAME
+
         super().__init__(ssm=ssm)
 
         self.send_metric = None
+        self.report_cache = None
+        self.report_cache_hit_metric = None
+        self.report_cache_miss_metric = None
+
     def __enter__(self):
         super().__enter__()
 
         # Build send metric
         self.send_metric = self.build_send_metric()
 
+        # Build local cache of reports fetched from S3, and its metrics
+        self.report_cache = self.build_report_cache()
+        self.report_cache_hit_metric = self.build_report_cache_metric(
+            self.report_cache_hit_metric_name)
+        self.report_cache_miss_metric = self.build_report_cache_metric(
+            self.report_cache_miss_metric_name)
+
         return self
 
     def build_send_metric(self):
@@ -44,3 +92,29 @@ class Config(BaseMeshConfig):
             namespace=self.send_metric_namespace,
             dimensions={"Environment": self.environment}
         )
+
+    def build_report_cache(self):
+        """
+        Returns a cache of reports on local disk, or None unless REPORT_CACHE_MAX_BYTES
+        is set. The cache lives as long as the warm container, so redelivered events
+        for a report are answered from disk once S3 confirms it is unchanged.
+        """
+        max_bytes = int(self.report_cache_max_bytes)
+        if max_bytes <= 0:
+            return None
+
+        directory = self.report_cache_dir
+        if directory not in _REPORT_CACHES or _REPORT_CACHES[directory].max_bytes != max_bytes:
+            _REPORT_CACHES[directory] = ReportCache(directory, max_bytes)
+
+        return _REPORT_CACHES[directory]
+
+    def build_report_cache_metric(self, name):
+        """
+        Returns a custom metric to record reports found, or not found, in the local cache
+        """
+        return Metric(
+            name=name,
+            namespace=self.send_metric_namespace,
+            dimensions={"Environment": self.environment}
+        )
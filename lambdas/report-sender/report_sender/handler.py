@@ -1,7 +1,7 @@
 """lambda handler for send reports application"""
 
 from boto3 import client
-from dl_utils import log, EventPublisher
+from dl_utils import log, EventPublisher, SqsBatchRunner
 from .sender_lookup import SenderLookup
 from .config import Config
 from .report_sender_processor import ReportSenderProcessor
@@ -17,12 +17,6 @@ def handler(event, context):
     """
 
     log.info("Received SQS event", record_count=len(event.get('Records', [])))
-    batch_item_failures = []
-    processed = {
-        'retrieved': 0,
-        'sent': 0,
-        'failed': 0
-    }
 
     try:
         with Config() as config:
@@ -33,7 +27,12 @@ def handler(event, context):
                 logger=log
             )
 
-            reports_store = ReportsStore(config.s3_client)
+            reports_store = ReportsStore(
+                config.s3_client,
+                cache=config.report_cache,
+                hit_metric=config.report_cache_hit_metric,
+                miss_metric=config.report_cache_miss_metric
+            )
 
             mesh_report_sender = MeshReportsSender(config.mesh_client, log)
 
@@ -44,34 +43,32 @@ def handler(event, context):
                 mesh_report_sender=mesh_report_sender,
                 reports_store=reports_store,
                 event_publisher=event_publisher,
-                send_metric=config.send_metric)
-
-            # Process each SQS record
-            for record in event.get('Records', []):
-                processed['retrieved'] += 1
-                message_id = record.get('messageId')
+                send_metric=config.send_metric,
+                streaming_chunk_size=int(config.report_chunk_size_bytes or 0),
+                compress_reports=config.report_compress)
 
-                if record.get('eventSource') != 'aws:sqs':
-                    log.warn("Skipping non-SQS record", message_id=message_id)
-                    continue
+            runner = SqsBatchRunner(
+                logger=log,
+                outcomes=('sent',),
+                get_remaining_time_in_millis=getattr(context, 'get_remaining_time_in_millis', None),
+                minimum_remaining_millis=int(config.batch_minimum_remaining_millis),
+                metric_namespace=config.send_metric_namespace,
+                dimensions={"Environment": config.environment}
+            )
 
-                try:
-                    processor.process_sqs_message(record)
-                    processed['sent'] += 1
+            def send_report(record):
+                processor.process_sqs_message(record)
+                return 'sent'
 
-                except Exception as exc:
-                    processed['failed'] += 1
-                    log.error("Failed to process SQS message",
-                            message_id=message_id,
-                            error=str(exc))
-                    batch_item_failures.append({"itemIdentifier": message_id})
+            result = runner.run(event.get('Records', []), send_report)
 
         log.info("Processed SQS event",
-                retrieved=processed['retrieved'],
-                sent=processed['sent'],
-                failed=processed['failed'])
+                retrieved=result.counts['retrieved'],
+                sent=result.counts['sent'],
+                failed=result.counts['failed'],
+                unstarted=result.counts['unstarted'])
 
-        return {"batchItemFailures": batch_item_failures}
+        return result.response()
     except Exception as exc:
         log.exception("Failed to process send reports", error=str(exc))
         raise exc
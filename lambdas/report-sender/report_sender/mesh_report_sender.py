@@ -1,3 +1,5 @@
+from typing import Any, Dict, Optional, Union
+
 from dl_utils.errors import format_exception
 from mesh_client import MeshClient
 
@@ -13,15 +15,26 @@ class MeshReportsSender:
 
         self.__mesh_client.handshake()
 
-    def send_report(self, reporting_mailbox: str, report_bytes: bytes, report_date: str, report_reference: str) -> str:
+    def send_report(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        reporting_mailbox: str,
+        report_bytes: Union[bytes, Dict[str, Any]],
+        report_date: str,
+        report_reference: str,
+        max_chunk_size: Optional[int] = None,
+        compress: bool = False
+    ) -> str:
         """
         Sends a report to a specified MESH mailbox.
 
         Args:
             reporting_mailbox (str): The MESH mailbox ID to send the report to.
-            report_bytes (bytes): The report content in bytes.
+            report_bytes (bytes | dict): The report content in bytes, or an S3 get_object
+                response whose Body is streamed to MESH without being read into memory.
             report_date (str): The date of the report, used in the message subject.
             report_reference (str): The reference for the report, used in the message subject.
+            max_chunk_size (int, optional): Size of the chunks the report is uploaded in.
+            compress (bool): Whether the report is gzipped as it is uploaded.
 
         Returns:
             str: The MESH message ID assigned to the sent message.
@@ -29,6 +42,12 @@ class MeshReportsSender:
         Raises:
             Exception: If sending the report fails.
         """
+        options = {}
+        if max_chunk_size:
+            options['max_chunk_size'] = max_chunk_size
+        if compress:
+            options['compress'] = True
+
         try:
             mesh_message_id = self.__mesh_client.send_message(
                 reporting_mailbox,
@@ -36,6 +55,7 @@ class MeshReportsSender:
                 workflow_id=MESH_MESSAGE_WORKFLOW_ID,
                 subject=f'{report_date}',
                 local_id=report_reference,
+                **options
             )
             self.__log.info(
                 "Sent report to MESH mailbox",
@@ -0,0 +1,94 @@
+"""Module for caching reports fetched from S3 on local disk"""
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+
+# Bytes copied from S3 to disk at a time, so that caching a report does not read it into memory
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class ReportCache:
+    """
+    Thread-safe cache of reports on local disk, keyed by bucket, key and ETag, with
+    least recently used eviction once the reports held exceed max_bytes. The index
+    lives in memory, so the cache lasts as long as the warm container; any files
+    left in the directory by an earlier cache are removed when it is created.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__lock = Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+    def etag(self, bucket, key):
+        """
+        Returns the ETag of the cached copy of a report, or None if it is not cached
+        """
+        with self.__lock:
+            entry = self.__entries.get((bucket, key))
+            return entry[0] if entry is not None else None
+
+    def open(self, bucket, key, etag):
+        """
+        Returns the cached copy of a report with the given ETag in the shape of an S3
+        get_object response, or None if it is not cached. The caller closes the Body.
+        """
+        with self.__lock:
+            entry = self.__entries.get((bucket, key))
+            if entry is None or entry[0] != etag:
+                return None
+
+            try:
+                body = open(entry[1], 'rb')  # pylint: disable=consider-using-with
+            except FileNotFoundError:
+                self.__remove((bucket, key))
+                return None
+
+            self.__entries.move_to_end((bucket, key))
+            return {'Body': body, 'ContentLength': entry[2], 'ETag': etag}
+
+    def put(self, bucket, key, etag, stream):
+        """
+        Copies a report to disk in chunks, replacing any older copy, and evicts the
+        least recently used reports until the cache is back within max_bytes
+        """
+        path = os.path.join(self.directory, _file_name(bucket, key, etag))
+        partial_path = f'{path}.partial'
+
+        size = 0
+        with open(partial_path, 'wb') as file:
+            for chunk in iter(lambda: stream.read(COPY_CHUNK_BYTES), b''):
+                file.write(chunk)
+                size += len(chunk)
+        os.replace(partial_path, path)
+
+        with self.__lock:
+            self.__remove((bucket, key), keep_path=path)
+            self.__entries[(bucket, key)] = (etag, path, size)
+            self.__size += size
+
+            while self.__size > self.max_bytes and self.__entries:
+                self.__remove(next(iter(self.__entries)))
+
+    def __remove(self, cache_key, keep_path=None):
+        entry = self.__entries.pop(cache_key, None)
+        if entry is None:
+            return
+
+        self.__size -= entry[2]
+        if entry[1] != keep_path:
+            try:
+                os.remove(entry[1])
+            except FileNotFoundError:
+                pass
+
+
+def _file_name(bucket, key, etag):
+    return hashlib.sha256(f'{bucket}/{key}/{etag}'.encode('utf-8')).hexdigest()
@@ -3,11 +3,14 @@ Module for processing messages from an SQS queue.
 """
 
 from datetime import datetime, timezone
-import json
 from uuid import uuid4
 
-from pydantic import ValidationError
 from digital_letters_events import ReportGenerated, ReportSent
+from dl_utils import RecordDecoder
+
+REPORT_GENERATED_EVENT_TYPE = 'uk.nhs.notify.digital.letters.reporting.report.generated.v1'
+
+_EVENT_DECODER = RecordDecoder({REPORT_GENERATED_EVENT_TYPE: ReportGenerated})
 
 class ReportSenderProcessor:  # pylint: disable=too-many-instance-attributes
     """
@@ -21,6 +24,9 @@ class ReportSenderProcessor:  # pylint: disable=too-many-instance-attributes
         self.__event_publisher = kwargs['event_publisher']
         self.__send_metric = kwargs['send_metric']
         self.__mesh_report_sender = kwargs['mesh_report_sender']
+        # Reports are streamed from S3 to MESH in chunks of this size when set
+        self.__streaming_chunk_size = kwargs.get('streaming_chunk_size')
+        self.__compress_reports = kwargs.get('compress_reports', False)
 
         environment = 'development'
         deployment = 'primary'
@@ -28,20 +34,19 @@ class ReportSenderProcessor:  # pylint: disable=too-many-instance-attributes
 
     def _parse_and_validate_event(self, sqs_record) -> ReportGenerated:
         """Extract report generated data from SQS record"""
-        message_body = json.loads(sqs_record['body'])
-        event_detail = message_body.get('detail', {})
+        decoded = _EVENT_DECODER.decode(sqs_record)
 
-        try:
-            validated_event = ReportGenerated(**event_detail)
-            self.__log.debug("CloudEvent validation passed")
-            return validated_event
-        except ValidationError as e:
+        if decoded.error is not None:
             self.__log.error(
                 "CloudEvent validation failed",
-                validation_errors=str(e),
-                event_detail=event_detail
+                reason=decoded.error.reason,
+                event_type=decoded.error.event_type,
+                validation_errors=str(decoded.error.exception or decoded.error)
             )
-            raise
+            raise decoded.error.exception or decoded.error
+
+        self.__log.debug("CloudEvent validation passed")
+        return decoded.event
 
     def _extract_report_date_from_report_uri(self, report_uri) -> str:
         ignore_extension_characters = -4 # to skip .csv
@@ -63,24 +68,42 @@ class ReportSenderProcessor:  # pylint: disable=too-many-instance-attributes
         self.__log.info(f'Fetching sender details for sender ID: {sender_id}')
         reporting_mailbox = self.__sender_lookup.get_mesh_mailbox_reports_id_from_sender(sender_id)
 
-        self.__log.info(f'Fetching reporting URI : {report_uri} for sender ID: {sender_id}')
-        report_bytes = self.__reports_store.download_report(report_uri)
         report_date = self._extract_report_date_from_report_uri(report_uri)
         report_reference = str(uuid4())
 
-        self.__log.info(f'Sending MESH message to the sender: {sender_id} using mailbox: {reporting_mailbox} for date: {report_date} with reference: {report_reference}')
-
-        sent_mesh_message_id = self.__mesh_report_sender.send_report(
-            reporting_mailbox,
-            report_bytes,
-            report_date,
-            report_reference
-        )
+        sent_mesh_message_id = self._send_report(
+            sender_id, reporting_mailbox, report_uri, report_date, report_reference)
 
         self.__log.info(f'Publishing ReportEventSent for the sender: {sender_id} using mailbox: {reporting_mailbox} for date: {report_date}')
         self._publish_report_sent_event(sender_id, reporting_mailbox, report_reference, sent_mesh_message_id)
         self.__send_metric.record(1)
 
+    def _send_report(self, sender_id, reporting_mailbox, report_uri, report_date, report_reference):
+        """
+        Sends the report to MESH, streaming it from S3 in chunks when a chunk size
+        is set rather than reading it into memory
+        """
+        self.__log.info(f'Fetching reporting URI : {report_uri} for sender ID: {sender_id}')
+        if self.__streaming_chunk_size:
+            report = self.__reports_store.open_report(report_uri)
+        else:
+            report = self.__reports_store.download_report(report_uri)
+
+        self.__log.info(f'Sending MESH message to the sender: {sender_id} using mailbox: {reporting_mailbox} for date: {report_date} with reference: {report_reference}')
+
+        try:
+            return self.__mesh_report_sender.send_report(
+                reporting_mailbox,
+                report,
+                report_date,
+                report_reference,
+                max_chunk_size=self.__streaming_chunk_size,
+                compress=self.__compress_reports
+            )
+        finally:
+            if isinstance(report, dict):
+                report['Body'].close()
+
     def _publish_report_sent_event(self, sender_id, mesh_mailbox_reports_id, report_reference, sent_mesh_message_id):
         """
         Publishes a ReportSent event
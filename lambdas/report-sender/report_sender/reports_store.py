@@ -1,28 +1,98 @@
 """ Module for fetching reports from S3 """
 
 from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
 from .errors import ReportNotFoundError
 
 class ReportsStore:
-    """Class for fetching reports from S3"""
+    """
+    Class for fetching reports from S3
 
-    def __init__(self, s3_client):
+    When given a ReportCache, reports are kept on local disk after they are fetched.
+    A cached report is revalidated with a conditional get_object, which S3 answers
+    with 304 Not Modified and no body while the report is unchanged.
+    """
+
+    def __init__(self, s3_client, cache=None, hit_metric=None, miss_metric=None):
         self.__s3_client = s3_client
+        self.__cache = cache
+        self.__hit_metric = hit_metric
+        self.__miss_metric = miss_metric
 
     def download_report(self, s3_uri):
         """Download report from S3 given its URI is in format s3://<bucket>/<key> """
+        report = self.open_report(s3_uri)
+        try:
+            return report['Body'].read()
+        finally:
+            report['Body'].close()
+
+    def open_report(self, s3_uri):
+        """
+        Open report in S3 given its URI is in format s3://<bucket>/<key>, returning
+        the get_object response so that its Body can be streamed. The caller closes the Body.
+        """
         # Parse the S3 URI
         parsed_uri = urlparse(s3_uri)
         bucket = parsed_uri.netloc
         key = parsed_uri.path.lstrip('/')  # Remove leading slash from the path
 
+        if self.__cache is None:
+            return self.__get_object(bucket, key)
+
+        s3_response = None
+        etag = self.__cache.etag(bucket, key)
+        if etag is not None:
+            try:
+                s3_response = self.__get_object(bucket, key, IfNoneMatch=etag)
+            except ClientError as error:
+                if error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') != 304:
+                    raise
+
+                cached_report = self.__cache.open(bucket, key, etag)
+                if cached_report is not None:
+                    _record(self.__hit_metric)
+                    return cached_report
+
+        _record(self.__miss_metric)
+        if s3_response is None:
+            s3_response = self.__get_object(bucket, key)
+
+        return self.__cache_report(bucket, key, s3_response)
+
+    def __cache_report(self, bucket, key, s3_response):
+        """
+        Copies a report fetched from S3 into the cache, returning the cached copy. Reports
+        without an ETag, or too large for the cache, are returned as they are.
+        """
+        etag = s3_response.get('ETag')
+        if etag is None or s3_response.get('ContentLength', 0) > self.__cache.max_bytes:
+            return s3_response
+
+        try:
+            self.__cache.put(bucket, key, etag, s3_response['Body'])
+        finally:
+            s3_response['Body'].close()
+
+        cached_report = self.__cache.open(bucket, key, etag)
+        return cached_report if cached_report is not None else self.__get_object(bucket, key)
+
+    def __get_object(self, bucket, key, **kwargs):
         # Download the object
         s3_response = self.__s3_client.get_object(
             Bucket=bucket,
-            Key=key
+            Key=key,
+            **kwargs
         )
 
         if s3_response['ResponseMetadata']['HTTPStatusCode'] != 200:
             raise ReportNotFoundError(f"Failed to fetch report from S3: {s3_response}")
 
-        return s3_response['Body'].read()
+        return s3_response
+
+
+def _record(metric):
+    if metric is not None:
+        metric.record(1)
@@ -2,5 +2,6 @@
 Mock MESH client for testing
 """
 
+from .in_memory_s3 import InMemoryS3
 from .mesh_client import MockMeshClient
 from .mesh_message import MockMeshMessage, InvalidHeaderException
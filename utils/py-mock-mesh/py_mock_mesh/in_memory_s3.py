@@ -0,0 +1,122 @@
+"""
+In-memory stand-in for the S3 calls made by MockMeshClient and the lambdas' stores,
+for benchmarks that run without AWS
+"""
+
+import io
+import threading
+import time
+
+
+class InMemoryS3:
+    """
+    Thread-safe in-memory stand-in for S3, adding a fixed latency to each call to
+    approximate a network round trip. Uploaded bytes and parts are counted; with
+    keep_bodies=False uploads are only counted, so that large objects can be sent
+    without being held in memory.
+    """
+
+    class exceptions:  # pylint: disable=invalid-name,too-few-public-methods
+        """Exceptions raised by the stand-in"""
+
+        class NoSuchKey(Exception):
+            """Raised when an object does not exist"""
+
+            def __init__(self, key):
+                super().__init__(f'No such key {key}')
+                self.response = {'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}}
+
+    def __init__(self, latency_seconds=0, keep_bodies=True):
+        self.latency_seconds = latency_seconds
+        self.keep_bodies = keep_bodies
+        self.objects = {}
+        self.uploaded_bytes = 0
+        self.parts = 0
+        self.__uploads = {}
+        self.__lock = threading.Lock()
+
+    def __wait(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def __get(self, bucket, key):
+        with self.__lock:
+            if (bucket, key) not in self.objects:
+                raise self.exceptions.NoSuchKey(key)
+            return self.objects[(bucket, key)]
+
+    def __store(self, bucket, key, body, metadata):
+        with self.__lock:
+            self.uploaded_bytes += len(body)
+            self.parts += 1
+            self.objects[(bucket, key)] = (body if self.keep_bodies else b'', metadata or {})
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **_):  # pylint: disable=invalid-name
+        """Stores an object"""
+        self.__wait()
+        self.__store(Bucket, Key, Body, Metadata)
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def get_object(self, Bucket, Key, **_):  # pylint: disable=invalid-name
+        """Returns an object with its body as a stream"""
+        self.__wait()
+        body, metadata = self.__get(Bucket, Key)
+        return {
+            'Body': io.BytesIO(body),
+            'ContentLength': len(body),
+            'Metadata': metadata,
+            'ETag': 'etag',
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+
+    def head_object(self, Bucket, Key, **_):  # pylint: disable=invalid-name
+        """Returns an object's metadata"""
+        self.__wait()
+        body, metadata = self.__get(Bucket, Key)
+        return {'ContentLength': len(body), 'Metadata': metadata, 'ETag': 'etag'}
+
+    def delete_object(self, Bucket, Key, **_):  # pylint: disable=invalid-name
+        """Removes an object"""
+        self.__wait()
+        with self.__lock:
+            self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix, **_):  # pylint: disable=invalid-name
+        """Lists every object under a prefix in a single page"""
+        self.__wait()
+        with self.__lock:
+            keys = sorted(key for (bucket, key) in self.objects
+                          if bucket == Bucket and key.startswith(Prefix))
+        return {'Contents': [{'Key': key, 'ETag': 'etag'} for key in keys], 'IsTruncated': False}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None, **_):  # pylint: disable=invalid-name
+        """Starts a multipart upload"""
+        self.__wait()
+        with self.__lock:
+            upload_id = f'upload-{len(self.__uploads) + 1}'
+            self.__uploads[upload_id] = (Bucket, Key, Metadata, [])
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Body, PartNumber, UploadId, **_):  # pylint: disable=invalid-name
+        """Adds a part to a multipart upload"""
+        self.__wait()
+        with self.__lock:
+            self.uploaded_bytes += len(Body)
+            self.parts += 1
+            if self.keep_bodies:
+                self.__uploads[UploadId][3].append(Body)
+        return {'ETag': f'etag-{PartNumber}'}
+
+    def complete_multipart_upload(self, UploadId, **_):  # pylint: disable=invalid-name
+        """Stores the object made up of a multipart upload's parts"""
+        self.__wait()
+        with self.__lock:
+            bucket, key, metadata, parts = self.__uploads.pop(UploadId)
+            self.objects[(bucket, key)] = (b''.join(parts), metadata or {})
+        return {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def abort_multipart_upload(self, UploadId, **_):  # pylint: disable=invalid-name
+        """Discards a multipart upload"""
+        self.__wait()
+        with self.__lock:
+            self.__uploads.pop(UploadId, None)
@@ -2,10 +2,19 @@
 Module implementing a fake MESH mailbox using AWS S3
 """
 
+import gzip
 import io
 import uuid
+import zlib
+
 from .mesh_message import MockMeshMessage
 
+# S3 multipart uploads need parts of at least 5 MiB, other than the last
+MIN_UPLOAD_PART_BYTES = 5 * 1024 * 1024
+
+# Bytes read from the underlying stream at a time when compressing
+COMPRESS_READ_BYTES = 1024 * 1024
+
 
 class MockMeshClient:  # pylint: disable=too-many-arguments
     """
@@ -24,6 +33,29 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
         """
         Iterates over all available messages in a mailbox
         """
+        for s3_object in self.__iterate_inbox_objects():
+            yield MockMeshMessage(self.s3_client, self.s3_bucket, s3_object, self.__log)
+
+    def iterate_all_message_headers(self):
+        """
+        Iterates over header-only views of all available messages in a mailbox,
+        without opening the message bodies
+        """
+        for s3_object in self.__iterate_inbox_objects():
+            yield MockMeshMessage(
+                self.s3_client, self.s3_bucket, s3_object, self.__log, headers_only=True)
+
+    def iterate_message_ids(self):
+        """
+        Iterates over the IDs of all available messages in a mailbox
+        """
+        for s3_object in self.__iterate_inbox_objects():
+            yield s3_object['Key'].rsplit('/', 1)[-1]
+
+    def __iterate_inbox_objects(self):
+        """
+        Iterates over the S3 objects representing messages in the inbox
+        """
 
         response = self.s3_client.list_objects_v2(
             Bucket=self.s3_bucket,
@@ -38,7 +70,7 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
                 if message_count > 500:
                     return
 
-                yield MockMeshMessage(self.s3_client, self.s3_bucket, s3_object, self.__log)
+                yield s3_object
 
             # pagination
             has_objects = response['IsTruncated']
@@ -54,6 +86,18 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
         """
         Retrieves a specific message by ID from the inbox
         """
+        return self.__retrieve_message(message_id)
+
+    def retrieve_message_headers(self, message_id):
+        """
+        Retrieves a header-only view of a specific message by ID from the inbox
+        """
+        return self.__retrieve_message(message_id, headers_only=True)
+
+    def __retrieve_message(self, message_id, headers_only=False):
+        """
+        Retrieves a specific message by ID from the inbox, returning None if it is missing
+        """
         message_key = f"{self.inbox_prefix}{message_id}"
 
         try:
@@ -67,7 +111,8 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
                 'ETag': response['ETag']
             }
 
-            return MockMeshMessage(self.s3_client, self.s3_bucket, s3_object, self.__log)
+            return MockMeshMessage(
+                self.s3_client, self.s3_bucket, s3_object, self.__log, headers_only=headers_only)
 
         except self.s3_client.exceptions.NoSuchKey:
             self.__log.warning(f"Message {message_id} not found in inbox")
@@ -77,26 +122,95 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
                 f"Error retrieving message {message_id}: {str(e)}")
             return None
 
-    def send_message(self, recipient, data, **kwargs):
+    def acknowledge_message(self, message_id):
+        """
+        Acknowledges a specific message by ID, deleting it from the inbox
+        """
+        self.s3_client.delete_object(
+            Bucket=self.s3_bucket,
+            Key=f"{self.inbox_prefix}{message_id}"
+        )
+
+    def send_message(self, recipient, data, max_chunk_size=None, compress=None, **kwargs):
         """
         Sends a message to a mailbox. Returns a generated mesh_message_id.
+
+        Like MeshClient, data may be bytes, a file-like object or an S3 get_object
+        response; streams are uploaded in parts of max_chunk_size bytes rather
+        than read into memory. When compress is set the message is gzipped as it
+        is uploaded.
         """
 
         mesh_message_id = str(uuid.uuid4())
         message_key = f"{self.outbox_prefix}{recipient}/{mesh_message_id}"
 
-        output_buffer = io.StringIO()
-        output_buffer.write(data.decode('utf-8'))
-        output_buffer.seek(0)
+        if isinstance(data, bytes):
+            output_buffer = io.StringIO()
+            output_buffer.write(data.decode('utf-8'))
+            output_buffer.seek(0)
+            body = output_buffer.read().encode('utf8')
 
-        self.s3_client.put_object(
-            Bucket=self.s3_bucket,
-            Key=message_key,
-            Body=output_buffer.read().encode('utf8'),
-            Metadata=kwargs
-        )
+            self.s3_client.put_object(
+                Bucket=self.s3_bucket,
+                Key=message_key,
+                Body=gzip.compress(body) if compress else body,
+                Metadata=kwargs,
+                **({'ContentEncoding': 'gzip'} if compress else {})
+            )
+
+            return mesh_message_id
+
+        stream = data['Body'] if isinstance(data, dict) else data
+        extra_args = {'Metadata': kwargs}
+        if compress:
+            stream = GzipCompressingReader(stream)
+            extra_args['ContentEncoding'] = 'gzip'
+
+        self.__upload_stream(
+            stream, message_key, max(max_chunk_size or 0, MIN_UPLOAD_PART_BYTES), extra_args)
 
         return mesh_message_id
+
+    def __upload_stream(self, stream, message_key, part_size, extra_args):
+        """
+        Uploads a stream to S3 one part at a time, using a single put when it fits
+        in one part
+        """
+        part = stream.read(part_size)
+        next_part = stream.read(part_size) if len(part) == part_size else b''
+
+        if not next_part:
+            self.s3_client.put_object(
+                Bucket=self.s3_bucket, Key=message_key, Body=part, **extra_args)
+            return
+
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.s3_bucket, Key=message_key, **extra_args)['UploadId']
+
+        try:
+            parts = []
+            while part:
+                s3_response = self.s3_client.upload_part(
+                    Bucket=self.s3_bucket,
+                    Key=message_key,
+                    UploadId=upload_id,
+                    PartNumber=len(parts) + 1,
+                    Body=part
+                )
+                parts.append({'PartNumber': len(parts) + 1, 'ETag': s3_response['ETag']})
+                part, next_part = next_part, stream.read(part_size) if next_part else b''
+
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.s3_bucket,
+                Key=message_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.s3_bucket, Key=message_key, UploadId=upload_id)
+            raise
+
     def close(self):
         """
         Empty implementation
@@ -106,3 +220,35 @@ class MockMeshClient:  # pylint: disable=too-many-arguments
         """
         Empty implementation
         """
+
+
+class GzipCompressingReader:  # pylint: disable=too-few-public-methods
+    """
+    File-like reader that gzips another stream as it is read, holding no more
+    than one read of the underlying stream in memory
+    """
+
+    def __init__(self, stream):
+        self.__stream = stream
+        self.__compressor = zlib.compressobj(wbits=31)
+        self.__buffer = b''
+        self.__finished = False
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes of compressed data, or all of it when size is not given
+        """
+        while not self.__finished and (size is None or size < 0 or len(self.__buffer) < size):
+            chunk = self.__stream.read(COMPRESS_READ_BYTES)
+            if chunk:
+                self.__buffer += self.__compressor.compress(chunk)
+            else:
+                self.__buffer += self.__compressor.flush()
+                self.__finished = True
+
+        if size is None or size < 0:
+            data, self.__buffer = self.__buffer, b''
+        else:
+            data, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+
+        return data
@@ -34,23 +34,32 @@ class MockMeshMessage():  # pylint: disable=too-many-instance-attributes
     Represents an S3-backed MESH Message
     """
 
-    def __init__(self, s3_client, s3_bucket, s3_object, log):
+    def __init__(self, s3_client, s3_bucket, s3_object, log,  # pylint: disable=too-many-arguments
+                 headers_only=False):
         self.subject = None
         self.sender = None
         self.local_id = None
         self.__log = log
         self.headers = {}
 
-        s3_response = s3_client.get_object(
-            Bucket=s3_bucket,
-            Key=s3_object['Key'],
-            IfMatch=s3_object['ETag']
-        )
-
-        self.__log.info(f"Read S3 object {s3_object['Key']}")
+        if headers_only:
+            # Only the object metadata is needed, so the body is never opened
+            s3_response = s3_client.head_object(
+                Bucket=s3_bucket,
+                Key=s3_object['Key'],
+                IfMatch=s3_object['ETag']
+            )
+        else:
+            s3_response = s3_client.get_object(
+                Bucket=s3_bucket,
+                Key=s3_object['Key'],
+                IfMatch=s3_object['ETag']
+            )
+
+        self.__log.debug(f"Read S3 object {s3_object['Key']}")
 
         for header_key, header_value in s3_response['Metadata'].items():
-            self.__log.info(
+            self.__log.debug(
                 f"Read header key {header_key}, value {header_value}")
 
             self.headers[header_key] = header_value
@@ -60,7 +69,7 @@ class MockMeshMessage():  # pylint: disable=too-many-instance-attributes
 
             setattr(self, header_key, header_value)
 
-        self.full_body = s3_response['Body']
+        self.full_body = s3_response.get('Body')
 
         self._msg_id = s3_object['Key'].rsplit('/', 2)[-1]
         self._s3_client = s3_client
@@ -71,6 +80,9 @@ class MockMeshMessage():  # pylint: disable=too-many-instance-attributes
         """
         Reads bytes from the message
         """
+        if self.full_body is None:
+            raise ValueError(f"Message {self._msg_id} was retrieved without its body")
+
         return self.full_body.read(byte_count)
 
     def id(self):  # pylint: disable=invalid-name
@@ -91,7 +103,7 @@ class MockMeshMessage():  # pylint: disable=too-many-instance-attributes
             f"MockMeshMessage<id:{self.id()},"
             f"sender:{self.sender},"
             f"subject:{self.subject},"
-            f"position:{self.full_body.tell()}>"
+            f"position:{self.full_body.tell() if self.full_body else None}>"
         )
 
     def acknowledge(self):
@@ -9,6 +9,7 @@ from .failure_codes import get_failure_code_description
 
 from .mesh_config import (
     BaseMeshConfig,
+    MeshMailboxConfig,
     InvalidMeshEndpointError,
     InvalidEnvironmentVariableError,
 )
@@ -23,11 +24,49 @@ from .certificate_monitor import (
     CertificateExpiryMonitor,
     report_expiry_time
 )
+from .document_codec import (
+    DecodingReader,
+    DocumentCodec,
+    UnsupportedCodecError,
+    codec_for_object,
+    get_codec,
+    read_document
+)
+from .inbox_scan import (
+    is_in_shard,
+    message_id_timestamp,
+    oldest_message_age_seconds,
+    resume_order
+)
+from .mesh_message_headers import (
+    MeshMessageHeaders,
+    iterate_all_message_headers,
+    retrieve_message_headers
+)
+from .record_decoder import (
+    DecodedRecord,
+    RecordDecodeError,
+    RecordDecoder
+)
+from .sqs_batch import (
+    DEFAULT_MINIMUM_REMAINING_MILLIS,
+    SqsBatchResult,
+    SqsBatchRunner,
+    map_concurrently
+)
+from .time_budget import TimeBudget
+from .ttl_store import (
+    InMemoryTtlStore,
+    S3TtlStore,
+    TieredTtlStore,
+    build_ttl_store
+)
 
 __all__ = [
     'EventPublisher',
     'get_failure_code_description',
     'BaseMeshConfig',
+    'MeshMailboxConfig',
     'InvalidMeshEndpointError',
     'InvalidEnvironmentVariableError',
     'store_file',
@@ -36,4 +75,29 @@ __all__ = [
     'Metric',
     'CertificateExpiryMonitor',
     'report_expiry_time',
+    'DecodingReader',
+    'DocumentCodec',
+    'UnsupportedCodecError',
+    'codec_for_object',
+    'get_codec',
+    'read_document',
+    'is_in_shard',
+    'message_id_timestamp',
+    'oldest_message_age_seconds',
+    'resume_order',
+    'MeshMessageHeaders',
+    'iterate_all_message_headers',
+    'retrieve_message_headers',
+    'DecodedRecord',
+    'RecordDecodeError',
+    'RecordDecoder',
+    'DEFAULT_MINIMUM_REMAINING_MILLIS',
+    'SqsBatchResult',
+    'SqsBatchRunner',
+    'map_concurrently',
+    'TimeBudget',
+    'InMemoryTtlStore',
+    'S3TtlStore',
+    'TieredTtlStore',
+    'build_ttl_store',
 ]
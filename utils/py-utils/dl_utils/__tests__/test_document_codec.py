@@ -0,0 +1,118 @@
+"""
+Tests for stored document compression
+"""
+import gzip
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+from dl_utils.document_codec import (
+    CODEC_METADATA_KEY,
+    DecodingReader,
+    UnsupportedCodecError,
+    codec_for_object,
+    get_codec,
+    read_document,
+)
+
+DOCUMENT = json.dumps({
+    'resourceType': 'DocumentReference',
+    'status': 'current',
+    'content': [{'attachment': {'contentType': 'application/pdf', 'data': 'JVBERi0xLjQK' * 200}}]
+}).encode('utf-8')
+
+
+class TestGetCodec:
+    """Test suite for choosing a codec"""
+
+    @pytest.mark.parametrize('name', [None, '', 'none', 'NONE'])
+    def test_no_codec_stores_uncompressed(self, name):
+        """No codec is used when none is named"""
+        assert get_codec(name) is None
+
+    def test_gzip_codec(self):
+        """The gzip codec sets its content encoding and metadata marker"""
+        codec = get_codec('GZIP')
+
+        assert codec.name == 'gzip'
+        assert codec.content_encoding == 'gzip'
+        assert codec.metadata == {CODEC_METADATA_KEY: 'gzip'}
+
+    def test_unknown_codec_raises(self):
+        """An unknown codec is a configuration error"""
+        with pytest.raises(UnsupportedCodecError, match='brotli'):
+            get_codec('brotli')
+
+
+class TestDocumentCodec:
+    """Test suite for compressing and decompressing documents"""
+
+    def test_gzip_round_trip(self):
+        """A compressed document is smaller, standard gzip, and decompresses to the original"""
+        codec = get_codec('gzip')
+
+        compressed = codec.compress(DOCUMENT)
+
+        assert len(compressed) < len(DOCUMENT)
+        assert gzip.decompress(compressed) == DOCUMENT
+        assert codec.decompress(compressed) == DOCUMENT
+
+    def test_incremental_compression_matches_document(self):
+        """Compressing a document in chunks gives a stream that decodes to the whole document"""
+        codec = get_codec('gzip')
+        compressor = codec.compressor()
+
+        compressed = b''.join(
+            compressor.compress(DOCUMENT[i:i + 100]) for i in range(0, len(DOCUMENT), 100)
+        ) + compressor.flush()
+
+        assert codec.decompress(compressed) == DOCUMENT
+
+    def test_zstd_round_trip(self):
+        """The zstd codec round trips when zstandard is installed"""
+        pytest.importorskip('zstandard')
+        codec = get_codec('zstd')
+
+        assert codec.decompress(codec.compress(DOCUMENT)) == DOCUMENT
+
+
+class TestDecodingReader:
+    """Test suite for reading stored documents"""
+
+    def test_reads_compressed_document_in_pieces(self):
+        """A compressed body is decoded as it is read"""
+        codec = get_codec('gzip')
+        reader = DecodingReader(io.BytesIO(codec.compress(DOCUMENT)), codec, read_size=32)
+
+        pieces = list(iter(lambda: reader.read(50), b''))
+
+        assert all(len(piece) <= 50 for piece in pieces)
+        assert b''.join(pieces) == DOCUMENT
+
+    def test_reads_uncompressed_document(self):
+        """A body without a codec is read as is"""
+        reader = DecodingReader(io.BytesIO(DOCUMENT))
+
+        assert reader.read() == DOCUMENT
+
+    def test_codec_for_object_uses_metadata_marker(self):
+        """The codec is taken from the object's metadata"""
+        assert codec_for_object({'Metadata': {CODEC_METADATA_KEY: 'gzip'}}).name == 'gzip'
+        assert codec_for_object({'Metadata': {}}) is None
+        assert codec_for_object({}) is None
+
+    def test_read_document_decodes_stored_document(self):
+        """read_document fetches a document and decodes it using its metadata"""
+        codec = get_codec('gzip')
+        s3_client = Mock()
+        s3_client.get_object.return_value = {
+            'Body': io.BytesIO(codec.compress(DOCUMENT)),
+            'ContentEncoding': 'gzip',
+            'Metadata': codec.metadata
+        }
+
+        reader = read_document(s3_client, 'bucket', 'document-reference/key')
+
+        assert reader.read() == DOCUMENT
+        s3_client.get_object.assert_called_once_with(Bucket='bucket', Key='document-reference/key')
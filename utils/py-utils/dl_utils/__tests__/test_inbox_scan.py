@@ -0,0 +1,87 @@
+"""
+Tests for resumable inbox scanning helpers
+"""
+from datetime import datetime, timezone
+
+from dl_utils.inbox_scan import (
+    is_in_shard,
+    message_id_timestamp,
+    oldest_message_age_seconds,
+    resume_order,
+)
+
+MESSAGE_IDS = [
+    '20250101090000000000_000001',
+    '20250101100000000000_000002',
+    '20250101110000000000_000003',
+    '20250101120000000000_000004',
+]
+
+
+class TestResumeOrder:
+    """Test suite for resume_order"""
+
+    def test_without_checkpoint_keeps_inbox_order(self):
+        assert resume_order(MESSAGE_IDS) == MESSAGE_IDS
+
+    def test_resumes_after_checkpoint_and_wraps_around(self):
+        assert resume_order(MESSAGE_IDS, MESSAGE_IDS[1]) == [
+            MESSAGE_IDS[2], MESSAGE_IDS[3], MESSAGE_IDS[0], MESSAGE_IDS[1]]
+
+    def test_checkpoint_at_end_of_inbox_wraps_to_start(self):
+        assert resume_order(MESSAGE_IDS, MESSAGE_IDS[3]) == MESSAGE_IDS
+
+    def test_resumes_after_checkpoint_no_longer_in_inbox(self):
+        assert resume_order(MESSAGE_IDS, '20250101103000000000_000009') == [
+            MESSAGE_IDS[2], MESSAGE_IDS[3], MESSAGE_IDS[0], MESSAGE_IDS[1]]
+
+    def test_missing_checkpoint_after_all_messages_starts_from_beginning(self):
+        assert resume_order(MESSAGE_IDS, '20260101000000000000_000009') == MESSAGE_IDS
+
+    def test_empty_inbox(self):
+        assert resume_order([], MESSAGE_IDS[0]) == []
+
+
+class TestIsInShard:
+    """Test suite for is_in_shard"""
+
+    def test_single_shard_contains_every_message(self):
+        assert all(is_in_shard(message_id, 0, 1) for message_id in MESSAGE_IDS)
+
+    def test_each_message_belongs_to_exactly_one_shard(self):
+        message_ids = [f'20250101090000000000_{i:06d}' for i in range(200)]
+
+        for message_id in message_ids:
+            shards = [index for index in range(4) if is_in_shard(message_id, index, 4)]
+            assert len(shards) == 1
+
+    def test_messages_are_spread_across_shards(self):
+        message_ids = [f'20250101090000000000_{i:06d}' for i in range(400)]
+
+        for index in range(4):
+            shard_size = sum(is_in_shard(message_id, index, 4) for message_id in message_ids)
+            assert 50 < shard_size < 150
+
+
+class TestMessageIdTimestamp:
+    """Test suite for message_id_timestamp"""
+
+    def test_parses_timestamp_from_mesh_message_id(self):
+        assert message_id_timestamp('20200529155357895317_3573F8') == datetime(
+            2020, 5, 29, 15, 53, 57, 895317, tzinfo=timezone.utc)
+
+    def test_returns_none_for_id_without_timestamp(self):
+        assert message_id_timestamp('3f1f4b8e-1d2c-4a9b-9c55-6f0d7f1f2a3b') is None
+
+
+class TestOldestMessageAgeSeconds:
+    """Test suite for oldest_message_age_seconds"""
+
+    def test_returns_age_of_oldest_message(self):
+        now = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+        assert oldest_message_age_seconds(MESSAGE_IDS, now=now) == 3 * 60 * 60
+
+    def test_returns_none_without_timestamps(self):
+        assert oldest_message_age_seconds(['not-a-mesh-id']) is None
+        assert oldest_message_age_seconds([]) is None
@@ -27,3 +27,96 @@ class TestLogConfig:
             assert log_output["test_key"] == "test_value"
         except json.JSONDecodeError:
             pytest.fail("Log output should be valid JSON")
+
+
+@pytest.fixture(name='reset_logging')
+def reset_logging_fixture():
+    """Restore the default logging configuration after each test"""
+    yield
+    log_config.configure_logging(level='INFO', sample_rate=1.0)
+
+
+class TestLogLevelFiltering:
+    def test_debug_is_dropped_at_info_level(self, capsys, reset_logging):
+        """Debug lines are not rendered when the minimum level is INFO"""
+        log_config.configure_logging(level='INFO', sample_rate=1.0)
+        test_log = structlog.get_logger()
+
+        test_log.debug("debug_event")
+        test_log.info("info_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["info_event"]
+
+    def test_level_is_read_from_environment(self, capsys, reset_logging, monkeypatch):
+        """LOG_LEVEL controls the minimum level"""
+        monkeypatch.setenv("LOG_LEVEL", "error")
+        monkeypatch.delenv("LOG_SAMPLE_RATE", raising=False)
+        log_config.configure_logging()
+        test_log = structlog.get_logger()
+
+        test_log.warning("warning_event")
+        test_log.error("error_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["error_event"]
+
+    def test_invalid_level_falls_back_to_info(self, capsys, reset_logging):
+        """An unrecognised level name falls back to INFO"""
+        log_config.configure_logging(level='NOT_A_LEVEL', sample_rate=1.0)
+        test_log = structlog.get_logger()
+
+        test_log.debug("debug_event")
+        test_log.info("info_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["info_event"]
+
+
+class TestMessageSampling:
+    def test_sampling_is_deterministic_per_message(self):
+        """The same message ID always gets the same decision"""
+        decisions = {log_config.is_sampled("msg-123", 0.5) for _ in range(10)}
+        assert len(decisions) == 1
+
+    def test_sample_rate_bounds(self):
+        """A rate of 1 keeps everything and a rate of 0 keeps nothing"""
+        assert log_config.is_sampled("msg-123", 1.0)
+        assert not log_config.is_sampled("msg-123", 0.0)
+
+    def test_sample_rate_keeps_roughly_expected_share(self):
+        """Roughly the configured share of message IDs is kept"""
+        kept = sum(log_config.is_sampled(f"msg-{i}", 0.25) for i in range(10000))
+        assert 2000 < kept < 3000
+
+    def test_info_lines_for_unsampled_message_are_dropped(self, capsys, reset_logging):
+        """Info lines bound to a message ID are dropped when sampled out"""
+        log_config.configure_logging(level='INFO', sample_rate=0.0)
+        test_log = structlog.get_logger()
+
+        test_log.bind(message_id="msg-1").info("per_message_event")
+        test_log.info("summary_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["summary_event"]
+
+    def test_warnings_and_errors_are_always_kept(self, capsys, reset_logging):
+        """Warnings and errors are never sampled out"""
+        log_config.configure_logging(level='INFO', sample_rate=0.0)
+        test_log = structlog.get_logger().bind(mesh_message_id="msg-1")
+
+        test_log.warning("warning_event")
+        test_log.error("error_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["warning_event", "error_event"]
+
+    def test_invalid_sample_rate_disables_sampling(self, capsys, reset_logging):
+        """An unparseable sample rate keeps every line"""
+        log_config.configure_logging(level='INFO', sample_rate='lots')
+        test_log = structlog.get_logger()
+
+        test_log.bind(message_id="msg-1").info("per_message_event")
+
+        lines = capsys.readouterr().out.strip().splitlines()
+        assert [json.loads(line)["event"] for line in lines] == ["per_message_event"]
@@ -3,6 +3,7 @@ import os
 from unittest.mock import Mock, patch, MagicMock
 from dl_utils.mesh_config import (
     BaseMeshConfig,
+    MeshMailboxConfig,
     InvalidMeshEndpointError,
     InvalidEnvironmentVariableError
 )
@@ -88,6 +89,25 @@ class TestBaseMeshConfig:
             config = TestConfig(ssm=mock_ssm, s3_client=mock_s3)
             assert config.use_mesh_mock is False
 
+    def test_optional_boolean_env_vars_in_subclass(self, mock_ssm, mock_s3, env_vars):
+        """Test that subclasses can declare additional boolean environment variables"""
+
+        class TestConfig(BaseMeshConfig):
+            _REQUIRED_ENV_VAR_MAP = {}
+            _OPTIONAL_ENV_VAR_MAP = {
+                **BaseMeshConfig._OPTIONAL_ENV_VAR_MAP,
+                'some_flag': 'SOME_FLAG',
+                'some_value': 'SOME_VALUE',
+            }
+            _BOOLEAN_ENV_VARS = {*BaseMeshConfig._BOOLEAN_ENV_VARS, 'some_flag'}
+
+        env_with_flags = {**env_vars, 'SOME_FLAG': 'yes', 'SOME_VALUE': 'yes'}
+
+        with patch.dict(os.environ, env_with_flags, clear=True):
+            config = TestConfig(ssm=mock_ssm, s3_client=mock_s3)
+            assert config.some_flag is True
+            assert config.some_value == 'yes'
+
     @patch('dl_utils.mesh_config.mesh_client')
     def test_lookup_endpoint_valid(self, mock_mesh_client, mock_ssm, mock_s3):
         """Test lookup_endpoint with valid endpoint"""
@@ -132,3 +152,34 @@ class TestBaseMeshConfig:
             config.lookup_endpoint('INVALID')
 
         assert 'mesh_client module has no such endpoint INVALID_ENDPOINT' in str(exc_info.value)
+
+
+class TestMeshMailboxConfig:
+    """Test suite for MeshMailboxConfig class"""
+
+    def test_loads_mailbox_from_its_own_prefix_with_parent_settings(self):
+        """Test that an additional mailbox is loaded from its own SSM prefix"""
+        ssm = Mock()
+        ssm.get_parameter.return_value = {
+            'Parameter': {
+                'Value': '{"mesh_endpoint": "https://mock.endpoint", '
+                         '"mesh_mailbox": "second_mailbox", '
+                         '"mesh_mailbox_password": "password", "mesh_shared_key": "key"}'
+            }
+        }
+        parent_config = Mock()
+        parent_config.ssm = ssm
+        parent_config.s3_client = Mock()
+        parent_config.environment = 'test'
+        parent_config.use_mesh_mock = True
+
+        with patch.dict(os.environ, {}, clear=True), \
+                patch('dl_utils.mesh_config.MockMeshClient') as mock_mesh_client_class, \
+                patch('dl_utils.mesh_config.store_file', return_value=None):
+            with MeshMailboxConfig(parent_config, '/test/mesh/second') as config:
+                assert config.mesh_mailbox == 'second_mailbox'
+                assert config.environment == 'test'
+                assert config.mesh_client == mock_mesh_client_class.return_value
+
+        ssm.get_parameter.assert_any_call(Name='/test/mesh/second/config', WithDecryption=True)
+        mock_mesh_client_class.return_value.close.assert_called_once()
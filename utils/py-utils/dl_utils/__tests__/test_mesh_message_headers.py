@@ -0,0 +1,96 @@
+"""
+Tests for header-only MESH message access
+"""
+from unittest.mock import Mock
+
+from mesh_client import MeshClient
+from requests.structures import CaseInsensitiveDict
+from dl_utils.mesh_message_headers import (
+    MeshMessageHeaders,
+    iterate_all_message_headers,
+    retrieve_message_headers,
+)
+
+
+def create_response(headers):
+    """Create a mock streamed MESH response"""
+    response = Mock()
+    response.headers = CaseInsensitiveDict(headers)
+    return response
+
+
+class TestRetrieveMessageHeaders:
+    """Test suite for retrieve_message_headers"""
+
+    def test_reads_headers_and_closes_response_without_reading_body(self):
+        mesh_client = Mock(spec=MeshClient)
+        response = create_response({
+            'Mex-From': 'SENDER_MAILBOX',
+            'Mex-LocalID': 'ref-001',
+            'mex-workflowid': 'NHS_NOTIFY_SEND_REQUEST',
+            'Mex-Subject': 'subject',
+            'Mex-MessageType': 'DATA',
+        })
+        mesh_client.retrieve_message_chunk.return_value = response
+
+        message = retrieve_message_headers(mesh_client, 'msg-1')
+
+        mesh_client.retrieve_message_chunk.assert_called_once_with('msg-1', 1)
+        response.close.assert_called_once()
+        response.raw.read.assert_not_called()
+        assert message.id() == 'msg-1'
+        assert message.sender == 'SENDER_MAILBOX'
+        assert message.local_id == 'ref-001'
+        assert message.workflow_id == 'NHS_NOTIFY_SEND_REQUEST'
+        assert message.subject == 'subject'
+        assert message.message_type == 'DATA'
+
+    def test_missing_headers_are_none(self):
+        mesh_client = Mock(spec=MeshClient)
+        mesh_client.retrieve_message_chunk.return_value = create_response({})
+
+        message = retrieve_message_headers(mesh_client, 'msg-1')
+
+        assert message.local_id is None
+        assert message.sender is None
+
+    def test_uses_client_header_retrieval_when_available(self):
+        mesh_client = Mock(spec=['retrieve_message_headers', 'retrieve_message_chunk'])
+
+        message = retrieve_message_headers(mesh_client, 'msg-1')
+
+        assert message == mesh_client.retrieve_message_headers.return_value
+        mesh_client.retrieve_message_headers.assert_called_once_with('msg-1')
+        mesh_client.retrieve_message_chunk.assert_not_called()
+
+
+class TestMeshMessageHeaders:
+    """Test suite for MeshMessageHeaders"""
+
+    def test_acknowledge_uses_client(self):
+        mesh_client = Mock()
+        message = MeshMessageHeaders('msg-1', {}, mesh_client)
+
+        message.acknowledge()
+
+        mesh_client.acknowledge_message.assert_called_once_with('msg-1')
+
+
+class TestIterateAllMessageHeaders:
+    """Test suite for iterate_all_message_headers"""
+
+    def test_uses_message_ids_for_real_client(self):
+        mesh_client = Mock(spec=['iterate_message_ids', 'retrieve_message_chunk'])
+        mesh_client.iterate_message_ids.return_value = iter(['msg-1', 'msg-2'])
+        mesh_client.retrieve_message_chunk.side_effect = lambda *_: create_response({})
+
+        messages = list(iterate_all_message_headers(mesh_client))
+
+        assert [message.id() for message in messages] == ['msg-1', 'msg-2']
+
+    def test_uses_client_header_listing_when_available(self):
+        mesh_client = Mock()
+        mesh_client.iterate_all_message_headers.return_value = iter(['header-1'])
+
+        assert list(iterate_all_message_headers(mesh_client)) == ['header-1']
+        mesh_client.iterate_message_ids.assert_not_called()
@@ -0,0 +1,155 @@
+"""
+Tests for RecordDecoder
+"""
+import json
+
+import pytest
+from pydantic import BaseModel, ValidationError
+from dl_utils.record_decoder import (
+    INVALID_EVENT,
+    INVALID_JSON,
+    MISSING_BODY,
+    MISSING_DETAIL,
+    UNKNOWN_EVENT_TYPE,
+    RecordDecoder,
+)
+
+RECEIVED_TYPE = 'uk.nhs.notify.digital.letters.example.received.v1'
+INVALID_TYPE = 'uk.nhs.notify.digital.letters.example.invalid.v1'
+
+
+class ReceivedData(BaseModel):
+    """Data of the example received event"""
+    messageId: str
+
+
+class InvalidData(BaseModel):
+    """Data of the example invalid event"""
+    messageId: str
+    failureCode: str
+
+
+class ReceivedEvent(BaseModel):
+    """Example received event"""
+    id: str
+    type: str
+    data: ReceivedData
+
+
+class InvalidEvent(BaseModel):
+    """Example invalid event"""
+    id: str
+    type: str
+    data: InvalidData
+
+
+def make_record(detail, message_id='sqs-1'):
+    """Build an SQS record carrying an EventBridge envelope"""
+    return {
+        'messageId': message_id,
+        'eventSource': 'aws:sqs',
+        'body': json.dumps({'version': '0', 'detail-type': 'example', 'detail': detail})
+    }
+
+
+def received_detail():
+    """Detail of a valid received event"""
+    return {'id': 'event-1', 'type': RECEIVED_TYPE, 'data': {'messageId': 'mesh-1'}}
+
+
+def invalid_detail():
+    """Detail of a valid invalid event"""
+    return {
+        'id': 'event-2',
+        'type': INVALID_TYPE,
+        'data': {'messageId': 'mesh-2', 'failureCode': 'DL_CLIV_005'}
+    }
+
+
+@pytest.fixture(name='decoder')
+def create_decoder():
+    """Decoder registering both example events"""
+    return RecordDecoder({RECEIVED_TYPE: ReceivedEvent, INVALID_TYPE: InvalidEvent})
+
+
+class TestRecordDecoder:
+    """Test suite for RecordDecoder"""
+
+    def test_dispatches_on_event_type(self, decoder):
+        """Each record is validated against the model registered for its type"""
+        received, invalid = decoder.decode_batch(
+            [make_record(received_detail()), make_record(invalid_detail(), 'sqs-2')])
+
+        assert isinstance(received.event, ReceivedEvent)
+        assert received.error is None
+        assert received.message_id == 'sqs-1'
+        assert isinstance(invalid.event, InvalidEvent)
+        assert invalid.event.data.failureCode == 'DL_CLIV_005'
+        assert invalid.event_type == INVALID_TYPE
+
+    def test_single_model(self):
+        """A decoder with one model decodes events of that type"""
+        decoded = RecordDecoder({RECEIVED_TYPE: ReceivedEvent}).decode(make_record(received_detail()))
+
+        assert decoded.event == ReceivedEvent(**received_detail())
+
+    @pytest.mark.parametrize('models', [
+        {RECEIVED_TYPE: ReceivedEvent},
+        {RECEIVED_TYPE: ReceivedEvent, INVALID_TYPE: InvalidEvent},
+    ])
+    def test_unknown_event_type(self, models):
+        """Events of an unregistered type are reported as unknown"""
+        detail = {**received_detail(), 'type': 'uk.nhs.notify.other.v1'}
+
+        decoded = RecordDecoder(models).decode(make_record(detail))
+
+        assert decoded.event is None
+        assert decoded.error.reason == UNKNOWN_EVENT_TYPE
+        assert decoded.event_type == 'uk.nhs.notify.other.v1'
+        assert str(decoded.error) == "Unknown event type: 'uk.nhs.notify.other.v1'"
+
+    def test_missing_event_type(self, decoder):
+        """Events without a type are reported as unknown"""
+        detail = received_detail()
+        del detail['type']
+
+        decoded = decoder.decode(make_record(detail))
+
+        assert decoded.error.reason == UNKNOWN_EVENT_TYPE
+        assert decoded.event_type is None
+
+    def test_invalid_event(self, decoder):
+        """Validation failures keep the type and Pydantic's errors"""
+        detail = {**invalid_detail(), 'data': {'messageId': 'mesh-2'}}
+
+        decoded = decoder.decode(make_record(detail))
+
+        assert decoded.error.reason == INVALID_EVENT
+        assert decoded.event_type == INVALID_TYPE
+        assert isinstance(decoded.error.exception, ValidationError)
+        assert [error['loc'][-1] for error in decoded.error.errors] == ['failureCode']
+
+    def test_invalid_json(self, decoder):
+        """Bodies that are not JSON are reported as such"""
+        decoded = decoder.decode({'messageId': 'sqs-1', 'body': 'invalid json'})
+
+        assert decoded.error.reason == INVALID_JSON
+        assert decoded.event_type is None
+
+    def test_missing_detail(self, decoder):
+        """Envelopes without detail are reported as such"""
+        decoded = decoder.decode({'messageId': 'sqs-1', 'body': json.dumps({})})
+
+        assert decoded.error.reason == MISSING_DETAIL
+
+    @pytest.mark.parametrize('record', [{'messageId': 'sqs-1'}, {'body': None}, None])
+    def test_missing_body(self, decoder, record):
+        """Records without a body are reported as such"""
+        decoded = decoder.decode(record)
+
+        assert decoded.error.reason == MISSING_BODY
+
+    def test_requires_a_model(self):
+        """A decoder needs at least one model"""
+        with pytest.raises(ValueError):
+            RecordDecoder({})
@@ -0,0 +1,140 @@
+"""
+Tests for SqsBatchRunner
+"""
+import json
+from unittest.mock import Mock
+
+import pytest
+from dl_utils.sqs_batch import SqsBatchRunner
+
+
+def make_records(count, event_source='aws:sqs'):
+    """Build SQS records"""
+    return [
+        {'messageId': f'msg-{index}', 'eventSource': event_source, 'body': '{}'}
+        for index in range(count)
+    ]
+
+
+class FakeClock:
+    """Remaining time that falls as records are processed"""
+
+    def __init__(self, remaining_millis):
+        self.remaining_millis = remaining_millis
+
+    def __call__(self):
+        return self.remaining_millis
+
+
+class TestSqsBatchRunner:
+    """Test suite for SqsBatchRunner"""
+
+    def test_counts_outcomes(self):
+        """Each record's outcome is counted, and failures are released for retry"""
+        runner = SqsBatchRunner(Mock(), outcomes=('sent', 'skipped'))
+        outcomes = iter(['sent', RuntimeError('boom'), 'skipped'])
+
+        def process(_record):
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        result = runner.run(make_records(3), process)
+
+        assert result.counts == {
+            'retrieved': 3, 'sent': 1, 'skipped': 1, 'failed': 1, 'unstarted': 0
+        }
+        assert result.response() == {"batchItemFailures": [{"itemIdentifier": "msg-1"}]}
+
+    def test_skips_non_sqs_records(self):
+        """Records from other sources are counted as retrieved but not processed"""
+        process = Mock(return_value='sent')
+
+        result = SqsBatchRunner(Mock(), outcomes=('sent',)).run(
+            make_records(2, event_source='aws:s3'), process)
+
+        process.assert_not_called()
+        assert result.counts['retrieved'] == 2
+        assert result.batch_item_failures == []
+
+    def test_releases_records_not_started_in_time(self):
+        """Once the reserve is reached, the remaining records are returned unprocessed"""
+        clock = FakeClock(10000)
+        processed = []
+
+        def process(record):
+            processed.append(record['messageId'])
+            clock.remaining_millis -= 4000
+            return 'sent'
+
+        runner = SqsBatchRunner(
+            Mock(), outcomes=('sent',),
+            get_remaining_time_in_millis=clock, minimum_remaining_millis=2000)
+
+        result = runner.run(make_records(5), process)
+
+        assert processed == ['msg-0', 'msg-1']
+        assert result.counts['sent'] == 2
+        assert result.counts['unstarted'] == 3
+        assert result.batch_item_failures == [
+            {"itemIdentifier": "msg-2"},
+            {"itemIdentifier": "msg-3"},
+            {"itemIdentifier": "msg-4"},
+        ]
+
+    def test_without_remaining_time_processes_everything(self):
+        """Without a way to read the remaining time every record is started"""
+        result = SqsBatchRunner(Mock(), outcomes=('sent',)).run(
+            make_records(3), lambda _record: 'sent')
+
+        assert result.counts['sent'] == 3
+
+    def test_uses_given_mapping(self):
+        """Records can be processed by another mapping, such as a thread pool"""
+        mapped = []
+
+        def map_records(function, records):
+            mapped.extend(records)
+            return [function(record) for record in reversed(records)][::-1]
+
+        result = SqsBatchRunner(Mock(), outcomes=('sent',)).run(
+            make_records(2), lambda _record: 'sent', map_records=map_records)
+
+        assert len(mapped) == 2
+        assert result.counts['sent'] == 2
+
+    def test_on_complete_can_fail_records_before_metrics(self, capsys):
+        """Work deferred to the end of the batch can fail records that were processed"""
+        runner = SqsBatchRunner(Mock(), outcomes=('sent',), metric_namespace='dl-test')
+
+        result = runner.run(
+            make_records(2), lambda _record: 'sent',
+            on_complete=lambda result: result.fail('msg-1', 'sent'))
+
+        assert result.counts['sent'] == 1
+        assert result.counts['failed'] == 1
+        assert result.batch_item_failures == [{"itemIdentifier": "msg-1"}]
+        metrics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {metric['Outcome']: metric['sqs-batch-records'] for metric in metrics}['failed'] == 1
+
+    def test_records_metric_per_outcome(self, capsys):
+        """A count of every outcome is emitted, including outcomes that did not occur"""
+        runner = SqsBatchRunner(
+            Mock(), outcomes=('sent',), metric_namespace='dl-test',
+            dimensions={'Environment': 'test'})
+
+        runner.run(make_records(1), lambda _record: 'sent')
+
+        metrics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        counts = {metric['Outcome']: metric['sqs-batch-records'] for metric in metrics}
+        assert counts == {'retrieved': 1, 'sent': 1, 'failed': 0, 'unstarted': 0}
+        assert metrics[0]['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'dl-test'
+        assert metrics[0]['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Environment', 'Outcome']]
+
+    @pytest.mark.parametrize('namespace', [None, ''])
+    def test_no_metrics_without_namespace(self, capsys, namespace):
+        """Metrics are only emitted when a namespace is set"""
+        SqsBatchRunner(Mock(), metric_namespace=namespace).run(make_records(1), lambda _record: 'sent')
+
+        assert capsys.readouterr().out == ''
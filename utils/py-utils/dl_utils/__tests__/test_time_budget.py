@@ -0,0 +1,82 @@
+"""
+Tests for TimeBudget
+"""
+from unittest.mock import patch
+
+import pytest
+
+from dl_utils.time_budget import TimeBudget
+
+
+class TestTimeBudget:
+    """Test suite for TimeBudget"""
+
+    def test_without_samples_behaves_like_fixed_reserve(self):
+        budget = TimeBudget(lambda: 1000, 500)
+
+        assert budget.predicted_millis == 0
+        assert budget.has_time_for_next()
+
+    def test_stops_at_fixed_reserve(self):
+        budget = TimeBudget(lambda: 500, 500)
+
+        assert not budget.has_time_for_next()
+
+    def test_stops_when_predicted_item_would_not_fit(self):
+        budget = TimeBudget(lambda: 1000, 500)
+
+        budget.record(400)
+        assert budget.has_time_for_next()
+
+        budget.record(600)
+        assert not budget.has_time_for_next()
+
+    def test_stops_when_reserved_time_would_not_fit(self):
+        budget = TimeBudget(lambda: 1000, 500)
+
+        budget.record(300)
+        assert budget.has_time_for_next()
+        assert budget.has_time_for_next(reserved_millis=150)
+        assert not budget.has_time_for_next(reserved_millis=200)
+
+    def test_ewma_weights_recent_durations(self):
+        budget = TimeBudget(lambda: 1000, 0, smoothing=0.5)
+
+        budget.record(100)
+        budget.record(200)
+
+        assert budget.ewma_millis == 150
+
+    def test_percentile_uses_recent_window(self):
+        budget = TimeBudget(lambda: 1000, 0, percentile=0.95, window_size=100)
+
+        for duration in range(1, 101):
+            budget.record(duration)
+
+        assert budget.percentile_millis == 95
+        assert budget.sample_count == 100
+
+        budget.record(1000)
+        assert budget.sample_count == 100
+        assert budget.percentile_millis == 96
+
+    def test_prediction_uses_the_more_pessimistic_estimate(self):
+        budget = TimeBudget(lambda: 1000, 0, smoothing=0.1)
+
+        for _ in range(19):
+            budget.record(10)
+        budget.record(500)
+
+        assert budget.percentile_millis == 10
+        assert budget.ewma_millis == pytest.approx(59)
+        assert budget.predicted_millis == pytest.approx(59)
+
+    @patch('dl_utils.time_budget.time.monotonic')
+    def test_measure_records_duration_in_millis(self, mock_monotonic):
+        mock_monotonic.side_effect = [10.0, 10.25]
+        budget = TimeBudget(lambda: 1000, 0)
+
+        with budget.measure():
+            pass
+
+        assert budget.ewma_millis == 250
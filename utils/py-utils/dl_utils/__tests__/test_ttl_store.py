@@ -0,0 +1,209 @@
+"""
+Tests for TTL stores
+"""
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from dl_utils.ttl_store import (
+    InMemoryTtlStore,
+    S3TtlStore,
+    TieredTtlStore,
+    build_ttl_store,
+)
+
+
+class FakeClock:
+    """A controllable clock for expiry tests"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_client_error(code):
+    """Helper to build a botocore ClientError with a given error code"""
+    return ClientError({'Error': {'Code': code, 'Message': 'test'}}, 'GetObject')
+
+
+def s3_body(value, expires_at):
+    """Build a get_object response for a stored entry"""
+    return {'Body': io.BytesIO(json.dumps({'value': value, 'expiresAt': expires_at}).encode())}
+
+
+class TestInMemoryTtlStore:
+    """Test suite for InMemoryTtlStore"""
+
+    def test_returns_stored_value_before_expiry(self):
+        clock = FakeClock()
+        store = InMemoryTtlStore(60, clock=clock)
+
+        store.put("msg-1", "seen")
+
+        assert store.get("msg-1") == "seen"
+
+    def test_returns_none_after_expiry(self):
+        clock = FakeClock()
+        store = InMemoryTtlStore(60, clock=clock)
+
+        store.put("msg-1", "seen")
+        clock.now += 61
+
+        assert store.get("msg-1") is None
+        assert len(store) == 0
+
+    def test_get_entry_returns_value_and_expiry(self):
+        clock = FakeClock()
+        store = InMemoryTtlStore(60, clock=clock)
+
+        store.put("msg-1", "seen")
+        store.put("msg-2", "seen", expires_at=clock.now + 5)
+
+        assert store.get_entry("msg-1") == ("seen", clock.now + 60)
+        assert store.get_entry("msg-2") == ("seen", clock.now + 5)
+        clock.now += 5
+        assert store.get_entry("msg-2") is None
+
+    def test_returns_none_for_missing_key(self):
+        store = InMemoryTtlStore(60)
+
+        assert store.get("missing") is None
+
+    def test_evicts_least_recently_used_entry(self):
+        store = InMemoryTtlStore(60, max_entries=2)
+
+        store.put("msg-1", "a")
+        store.put("msg-2", "b")
+        store.get("msg-1")
+        store.put("msg-3", "c")
+
+        assert store.get("msg-1") == "a"
+        assert store.get("msg-2") is None
+        assert store.get("msg-3") == "c"
+
+    def test_delete_removes_entry(self):
+        store = InMemoryTtlStore(60)
+
+        store.put("msg-1", "a")
+        store.delete("msg-1")
+
+        assert store.get("msg-1") is None
+
+
+class TestS3TtlStore:
+    """Test suite for S3TtlStore"""
+
+    def test_put_writes_json_object_under_prefix(self):
+        s3_client = Mock()
+        store = S3TtlStore(s3_client, "s3://test-bucket/seen-messages/", 60, clock=FakeClock())
+
+        store.put("msg-1", "seen")
+
+        s3_client.put_object.assert_called_once_with(
+            Bucket="test-bucket",
+            Key="seen-messages/msg-1",
+            Body=json.dumps({'value': 'seen', 'expiresAt': 1060.0}).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def test_get_returns_unexpired_value(self):
+        s3_client = Mock()
+        s3_client.get_object.return_value = s3_body("seen", 1060.0)
+        store = S3TtlStore(s3_client, "s3://test-bucket/seen-messages", 60, clock=FakeClock())
+
+        assert store.get("msg-1") == "seen"
+        s3_client.get_object.assert_called_once_with(
+            Bucket="test-bucket", Key="seen-messages/msg-1")
+
+    def test_get_returns_none_for_expired_value(self):
+        s3_client = Mock()
+        s3_client.get_object.return_value = s3_body("seen", 999.0)
+        store = S3TtlStore(s3_client, "s3://test-bucket/seen-messages", 60, clock=FakeClock())
+
+        assert store.get("msg-1") is None
+
+    def test_get_returns_none_for_missing_key(self):
+        s3_client = Mock()
+        s3_client.get_object.side_effect = make_client_error('NoSuchKey')
+        store = S3TtlStore(s3_client, "s3://test-bucket/seen-messages", 60)
+
+        assert store.get("msg-1") is None
+
+    def test_get_raises_other_errors(self):
+        s3_client = Mock()
+        s3_client.get_object.side_effect = make_client_error('AccessDenied')
+        store = S3TtlStore(s3_client, "s3://test-bucket/seen-messages", 60)
+
+        with pytest.raises(ClientError):
+            store.get("msg-1")
+
+
+class TestTieredTtlStore:
+    """Test suite for TieredTtlStore"""
+
+    def test_warm_hit_does_not_read_durable_store(self):
+        warm_store = InMemoryTtlStore(60)
+        durable_store = Mock()
+        store = TieredTtlStore(warm_store, durable_store)
+
+        warm_store.put("msg-1", "seen")
+
+        assert store.get("msg-1") == "seen"
+        durable_store.get_entry.assert_not_called()
+
+    def test_durable_hit_populates_warm_store(self):
+        clock = FakeClock()
+        warm_store = InMemoryTtlStore(60, clock=clock)
+        durable_store = Mock()
+        durable_store.get_entry.return_value = ("seen", 1030.0)
+        store = TieredTtlStore(warm_store, durable_store)
+
+        assert store.get("msg-1") == "seen"
+        assert warm_store.get("msg-1") == "seen"
+
+        clock.now = 1031.0
+        assert warm_store.get("msg-1") is None
+
+    def test_miss_in_both_stores(self):
+        durable_store = Mock()
+        durable_store.get_entry.return_value = None
+        store = TieredTtlStore(InMemoryTtlStore(60), durable_store)
+
+        assert store.get("msg-1") is None
+
+    def test_put_writes_to_both_stores(self):
+        warm_store = InMemoryTtlStore(60)
+        durable_store = Mock()
+        store = TieredTtlStore(warm_store, durable_store)
+
+        store.put("msg-1", "seen")
+
+        durable_store.put.assert_called_once_with("msg-1", "seen", ttl_seconds=None)
+        assert warm_store.get("msg-1") == "seen"
+
+
+class TestBuildTtlStore:
+    """Test suite for build_ttl_store"""
+
+    def test_builds_in_memory_store_without_uri(self):
+        assert isinstance(build_ttl_store(60), InMemoryTtlStore)
+
+    def test_builds_tiered_store_with_uri(self):
+        store = build_ttl_store(60, s3_client=Mock(), s3_uri="s3://bucket/prefix")
+
+        assert isinstance(store, TieredTtlStore)
+        assert store.durable_store.bucket == "bucket"
+        assert store.durable_store.prefix == "prefix"
+
+    def test_builds_s3_store_without_warm_tier(self):
+        store = build_ttl_store(60, s3_client=Mock(), s3_uri="s3://bucket/prefix", warm_tier=False)
+
+        assert isinstance(store, S3TtlStore)
+        assert store.bucket == "bucket"
+
+    def test_builds_in_memory_store_without_uri_or_warm_tier(self):
+        assert isinstance(build_ttl_store(60, warm_tier=False), InMemoryTtlStore)
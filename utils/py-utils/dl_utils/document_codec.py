@@ -0,0 +1,169 @@
+"""
+Optional compression of documents stored in S3.
+
+Documents are compressed as they are written, so the codec works with streamed
+uploads, and are stored with a ContentEncoding and a metadata marker naming the
+codec. Readers use the marker to decode a document without needing to know how
+the writing environment was configured; documents without it are read as is.
+
+gzip is always available. zstd is used when the zstandard package is installed.
+"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# Object metadata key recording the codec a document was stored with
+CODEC_METADATA_KEY = 'dl-codec'
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+
+class UnsupportedCodecError(Exception):
+    """Raised when a codec is unknown or not available in this environment"""
+
+
+class DocumentCodec:
+    """
+    Compresses and decompresses documents with one algorithm
+    """
+
+    def __init__(self, name, build_compressor, build_decompressor):
+        self.name = name
+        self.__build_compressor = build_compressor
+        self.__build_decompressor = build_decompressor
+
+    @property
+    def content_encoding(self):
+        """
+        Content-Encoding stored with documents written by this codec
+        """
+        return self.name
+
+    @property
+    def metadata(self):
+        """
+        Object metadata marking documents written by this codec
+        """
+        return {CODEC_METADATA_KEY: self.name}
+
+    def compressor(self):
+        """
+        Returns an incremental compressor with compress(data) and flush() methods
+        """
+        return self.__build_compressor()
+
+    def decompressor(self):
+        """
+        Returns an incremental decompressor with a decompress(data) method
+        """
+        return self.__build_decompressor()
+
+    def compress(self, content):
+        """
+        Compresses a whole document
+        """
+        compressor = self.compressor()
+        return compressor.compress(content) + compressor.flush()
+
+    def decompress(self, content):
+        """
+        Decompresses a whole document
+        """
+        return self.decompressor().decompress(content)
+
+
+def _gzip_codec():
+    return DocumentCodec(
+        GZIP,
+        lambda: zlib.compressobj(DEFAULT_GZIP_LEVEL, zlib.DEFLATED, _GZIP_WBITS),
+        lambda: zlib.decompressobj(_GZIP_WBITS)
+    )
+
+
+def _zstd_codec():
+    if zstandard is None:
+        raise UnsupportedCodecError("zstd codec requires the zstandard package")
+
+    return DocumentCodec(
+        ZSTD,
+        lambda: zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compressobj(),
+        lambda: zstandard.ZstdDecompressor().decompressobj()
+    )
+
+
+_CODECS = {
+    GZIP: _gzip_codec,
+    ZSTD: _zstd_codec,
+}
+
+
+def get_codec(name):
+    """
+    Returns the codec with the given name, or None to store documents uncompressed
+    when no name is given
+    """
+    if not name or name.lower() == 'none':
+        return None
+
+    if name.lower() not in _CODECS:
+        raise UnsupportedCodecError(f"Unknown document codec {name}")
+
+    return _CODECS[name.lower()]()
+
+
+def codec_for_object(s3_response):
+    """
+    Returns the codec a stored document was written with, taken from the response to
+    a get_object or head_object call, or None if it is not compressed
+    """
+    return get_codec(s3_response.get('Metadata', {}).get(CODEC_METADATA_KEY))
+
+
+class DecodingReader:  # pylint: disable=too-few-public-methods
+    """
+    File-like reader over a stored document's body that decompresses it as it is read
+    """
+
+    def __init__(self, body, codec=None, read_size=64 * 1024):
+        self.__body = body
+        self.__decompressor = codec.decompressor() if codec else None
+        self.__read_size = read_size
+        self.__pending = b''
+        self.__finished = False
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes of the decoded document, or all of it when size is negative
+        """
+        if self.__decompressor is None:
+            return self.__body.read() if size is None or size < 0 else self.__body.read(size)
+
+        while not self.__finished and (size is None or size < 0 or len(self.__pending) < size):
+            chunk = self.__body.read(self.__read_size)
+            if not chunk:
+                self.__finished = True
+                break
+            self.__pending += self.__decompressor.decompress(chunk)
+
+        if size is None or size < 0:
+            data, self.__pending = self.__pending, b''
+        else:
+            data, self.__pending = self.__pending[:size], self.__pending[size:]
+
+        return data
+
+
+def read_document(s3_client, bucket, key):
+    """
+    Returns a file-like reader over the decoded content of a stored document
+    """
+    s3_response = s3_client.get_object(Bucket=bucket, Key=key)
+    return DecodingReader(s3_response['Body'], codec_for_object(s3_response))
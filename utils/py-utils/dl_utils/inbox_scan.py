@@ -0,0 +1,82 @@
+"""
+Helpers for scanning a MESH inbox across several invocations.
+
+A poller that runs out of time saves the ID of the last message it started as a
+checkpoint. The next poller resumes from the message after it, wrapping around
+to the start of the inbox once the end is reached, so that a large backlog is
+worked through evenly rather than re-examining the head of the inbox each time.
+
+Several pollers can share an inbox by each taking the messages whose ID hashes
+into its own shard.
+"""
+import zlib
+from datetime import datetime, timezone
+
+# MESH message IDs start with the time the message was received, e.g. 20200529155357895317_3573F8
+_MESSAGE_ID_TIMESTAMP_LENGTH = 20
+_MESSAGE_ID_TIMESTAMP_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def resume_order(message_ids, checkpoint=None):
+    """
+    Returns message IDs starting after the checkpoint and wrapping around to the
+    start of the inbox. If the checkpointed message has since left the inbox, the
+    scan resumes at the first ID that sorts after it, as MESH IDs start with the
+    time the message was received.
+    """
+    message_ids = list(message_ids)
+
+    if not checkpoint or not message_ids:
+        return message_ids
+
+    if checkpoint in message_ids:
+        start = message_ids.index(checkpoint) + 1
+    else:
+        start = next(
+            (index for index, message_id in enumerate(message_ids) if message_id > checkpoint),
+            0
+        )
+
+    return message_ids[start:] + message_ids[:start]
+
+
+def is_in_shard(message_id, shard_index, shard_count):
+    """
+    Determines whether a message belongs to a shard. Every message ID belongs to
+    exactly one of shard_count shards, so pollers with different shard indexes
+    never process the same message.
+    """
+    if shard_count <= 1:
+        return True
+
+    return zlib.crc32(str(message_id).encode('utf-8')) % shard_count == shard_index
+
+
+def message_id_timestamp(message_id):
+    """
+    Returns the time a MESH message was received, taken from its ID, or None if the
+    ID does not start with a timestamp
+    """
+    try:
+        return datetime.strptime(
+            str(message_id)[:_MESSAGE_ID_TIMESTAMP_LENGTH], _MESSAGE_ID_TIMESTAMP_FORMAT
+        ).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def oldest_message_age_seconds(message_ids, now=None):
+    """
+    Returns the age in seconds of the oldest message whose ID carries a timestamp,
+    or None if there is no such message
+    """
+    timestamps = [
+        timestamp for timestamp in map(message_id_timestamp, message_ids)
+        if timestamp is not None
+    ]
+
+    if not timestamps:
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    return max((now - min(timestamps)).total_seconds(), 0)
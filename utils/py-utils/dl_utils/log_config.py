@@ -1,4 +1,112 @@
+"""
+Structured logging configuration shared by the Python lambdas.
+
+The minimum level is read from LOG_LEVEL (default INFO). Setting LOG_SAMPLE_RATE
+to a value between 0 and 1 keeps only that fraction of debug/info lines that
+are bound to a message ID; warnings and errors are always kept.
+"""
+import logging
+import os
+import zlib
+
 import structlog
 
-structlog.configure(processors=[structlog.processors.JSONRenderer()])
+DEFAULT_LOG_LEVEL = 'INFO'
+DEFAULT_SAMPLE_RATE = 1.0
+
+# Context keys identifying the message a log line belongs to, in priority order
+SAMPLE_KEYS = ('mesh_message_id', 'message_id')
+
+_SAMPLED_METHODS = {'debug', 'info'}
+_SAMPLE_BUCKETS = 10000
+
+
+def _parse_level(level):
+    """
+    Converts a level name or number into a logging level, falling back to INFO
+    """
+    if isinstance(level, int):
+        return level
+
+    resolved = logging.getLevelName(str(level).strip().upper())
+    if isinstance(resolved, int):
+        return resolved
+
+    return logging.getLevelName(DEFAULT_LOG_LEVEL)
+
+
+def _parse_sample_rate(sample_rate):
+    """
+    Converts a sample rate into a float between 0 and 1, falling back to 1
+    """
+    try:
+        rate = float(sample_rate)
+    except (TypeError, ValueError):
+        return DEFAULT_SAMPLE_RATE
+
+    return min(max(rate, 0.0), 1.0)
+
+
+def is_sampled(sample_key, sample_rate):
+    """
+    Deterministically decides whether log lines for a given message are kept,
+    so that every line for a message is either kept or dropped together
+    """
+    if sample_rate >= 1.0:
+        return True
+    if sample_rate <= 0.0:
+        return False
+
+    bucket = zlib.crc32(str(sample_key).encode('utf-8')) % _SAMPLE_BUCKETS
+    return bucket < sample_rate * _SAMPLE_BUCKETS
+
+
+class MessageSampler:  # pylint: disable=too-few-public-methods
+    """
+    structlog processor that drops a deterministic share of per-message
+    debug/info lines. Lines without a message ID are never dropped.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def __call__(self, _, method_name, event_dict):
+        if method_name not in _SAMPLED_METHODS:
+            return event_dict
+
+        for key in SAMPLE_KEYS:
+            sample_key = event_dict.get(key)
+            if sample_key:
+                if not is_sampled(sample_key, self.sample_rate):
+                    raise structlog.DropEvent
+                break
+
+        return event_dict
+
+
+def configure_logging(level=None, sample_rate=None):
+    """
+    Configures structlog with a level-filtering bound logger and optional
+    per-message sampling. Defaults are read from the environment.
+    """
+    if level is None:
+        level = os.environ.get('LOG_LEVEL', DEFAULT_LOG_LEVEL)
+    if sample_rate is None:
+        sample_rate = os.environ.get('LOG_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+
+    sample_rate = _parse_sample_rate(sample_rate)
+
+    processors = []
+    if sample_rate < 1.0:
+        processors.append(MessageSampler(sample_rate))
+    processors.append(structlog.processors.JSONRenderer())
+
+    structlog.configure(
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(_parse_level(level)),
+        cache_logger_on_first_use=True,
+    )
+
+
+configure_logging()
 log = structlog.get_logger()
@@ -32,6 +32,9 @@ class BaseMeshConfig:  # pylint: disable=too-many-instance-attributes
         "use_mesh_mock": "USE_MESH_MOCK"
     }
 
+    # Optional environment variables converted from strings to booleans
+    _BOOLEAN_ENV_VARS = {"use_mesh_mock"}
+
     def __init__(self, ssm=None, s3_client=None):
         """
         Initialize base MESH configuration.
@@ -86,7 +89,7 @@ class BaseMeshConfig:  # pylint: disable=too-many-instance-attributes
         for attr, key in self._OPTIONAL_ENV_VAR_MAP.items():
             if key in os.environ:
                 value = os.environ[key]
-                if attr == "use_mesh_mock":
+                if attr in self._BOOLEAN_ENV_VARS:
                     # Convert string to boolean
                     setattr(self, attr, value.lower() in ('true', '1', 'yes', 'on'))
                 else:
@@ -172,3 +175,22 @@ class BaseMeshConfig:  # pylint: disable=too-many-instance-attributes
             transparent_compress=True,
             cert=(self.client_cert, self.client_key)
         )
+
+
+class MeshMailboxConfig(BaseMeshConfig):
+    """
+    Connection configuration for an additional MESH mailbox, loaded from its own
+    SSM prefix and sharing the common settings of the application's configuration.
+    """
+
+    _REQUIRED_ENV_VAR_MAP = {}
+
+    def __init__(self, parent_config, ssm_mesh_prefix):
+        super().__init__(ssm=parent_config.ssm, s3_client=parent_config.s3_client)
+
+        self.ssm_mesh_prefix = ssm_mesh_prefix
+        self.environment = parent_config.environment
+        self.certificate_expiry_metric_name = parent_config.certificate_expiry_metric_name
+        self.certificate_expiry_metric_namespace = \
+            parent_config.certificate_expiry_metric_namespace
+        self.use_mesh_mock = parent_config.use_mesh_mock
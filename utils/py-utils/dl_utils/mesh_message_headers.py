@@ -0,0 +1,73 @@
+"""
+Header-only access to messages in a MESH inbox.
+
+Pollers only need a message's headers to decide what to do with it, so these
+helpers avoid reading message bodies.
+"""
+import mesh_client
+
+_RECEIVE_HEADERS = {
+    "sender": "Mex-From",
+    "recipient": "Mex-To",
+    "message_id": "Mex-MessageID",
+    "message_type": "Mex-MessageType",
+    **mesh_client.optional_header_map(),
+}
+
+
+class MeshMessageHeaders:  # pylint: disable=too-few-public-methods
+    """
+    Header-only view of a message in a MESH inbox. Exposes the same header
+    attributes, id() and acknowledge() as a full MESH message, but no body.
+    """
+
+    def __init__(self, message_id, headers, mesh_client_instance):
+        self._msg_id = message_id
+        self.__mesh_client = mesh_client_instance
+
+        for attribute, header in _RECEIVE_HEADERS.items():
+            setattr(self, attribute, headers.get(header))
+
+    def id(self):  # pylint: disable=invalid-name
+        """
+        Returns the message id
+        """
+        return self._msg_id
+
+    def acknowledge(self):
+        """
+        Acknowledges the message, removing it from the inbox
+        """
+        self.__mesh_client.acknowledge_message(self._msg_id)
+
+    def __repr__(self):
+        return f"MeshMessageHeaders<id:{self._msg_id},sender:{getattr(self, 'sender', None)}>"
+
+
+def retrieve_message_headers(mesh_client_instance, message_id):
+    """
+    Retrieves the headers of a message without reading its body. The first chunk is
+    requested as a stream and closed as soon as its headers have been received.
+    Clients that provide their own header-only retrieval are used directly.
+    """
+    if hasattr(mesh_client_instance, 'retrieve_message_headers'):
+        return mesh_client_instance.retrieve_message_headers(message_id)
+
+    response = mesh_client_instance.retrieve_message_chunk(message_id, 1)
+    try:
+        return MeshMessageHeaders(message_id, response.headers, mesh_client_instance)
+    finally:
+        response.close()
+
+
+def iterate_all_message_headers(mesh_client_instance):
+    """
+    Iterates over header-only views of all messages in a MESH inbox. Clients that
+    provide their own header-only listing (such as MockMeshClient) are used directly.
+    """
+    if hasattr(mesh_client_instance, 'iterate_all_message_headers'):
+        yield from mesh_client_instance.iterate_all_message_headers()
+        return
+
+    for message_id in mesh_client_instance.iterate_message_ids():
+        yield retrieve_message_headers(mesh_client_instance, message_id)
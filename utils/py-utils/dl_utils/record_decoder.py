@@ -0,0 +1,152 @@
+"""
+Decoding of SQS records carrying EventBridge events.
+
+Each record body is an EventBridge envelope whose detail is a CloudEvent. The
+decoder parses and validates a body in a single pass with Pydantic's
+model_validate_json, choosing the event model from a registry keyed by the
+CloudEvent type, so the body is never parsed once to find the type and again to
+validate it. Records that cannot be decoded are returned as structured results
+rather than raised, leaving the caller to decide how to fail them.
+"""
+import json
+from typing import Annotated, Union
+
+from pydantic import Discriminator, Tag, ValidationError, create_model
+
+# Reasons a record could not be decoded
+MISSING_BODY = 'MISSING_BODY'
+INVALID_JSON = 'INVALID_JSON'
+MISSING_DETAIL = 'MISSING_DETAIL'
+UNKNOWN_EVENT_TYPE = 'UNKNOWN_EVENT_TYPE'
+INVALID_EVENT = 'INVALID_EVENT'
+
+
+class RecordDecodeError(Exception):
+    """
+    Describes why a record could not be decoded. errors holds Pydantic's
+    validation errors, if there were any, and exception the error that caused the
+    failure.
+    """
+
+    def __init__(self, reason, message, event_type=None, errors=None, exception=None):
+        super().__init__(message)
+        self.reason = reason
+        self.event_type = event_type
+        self.errors = errors or []
+        self.exception = exception
+
+
+class DecodedRecord:  # pylint: disable=too-few-public-methods
+    """
+    The result of decoding one SQS record: the validated event, or the error that
+    stopped it being decoded
+    """
+
+    def __init__(self, record, event=None, error=None):
+        self.record = record
+        self.event = event
+        self.error = error
+
+    @property
+    def message_id(self):
+        """
+        The SQS message ID of the record
+        """
+        return self.record.get('messageId') if isinstance(self.record, dict) else None
+
+    @property
+    def event_type(self):
+        """
+        The CloudEvent type of the record, where it could be read
+        """
+        return self.event.type if self.event is not None else self.error.event_type
+
+
+class RecordDecoder:
+    """
+    Decodes SQS records into the event models registered for their CloudEvent type
+    """
+
+    def __init__(self, models):
+        if not models:
+            raise ValueError('At least one event model must be registered')
+
+        self.models = dict(models)
+        self.__envelope = _build_envelope(self.models)
+
+    def decode(self, record):
+        """
+        Decodes an SQS record, returning a DecodedRecord
+        """
+        body = record.get('body') if isinstance(record, dict) else None
+        if not isinstance(body, (str, bytes)):
+            return DecodedRecord(record, error=RecordDecodeError(
+                MISSING_BODY, 'SQS record has no body'))
+
+        try:
+            event = self.__envelope.model_validate_json(body).detail
+        except ValidationError as e:
+            return DecodedRecord(record, error=self.__describe(body, e))
+
+        if event.type not in self.models:
+            return DecodedRecord(record, error=RecordDecodeError(
+                UNKNOWN_EVENT_TYPE, f"Unknown event type: '{event.type}'", event_type=event.type))
+
+        return DecodedRecord(record, event=event)
+
+    def decode_batch(self, records):
+        """
+        Decodes each of a list of SQS records
+        """
+        return [self.decode(record) for record in records]
+
+    def __describe(self, body, validation_error):
+        errors = validation_error.errors(include_url=False)
+        error_types = {error['type'] for error in errors}
+        event_type = _read_event_type(body)
+
+        if 'json_invalid' in error_types:
+            reason, message = INVALID_JSON, 'SQS record body is not valid JSON'
+        elif any(error['loc'] == ('detail',) for error in errors if error['type'] == 'missing'):
+            reason, message = MISSING_DETAIL, 'SQS record body has no event detail'
+        elif error_types & {'union_tag_invalid', 'union_tag_not_found'}:
+            reason, message = UNKNOWN_EVENT_TYPE, f"Unknown event type: '{event_type or ''}'"
+        else:
+            reason, message = INVALID_EVENT, f"Event of type '{event_type}' failed validation"
+
+        return RecordDecodeError(
+            reason, message, event_type=event_type, errors=errors, exception=validation_error)
+
+
+def _detail_type(detail):
+    if isinstance(detail, dict):
+        return detail.get('type')
+
+    return getattr(detail, 'type', None)
+
+
+def _build_envelope(models):
+    """
+    Builds a model of the EventBridge envelope whose detail is one of the registered
+    event models. A single model is validated directly, and its type checked
+    afterwards; several are chosen between by the detail's type.
+    """
+    if len(models) == 1:
+        detail = next(iter(models.values()))
+    else:
+        choices = tuple(Annotated[model, Tag(event_type)] for event_type, model in models.items())
+        detail = Annotated[Union[choices], Discriminator(_detail_type)]
+
+    return create_model('EventBridgeEnvelope', detail=(detail, ...))
+
+
+def _read_event_type(body):
+    """
+    Reads the CloudEvent type from a body that failed to decode, for reporting
+    """
+    try:
+        detail = json.loads(body).get('detail')
+    except (ValueError, AttributeError):
+        return None
+
+    return _detail_type(detail)
@@ -0,0 +1,184 @@
+"""
+Processing of SQS batches within the time left in a lambda invocation.
+
+A lambda that times out part way through a batch has the whole batch
+redelivered, including the records it had already processed. The runner
+instead stops starting records once the time left would no longer leave a
+safety margin, using a TimeBudget to predict how long a record takes, and
+returns the records it did not start as batch item failures so that only they
+are retried.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from .metric_client import Metric
+from .time_budget import TimeBudget
+
+# Time left in reserve when deciding whether to start another record
+DEFAULT_MINIMUM_REMAINING_MILLIS = 5000
+
+DEFAULT_BATCH_METRIC_NAME = 'sqs-batch-records'
+
+# Counters kept for every batch, whatever the outcomes of its records
+RETRIEVED = 'retrieved'
+FAILED = 'failed'
+UNSTARTED = 'unstarted'
+
+
+class SqsBatchResult:
+    """
+    Counts of each outcome in a batch, and the records to be retried
+    """
+
+    def __init__(self, outcomes):
+        self.counts = {
+            RETRIEVED: 0,
+            **{outcome: 0 for outcome in outcomes},
+            FAILED: 0,
+            UNSTARTED: 0
+        }
+        self.batch_item_failures = []
+
+    def response(self):
+        """
+        Returns the lambda response reporting partial batch failures
+        """
+        return {"batchItemFailures": self.batch_item_failures}
+
+    def fail(self, message_id, outcome):
+        """
+        Fails a record already counted under outcome, for work deferred to the end
+        of the batch that did not succeed
+        """
+        self.counts[outcome] -= 1
+        self.counts[FAILED] += 1
+        self.batch_item_failures.append({"itemIdentifier": message_id})
+
+
+class SqsBatchRunner:
+    """
+    Works through the records of an SQS batch, counting the outcome returned for
+    each and releasing records that fail, or are not started in time, for retry
+    """
+
+    def __init__(self, logger, outcomes=(), get_remaining_time_in_millis=None,
+                 minimum_remaining_millis=DEFAULT_MINIMUM_REMAINING_MILLIS,
+                 metric_namespace=None, metric_name=DEFAULT_BATCH_METRIC_NAME,
+                 dimensions=None):
+        self.__log = logger
+        self.outcomes = tuple(outcomes)
+        self.__time_budget = TimeBudget(
+            get_remaining_time_in_millis, minimum_remaining_millis
+        ) if get_remaining_time_in_millis is not None else None
+        self.__metric_namespace = metric_namespace
+        self.__metric_name = metric_name
+        self.__dimensions = dimensions or {}
+
+    def run(self, records, process_record, map_records=None, on_complete=None):
+        """
+        Processes the SQS records in a batch with process_record, which returns the
+        outcome of a record or raises to fail it. Records are processed one after
+        another unless map_records is given, which is called with a function and
+        the records and returns the function's results in record order. on_complete,
+        if given, is called with the result once every record has been processed
+        and before metrics are recorded.
+        """
+        result = SqsBatchResult(self.outcomes)
+        sqs_records = []
+
+        for record in records:
+            result.counts[RETRIEVED] += 1
+
+            if record.get('eventSource') != 'aws:sqs':
+                self.__log.warn("Skipping non-SQS record", message_id=record.get('messageId'))
+                continue
+
+            sqs_records.append(record)
+
+        def attempt(record):
+            return self.__attempt(record, process_record)
+
+        results = (map_records or _map_serially)(attempt, sqs_records)
+
+        for record, (outcome, error) in zip(sqs_records, results):
+            message_id = record.get('messageId')
+
+            if outcome == UNSTARTED:
+                result.counts[UNSTARTED] += 1
+                result.batch_item_failures.append({"itemIdentifier": message_id})
+                continue
+
+            try:
+                if error is not None:
+                    raise error
+                result.counts[outcome] = result.counts.get(outcome, 0) + 1
+
+            except Exception as exc:  # pylint: disable=broad-except
+                result.counts[FAILED] += 1
+                self.__log.error("Failed to process SQS message",
+                                 message_id=message_id,
+                                 error=str(exc))
+                result.batch_item_failures.append({"itemIdentifier": message_id})
+
+        if on_complete is not None:
+            on_complete(result)
+
+        if result.counts[UNSTARTED]:
+            self.__log.warn("Released SQS records not started before the time limit",
+                            unstarted=result.counts[UNSTARTED])
+
+        self.record_metrics(result)
+        return result
+
+    def record_metrics(self, result):
+        """
+        Emits a count of each outcome in a batch, when a metric namespace is set
+        """
+        if not self.__metric_namespace:
+            return
+
+        for outcome, count in result.counts.items():
+            Metric(
+                name=self.__metric_name,
+                namespace=self.__metric_namespace,
+                dimensions={**self.__dimensions, "Outcome": outcome}
+            ).record(count)
+
+    def __attempt(self, record, process_record):
+        """
+        Processes a record if there is time to, returning an (outcome, error) pair
+        so that results are handled the same way however records were processed
+        """
+        if self.__time_budget is None:
+            return _process(record, process_record)
+
+        if not self.__time_budget.has_time_for_next():
+            return UNSTARTED, None
+
+        with self.__time_budget.measure():
+            return _process(record, process_record)
+
+
+def _process(record, process_record):
+    try:
+        return process_record(record), None
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, exc
+
+
+def _map_serially(function, records):
+    return (function(record) for record in records)
+
+
+def map_concurrently(max_workers):
+    """
+    Returns a function, for SqsBatchRunner.run, that maps records to results on a
+    bounded pool of worker threads, keeping the results in record order
+    """
+    def map_records(function, records):
+        if not records:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(records))) as executor:
+            return list(executor.map(function, records))
+
+    return map_records
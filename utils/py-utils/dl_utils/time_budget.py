@@ -0,0 +1,112 @@
+"""
+Adaptive time budget for lambdas that work through a queue of items.
+
+The budget learns how long each item takes, keeping an exponentially weighted
+moving average (EWMA) and a high percentile over a window of recent durations,
+and only allows another item to start when the predicted cost of that item
+still leaves the fixed minimum reserve available.
+"""
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+
+DEFAULT_SMOOTHING = 0.2
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_WINDOW_SIZE = 200
+
+
+class TimeBudget:
+    """
+    Decides whether there is enough time left in an invocation to start another item
+    """
+
+    def __init__(self, get_remaining_time_in_millis, minimum_remaining_millis,
+                 smoothing=DEFAULT_SMOOTHING, percentile=DEFAULT_PERCENTILE,
+                 window_size=DEFAULT_WINDOW_SIZE):
+        self.__get_remaining_time_in_millis = get_remaining_time_in_millis
+        self.minimum_remaining_millis = int(minimum_remaining_millis)
+        self.smoothing = smoothing
+        self.percentile = percentile
+        self.__durations = deque(maxlen=window_size)
+        self.__ewma_millis = None
+        self.__lock = Lock()
+
+    def record(self, duration_millis):
+        """
+        Records how long an item took to process
+        """
+        with self.__lock:
+            self.__durations.append(duration_millis)
+            if self.__ewma_millis is None:
+                self.__ewma_millis = duration_millis
+            else:
+                self.__ewma_millis = (
+                    self.smoothing * duration_millis
+                    + (1 - self.smoothing) * self.__ewma_millis
+                )
+
+    @contextmanager
+    def measure(self):
+        """
+        Context manager recording the duration of the enclosed block as one item
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record((time.monotonic() - started) * 1000)
+
+    @property
+    def sample_count(self):
+        """
+        Number of durations in the current window
+        """
+        with self.__lock:
+            return len(self.__durations)
+
+    @property
+    def ewma_millis(self):
+        """
+        Exponentially weighted moving average of item durations, 0 before any are recorded
+        """
+        with self.__lock:
+            return self.__ewma_millis or 0
+
+    @property
+    def percentile_millis(self):
+        """
+        High percentile of recent item durations, 0 before any are recorded
+        """
+        with self.__lock:
+            durations = sorted(self.__durations)
+
+        if not durations:
+            return 0
+
+        index = min(math.ceil(self.percentile * len(durations)) - 1, len(durations) - 1)
+        return durations[max(index, 0)]
+
+    @property
+    def predicted_millis(self):
+        """
+        Predicted duration of the next item, taking the more pessimistic estimate
+        """
+        return max(self.ewma_millis, self.percentile_millis)
+
+    def remaining_millis(self):
+        """
+        Time remaining in the invocation
+        """
+        return self.__get_remaining_time_in_millis()
+
+    def has_time_for_next(self, reserved_millis=0):
+        """
+        Determines whether the next item is predicted to finish while still leaving
+        the minimum reserve, plus any time reserved for work still to be done after it
+        """
+        return (
+            self.remaining_millis() - self.predicted_millis - reserved_millis
+            > self.minimum_remaining_millis
+        )
@@ -0,0 +1,203 @@
+"""
+Key/value stores whose entries expire after a time-to-live.
+
+InMemoryTtlStore is a warm-container cache, S3TtlStore is a durable store shared
+between invocations, and TieredTtlStore combines the two so that most lookups
+are answered from memory.
+"""
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class InMemoryTtlStore:
+    """
+    Thread-safe in-memory store with per-entry expiry and least recently used eviction
+    """
+
+    def __init__(self, ttl_seconds, max_entries=DEFAULT_MAX_ENTRIES, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.__clock = clock
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def get_entry(self, key):
+        """
+        Returns a (value, expires_at) tuple for key, or None if it is missing or expired
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+
+            if entry[1] <= self.__clock():
+                del self.__entries[key]
+                return None
+
+            self.__entries.move_to_end(key)
+            return entry
+
+    def get(self, key):
+        """
+        Returns the value stored for key, or None if it is missing or expired
+        """
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, value, ttl_seconds=None, expires_at=None):
+        """
+        Stores value for key until the TTL elapses, or until expires_at when given
+        """
+        if expires_at is None:
+            expires_at = self.__clock() + (ttl_seconds or self.ttl_seconds)
+
+        with self.__lock:
+            self.__entries[key] = (value, expires_at)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Removes key from the store
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+
+class S3TtlStore:
+    """
+    Durable store keeping one small JSON object per key under an S3 prefix
+    """
+
+    def __init__(self, s3_client, s3_uri, ttl_seconds, clock=time.time):
+        parsed_uri = urlparse(s3_uri)
+        self.bucket = parsed_uri.netloc
+        self.prefix = parsed_uri.path.strip('/')
+        self.ttl_seconds = ttl_seconds
+        self.__s3_client = s3_client
+        self.__clock = clock
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else str(key)
+
+    def get_entry(self, key):
+        """
+        Returns a (value, expires_at) tuple for key, or None if it is missing or expired
+        """
+        try:
+            s3_response = self.__s3_client.get_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key)
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+
+        entry = json.loads(s3_response['Body'].read())
+        if entry['expiresAt'] <= self.__clock():
+            return None
+
+        return entry['value'], entry['expiresAt']
+
+    def get(self, key):
+        """
+        Returns the value stored for key, or None if it is missing or expired
+        """
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def put(self, key, value, ttl_seconds=None, expires_at=None):
+        """
+        Stores value for key until the TTL elapses
+        """
+        if expires_at is None:
+            expires_at = self.__clock() + (ttl_seconds or self.ttl_seconds)
+
+        self.__s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=json.dumps({'value': value, 'expiresAt': expires_at}).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def delete(self, key):
+        """
+        Removes key from the store
+        """
+        self.__s3_client.delete_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key)
+        )
+
+
+class TieredTtlStore:
+    """
+    Reads from a warm in-memory store first and falls back to a durable store,
+    writing to both
+    """
+
+    def __init__(self, warm_store, durable_store):
+        self.warm_store = warm_store
+        self.durable_store = durable_store
+
+    def get(self, key):
+        """
+        Returns the value stored for key, or None if it is missing or expired
+        """
+        value = self.warm_store.get(key)
+        if value is not None:
+            return value
+
+        entry = self.durable_store.get_entry(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        self.warm_store.put(key, value, expires_at=expires_at)
+        return value
+
+    def put(self, key, value, ttl_seconds=None):
+        """
+        Stores value for key in both stores until the TTL elapses
+        """
+        self.durable_store.put(key, value, ttl_seconds=ttl_seconds)
+        self.warm_store.put(key, value, ttl_seconds=ttl_seconds)
+
+    def delete(self, key):
+        """
+        Removes key from both stores
+        """
+        self.warm_store.delete(key)
+        self.durable_store.delete(key)
+
+
+def build_ttl_store(ttl_seconds, s3_client=None, s3_uri=None, max_entries=DEFAULT_MAX_ENTRIES,
+                    warm_tier=True):
+    """
+    Builds an in-memory store, backed by S3 when an S3 URI is given. Values that other
+    containers overwrite, rather than only add, need warm_tier=False so that every read
+    goes to S3; a warm copy would otherwise hide the newer value.
+    """
+    if s3_uri and not warm_tier:
+        return S3TtlStore(s3_client, s3_uri, ttl_seconds)
+
+    warm_store = InMemoryTtlStore(ttl_seconds, max_entries=max_entries)
+
+    if not s3_uri:
+        return warm_store
+
+    return TieredTtlStore(warm_store, S3TtlStore(s3_client, s3_uri, ttl_seconds))
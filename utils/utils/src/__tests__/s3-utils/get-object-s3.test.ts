@@ -1,4 +1,5 @@
 import { Readable } from 'node:stream';
+import { gzipSync } from 'node:zlib';
 import {
   getS3Object,
   getS3ObjectBufferFromUri,
@@ -162,6 +163,30 @@ describe('getS3ObjectFromUri', () => {
     expect(data).toEqual(result);
   });
 
+  it('Should decode an object stored with a codec', async () => {
+    const result = JSON.stringify({ resourceType: 'DocumentReference' });
+
+    s3Client.send = jest.fn().mockReturnValueOnce({
+      Body: Readable.from([gzipSync(result)]),
+      Metadata: { 'dl-codec': 'gzip' },
+    });
+
+    const data = await getS3ObjectFromUri('s3://bucket-name/document.json');
+
+    expect(data).toEqual(result);
+  });
+
+  it('Should throw an error for an unknown codec', async () => {
+    s3Client.send = jest.fn().mockReturnValueOnce({
+      Body: Readable.from(['content']),
+      Metadata: { 'dl-codec': 'brotli' },
+    });
+
+    await expect(
+      getS3ObjectFromUri('s3://bucket-name/document.json'),
+    ).rejects.toThrow('Unknown document codec brotli');
+  });
+
   it('Should throw an error if object not found', async () => {
     s3Client.send = jest.fn().mockImplementationOnce(() => {
       throw new Error('No file found');
@@ -248,6 +273,19 @@ describe('getS3ObjectBufferFromUri', () => {
     expect(data).toEqual(expectedBuffer);
   });
 
+  it('Should decode an object stored with a codec', async () => {
+    const result = Buffer.from('%PDF-1.7 test content');
+
+    s3Client.send = jest.fn().mockReturnValueOnce({
+      Body: Readable.from([gzipSync(result)]),
+      Metadata: { 'dl-codec': 'gzip' },
+    });
+
+    const data = await getS3ObjectBufferFromUri('s3://bucket-name/letter.pdf');
+
+    expect(data).toEqual(result);
+  });
+
   it('Should throw an error if object not found', async () => {
     s3Client.send = jest.fn().mockImplementationOnce(() => {
       throw new Error('No file found');
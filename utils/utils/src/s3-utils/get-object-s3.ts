@@ -1,4 +1,5 @@
-import { type Readable } from 'node:stream';
+import { type Readable, type Transform } from 'node:stream';
+import { createGunzip, createZstdDecompress } from 'node:zlib';
 import {
   GetObjectCommand,
   GetObjectCommandOutput,
@@ -34,6 +35,33 @@ export interface S3Location {
   VersionId?: string;
 }
 
+// Object metadata key recording the codec a document was stored with by mesh-download
+export const CODEC_METADATA_KEY = 'dl-codec';
+
+function decodeBody(Body: Readable, codec: string | undefined): Readable {
+  let decompressor: Transform;
+  switch (codec?.toLowerCase()) {
+    case undefined:
+    case 'none': {
+      return Body;
+    }
+    case 'gzip': {
+      decompressor = createGunzip();
+      break;
+    }
+    case 'zstd': {
+      decompressor = createZstdDecompress();
+      break;
+    }
+    default: {
+      throw new Error(`Unknown document codec ${codec}`);
+    }
+  }
+
+  Body.on('error', (err) => decompressor.destroy(err));
+  return Body.pipe(decompressor);
+}
+
 async function streamToString(Body: Readable) {
   return new Promise<string>((resolve, reject) => {
     const chunks: Buffer[] = [];
@@ -66,11 +94,13 @@ export async function getS3ObjectStream(
     VersionId,
   };
   try {
-    const { Body } = await s3Client.send(new GetObjectCommand(params));
+    const { Body, Metadata } = await s3Client.send(
+      new GetObjectCommand(params),
+    );
 
     // https://www.typescriptlang.org/docs/handbook/advanced-types.html#user-defined-type-guards
     if (isReadable(Body)) {
-      return Body;
+      return decodeBody(Body, Metadata?.[CODEC_METADATA_KEY]);
     }
   } catch (error_) {
     const error = error_ as Error;